@@ -0,0 +1,29 @@
+"""Add pagination checkpoint columns to aps_query_state.
+
+Revision ID: 0002_query_state_checkpoint
+Revises: 0001_milestone1
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0002_query_state_checkpoint"
+down_revision = "0001_milestone1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("aps_query_state", sa.Column("checkpoint_run_id", sa.Integer(), nullable=True))
+    op.add_column("aps_query_state", sa.Column("checkpoint_skip", sa.Integer(), nullable=True))
+    op.add_column("aps_query_state", sa.Column("checkpoint_page", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("aps_query_state", "checkpoint_page")
+    op.drop_column("aps_query_state", "checkpoint_skip")
+    op.drop_column("aps_query_state", "checkpoint_run_id")
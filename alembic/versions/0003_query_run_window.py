@@ -0,0 +1,27 @@
+"""Record the effective date window on aps_query_run.
+
+Revision ID: 0003_query_run_window
+Revises: 0002_query_state_checkpoint
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0003_query_run_window"
+down_revision = "0002_query_state_checkpoint"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("aps_query_run", sa.Column("window_start", sa.Date(), nullable=True))
+    op.add_column("aps_query_run", sa.Column("window_end", sa.Date(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("aps_query_run", "window_end")
+    op.drop_column("aps_query_run", "window_start")
@@ -0,0 +1,25 @@
+"""Record executed date sub-windows on aps_query_run.
+
+Revision ID: 0004_query_run_windows_json
+Revises: 0003_query_run_window
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0004_query_run_windows_json"
+down_revision = "0003_query_run_window"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("aps_query_run", sa.Column("windows_json", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("aps_query_run", "windows_json")
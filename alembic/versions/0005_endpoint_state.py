@@ -0,0 +1,30 @@
+"""Cache wire-format detection per APS endpoint.
+
+Revision ID: 0005_endpoint_state
+Revises: 0004_query_run_windows_json
+Create Date: 2026-10-16 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0005_endpoint_state"
+down_revision = "0004_query_run_windows_json"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "aps_endpoint_state",
+        sa.Column("base_url", sa.Text(), primary_key=True),
+        sa.Column("wire_format", sa.Text(), nullable=False),
+        sa.Column("wire_format_verified_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("aps_endpoint_state")
@@ -0,0 +1,25 @@
+"""Add metadata_hash to aps_document.
+
+Revision ID: 0006_document_metadata_hash
+Revises: 0005_endpoint_state
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0006_document_metadata_hash"
+down_revision = "0005_endpoint_state"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("aps_document", sa.Column("metadata_hash", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("aps_document", "metadata_hash")
@@ -0,0 +1,25 @@
+"""Add stop_reason to aps_query_run.
+
+Revision ID: 0007_query_run_stop_reason
+Revises: 0006_document_metadata_hash
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0007_query_run_stop_reason"
+down_revision = "0006_document_metadata_hash"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("aps_query_run", sa.Column("stop_reason", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("aps_query_run", "stop_reason")
@@ -0,0 +1,57 @@
+"""Store document metadata as JSONB with GIN indexes on Postgres.
+
+Revision ID: 0008_document_jsonb
+Revises: 0007_query_run_stop_reason
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0008_document_jsonb"
+down_revision = "0007_query_run_stop_reason"
+branch_labels = None
+depends_on = None
+
+JSON_COLUMNS = ("document_type", "docket_number", "raw_metadata_json")
+GIN_COLUMNS = ("document_type", "docket_number")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for column in JSON_COLUMNS:
+        op.alter_column(
+            "aps_document",
+            column,
+            type_=postgresql.JSONB(),
+            existing_type=sa.JSON(),
+            postgresql_using=f"{column}::jsonb",
+        )
+    for column in GIN_COLUMNS:
+        op.create_index(
+            f"ix_aps_document_{column}_gin",
+            "aps_document",
+            [column],
+            postgresql_using="gin",
+            postgresql_ops={column: "jsonb_path_ops"},
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for column in GIN_COLUMNS:
+        op.drop_index(f"ix_aps_document_{column}_gin", table_name="aps_document")
+    for column in JSON_COLUMNS:
+        op.alter_column(
+            "aps_document",
+            column,
+            type_=sa.JSON(),
+            existing_type=postgresql.JSONB(),
+            postgresql_using=f"{column}::json",
+        )
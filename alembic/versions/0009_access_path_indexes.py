@@ -0,0 +1,48 @@
+"""Add secondary indexes for run history and discovery lookups.
+
+Revision ID: 0009_access_path_indexes
+Revises: 0008_document_jsonb
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "0009_access_path_indexes"
+down_revision = "0008_document_jsonb"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_aps_discovery_accession_number", "aps_discovery", ["accession_number"]),
+    ("ix_aps_query_run_query_id_started_at", "aps_query_run", ["query_id", "started_at"]),
+    ("ix_aps_document_date_added_timestamp", "aps_document", ["date_added_timestamp"]),
+    ("ix_aps_document_document_date", "aps_document", ["document_date"]),
+)
+
+
+def upgrade() -> None:
+    # On Postgres, build without blocking writes; CONCURRENTLY cannot run in a transaction.
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(
+                    name, table, columns, postgresql_concurrently=True, if_not_exists=True
+                )
+        return
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table, _ in INDEXES:
+                op.drop_index(
+                    name, table_name=table, postgresql_concurrently=True, if_exists=True
+                )
+        return
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,145 @@
+"""Optionally partition aps_discovery by discovered_at month on Postgres.
+
+Opt in with `alembic -x discovery_partitions=true upgrade head`; otherwise this revision
+leaves the plain table alone. To convert later, downgrade to 0009 and upgrade again with
+the flag. Monthly partitions are named aps_discovery_yYYYYmMM and each carries its own
+unique (run_id, accession_number) index; the runner creates upcoming months. Rows outside
+every monthly range land in the aps_discovery_default partition. Existing discoveries are
+restamped with their run's started_at, as the runner does, so each run stays in one
+partition.
+
+Revision ID: 0010_discovery_partitions
+Revises: 0009_access_path_indexes
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import context, op
+
+
+revision = "0010_discovery_partitions"
+down_revision = "0009_access_path_indexes"
+branch_labels = None
+depends_on = None
+
+# Months of partitions created ahead of the current one.
+MONTHS_AHEAD = 2
+
+
+def _enabled() -> bool:
+    flag = context.get_x_argument(as_dictionary=True).get("discovery_partitions", "")
+    return op.get_bind().dialect.name == "postgresql" and flag.lower() in {"1", "true", "yes"}
+
+
+def upgrade() -> None:
+    if not _enabled():
+        return
+    op.execute("ALTER TABLE aps_discovery RENAME TO aps_discovery_unpartitioned")
+    op.execute(
+        "ALTER TABLE aps_discovery_unpartitioned "
+        "RENAME CONSTRAINT aps_discovery_pkey TO aps_discovery_unpartitioned_pkey"
+    )
+    op.execute(
+        "ALTER INDEX ix_aps_discovery_accession_number "
+        "RENAME TO ix_aps_discovery_unpartitioned_accession_number"
+    )
+    op.execute(
+        "CREATE TABLE aps_discovery (LIKE aps_discovery_unpartitioned INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (discovered_at)"
+    )
+    op.execute("ALTER TABLE aps_discovery ALTER COLUMN discovered_at SET NOT NULL")
+    op.execute(
+        "ALTER TABLE aps_discovery ADD PRIMARY KEY (run_id, accession_number, discovered_at)"
+    )
+    op.execute(
+        "ALTER TABLE aps_discovery ADD FOREIGN KEY (run_id) "
+        "REFERENCES aps_query_run (run_id) ON DELETE CASCADE"
+    )
+    op.execute(
+        "ALTER TABLE aps_discovery ADD FOREIGN KEY (accession_number) "
+        "REFERENCES aps_document (accession_number) ON DELETE CASCADE"
+    )
+    op.execute("CREATE INDEX ix_aps_discovery_accession_number ON aps_discovery (accession_number)")
+    op.execute(
+        "UPDATE aps_discovery_unpartitioned AS discovery "
+        "SET discovered_at = coalesce(run.started_at, discovery.discovered_at, now()) "
+        "FROM aps_query_run AS run WHERE run.run_id = discovery.run_id"
+    )
+    op.execute("CREATE TABLE aps_discovery_default PARTITION OF aps_discovery DEFAULT")
+    op.execute(
+        "CREATE UNIQUE INDEX aps_discovery_default_run_accession "
+        "ON aps_discovery_default (run_id, accession_number)"
+    )
+    op.execute(
+        f"""
+DO $$
+DECLARE
+    part_month date;
+    part_name text;
+BEGIN
+    FOR part_month IN
+        SELECT series::date
+        FROM generate_series(
+            (
+                SELECT date_trunc('month', coalesce(min(discovered_at), now()) AT TIME ZONE 'UTC')
+                FROM aps_discovery_unpartitioned
+            ),
+            date_trunc('month', now() AT TIME ZONE 'UTC') + interval '{MONTHS_AHEAD} months',
+            interval '1 month'
+        ) AS series
+    LOOP
+        part_name := format(
+            'aps_discovery_y%sm%s', to_char(part_month, 'YYYY'), to_char(part_month, 'MM')
+        );
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF aps_discovery FOR VALUES FROM (%L) TO (%L)',
+            part_name,
+            part_month::text || ' 00:00:00+00',
+            (part_month + interval '1 month')::date::text || ' 00:00:00+00'
+        );
+        EXECUTE format(
+            'CREATE UNIQUE INDEX %I ON %I (run_id, accession_number)',
+            part_name || '_run_accession',
+            part_name
+        );
+    END LOOP;
+END
+$$
+"""
+    )
+    op.execute("INSERT INTO aps_discovery SELECT * FROM aps_discovery_unpartitioned")
+    op.execute("DROP TABLE aps_discovery_unpartitioned")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(
+        """
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('aps_discovery')
+    ) THEN
+        ALTER TABLE aps_discovery RENAME TO aps_discovery_partitioned;
+        ALTER INDEX ix_aps_discovery_accession_number
+            RENAME TO ix_aps_discovery_partitioned_accession_number;
+        CREATE TABLE aps_discovery (
+            LIKE aps_discovery_partitioned INCLUDING DEFAULTS,
+            PRIMARY KEY (run_id, accession_number),
+            FOREIGN KEY (run_id) REFERENCES aps_query_run (run_id) ON DELETE CASCADE,
+            FOREIGN KEY (accession_number)
+                REFERENCES aps_document (accession_number) ON DELETE CASCADE
+        );
+        ALTER TABLE aps_discovery ALTER COLUMN discovered_at DROP NOT NULL;
+        CREATE INDEX ix_aps_discovery_accession_number ON aps_discovery (accession_number);
+        INSERT INTO aps_discovery SELECT * FROM aps_discovery_partitioned
+            ORDER BY discovered_at
+            ON CONFLICT DO NOTHING;
+        DROP TABLE aps_discovery_partitioned;
+    END IF;
+END
+$$
+"""
+    )
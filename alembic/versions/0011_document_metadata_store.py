@@ -0,0 +1,34 @@
+"""Add the content-addressed aps_document_metadata store.
+
+Revision ID: 0011_document_metadata_store
+Revises: 0010_discovery_partitions
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0011_document_metadata_store"
+down_revision = "0010_discovery_partitions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "aps_document_metadata",
+        sa.Column("content_hash", sa.Text(), primary_key=True),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.Column("raw_size", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    if op.get_bind().dialect.name == "postgresql":
+        # Payloads are already zlib-compressed; skip TOAST's own compression attempt.
+        op.execute("ALTER TABLE aps_document_metadata ALTER COLUMN payload SET STORAGE EXTERNAL")
+
+
+def downgrade() -> None:
+    op.drop_table("aps_document_metadata")
@@ -0,0 +1,79 @@
+"""Key aps_discovery by (run_id, accession_number, discovered_at).
+
+Matches the primary key the partitioned layout (0010) needs, which must include the
+partition key; (run_id, accession_number) stays unique through its own index. Discoveries
+without a discovered_at take their run's started_at. The partitioned layout already has
+this key, so it is left alone.
+
+Revision ID: 0012_discovery_primary_key
+Revises: 0011_document_metadata_store
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0012_discovery_primary_key"
+down_revision = "0011_document_metadata_store"
+branch_labels = None
+depends_on = None
+
+
+def _partitioned() -> bool:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    return bool(
+        bind.scalar(
+            sa.text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = to_regclass('aps_discovery'))"
+            )
+        )
+    )
+
+
+def upgrade() -> None:
+    if _partitioned():
+        return
+    op.execute(
+        "UPDATE aps_discovery SET discovered_at = coalesce("
+        "(SELECT started_at FROM aps_query_run "
+        "WHERE aps_query_run.run_id = aps_discovery.run_id), CURRENT_TIMESTAMP) "
+        "WHERE discovered_at IS NULL"
+    )
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_constraint("aps_discovery_pkey", "aps_discovery", type_="primary")
+        op.alter_column("aps_discovery", "discovered_at", nullable=False)
+        op.create_primary_key(
+            "aps_discovery_pkey", "aps_discovery", ["run_id", "accession_number", "discovered_at"]
+        )
+    else:
+        with op.batch_alter_table("aps_discovery", recreate="always") as batch_op:
+            batch_op.alter_column("discovered_at", nullable=False)
+            batch_op.create_primary_key(
+                "aps_discovery_pkey", ["run_id", "accession_number", "discovered_at"]
+            )
+    op.create_index(
+        "uq_aps_discovery_run_accession",
+        "aps_discovery",
+        ["run_id", "accession_number"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    if _partitioned():
+        return
+    op.drop_index("uq_aps_discovery_run_accession", table_name="aps_discovery")
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_constraint("aps_discovery_pkey", "aps_discovery", type_="primary")
+        op.create_primary_key("aps_discovery_pkey", "aps_discovery", ["run_id", "accession_number"])
+        op.alter_column("aps_discovery", "discovered_at", nullable=True)
+    else:
+        with op.batch_alter_table("aps_discovery", recreate="always") as batch_op:
+            batch_op.create_primary_key("aps_discovery_pkey", ["run_id", "accession_number"])
+            batch_op.alter_column("discovered_at", nullable=True)
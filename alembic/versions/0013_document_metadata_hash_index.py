@@ -0,0 +1,37 @@
+"""Index aps_document.metadata_hash for pruning the metadata store.
+
+Revision ID: 0013_document_metadata_hash_index
+Revises: 0012_discovery_primary_key
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "0013_document_metadata_hash_index"
+down_revision = "0012_discovery_primary_key"
+branch_labels = None
+depends_on = None
+
+INDEX = ("ix_aps_document_metadata_hash", "aps_document", ["metadata_hash"])
+
+
+def upgrade() -> None:
+    name, table, columns = INDEX
+    # On Postgres, build without blocking writes; CONCURRENTLY cannot run in a transaction.
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        return
+    op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    name, table, _ = INDEX
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+        return
+    op.drop_index(name, table_name=table)
@@ -1,13 +1,16 @@
 """APS ETL package."""
 
 from aps_etl.canonical import canon_json_bytes, request_fingerprint, sha256_hex
-from aps_etl.client import APSClient
-from aps_etl.registry import QueryDefinition, load_registry
+from aps_etl.client import APSClient, AsyncAPSClient
+from aps_etl.registry import CompiledRegistry, QueryDefinition, compile_registry, load_registry
 
 __all__ = [
     "APSClient",
+    "AsyncAPSClient",
+    "CompiledRegistry",
     "QueryDefinition",
     "canon_json_bytes",
+    "compile_registry",
     "load_registry",
     "request_fingerprint",
     "sha256_hex",
@@ -0,0 +1,506 @@
+"""Asyncio runner executing registry queries concurrently."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Coroutine, Sequence
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from aps_etl.client import AsyncAPSClient
+from aps_etl.db import AccessionCache, create_session_factory
+from aps_etl.models import APSQueryRun, APSQueryState
+from aps_etl.registry import QueryDefinition, compile_registry, with_date_range
+from aps_etl.runner import (
+    DATE_WINDOW_FIELD,
+    RunOptions,
+    behind_watermark,
+    build_accession_cache,
+    build_rate_limiter,
+    build_response_cache,
+    cached_wire_format,
+    checkpoint_page,
+    empty_window,
+    fail_query_run,
+    finish_query_run,
+    mark_page_cap_reached,
+    mark_watermark_cutoff,
+    pending_windows,
+    plan_window,
+    prepare_discovery_partitions,
+    prepare_query,
+    record_page,
+    record_wire_format,
+    resume_query_run,
+    secondary_api_keys,
+    seed_shards,
+    settle_window,
+    start_query_run,
+    watermark_cutoff,
+    window_overflows,
+    windowed_query,
+)
+from aps_etl.serialization import serialize_query
+from aps_etl.settings import Settings
+
+
+def build_async_client(settings: Settings) -> AsyncAPSClient:
+    """Build an asyncio APS client."""
+
+    return AsyncAPSClient(
+        base_url=settings.aps_base_url,
+        api_key=settings.aps_primary_key,
+        secondary_api_keys=secondary_api_keys(settings),
+        timeout_s=settings.request_timeout_s,
+        retry_max_attempts=settings.retry_max_attempts,
+        retry_min_wait_s=settings.retry_min_wait_s,
+        retry_max_wait_s=settings.retry_max_wait_s,
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry_s=settings.http_keepalive_expiry_s,
+        http2=settings.http2,
+        response_cache=build_response_cache(settings),
+        rate_limiter=build_rate_limiter(settings),
+    )
+
+
+def run_all_queries_async(
+    settings: Settings,
+    *,
+    registry_path: Path,
+    schema_path: Path,
+) -> None:
+    """Run all enabled queries in the registry concurrently."""
+
+    asyncio.run(_run_all_queries(settings, registry_path=registry_path, schema_path=schema_path))
+
+
+async def _run_all_queries(
+    settings: Settings,
+    *,
+    registry_path: Path,
+    schema_path: Path,
+) -> None:
+    engine = create_engine(settings.database_url, future=True)
+    session_factory = create_session_factory(engine)
+    registry = compile_registry(registry_path, schema_path)
+    schema_version = registry.version
+    queries = registry.enabled_queries()
+
+    async with build_async_client(settings) as client:
+        with session_factory() as session:
+            prepare_discovery_partitions(settings, session)
+            accession_cache = build_accession_cache(settings, session)
+            await run_queries_async(
+                session=session,
+                client=client,
+                queries=queries,
+                schema_version=schema_version,
+                max_pages=settings.max_pages_per_window,
+                concurrency=settings.query_concurrency,
+                options=RunOptions.from_settings(settings),
+                accession_cache=accession_cache,
+            )
+
+
+async def run_queries_async(
+    *,
+    session: Session,
+    client: AsyncAPSClient,
+    queries: Sequence[QueryDefinition],
+    schema_version: str,
+    max_pages: int,
+    concurrency: int,
+    options: RunOptions | None = None,
+    accession_cache: AccessionCache | None = None,
+) -> None:
+    """
+    Run queries concurrently, at most `concurrency` at a time.
+
+    All coroutines share one session on the event loop thread, so database writes never
+    overlap; only network waits do. Separate sessions would hold separate transactions on
+    that one thread, and a row lock held by one query would stall the whole loop. Instead
+    each query writes inside savepoints (see `run_query_async`), so a database error rolls
+    back only that query's write. A failing query is recorded as failed without
+    cancelling the others, and the first error is re-raised once every query has finished
+    and the session has been committed.
+    """
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _run(query: QueryDefinition) -> None:
+        async with semaphore:
+            await run_query_async(
+                session=session,
+                client=client,
+                query=query,
+                schema_version=schema_version,
+                max_pages=max_pages,
+                options=options,
+                accession_cache=accession_cache,
+            )
+
+    outcomes = await asyncio.gather(*(_run(query) for query in queries), return_exceptions=True)
+    session.commit()
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            raise outcome
+
+
+async def run_query_async(
+    *,
+    session: Session,
+    client: AsyncAPSClient,
+    query: QueryDefinition,
+    schema_version: str,
+    max_pages: int,
+    options: RunOptions | None = None,
+    accession_cache: AccessionCache | None = None,
+) -> None:
+    """
+    Run a single query with pagination on the event loop.
+
+    Every write between two awaits runs in its own savepoint. The session may be shared
+    with other queries, so a failed write must not leave it needing a rollback.
+    """
+
+    options = options or RunOptions()
+    with session.begin_nested():
+        state = prepare_query(session, query)
+        query_run = resume_query_run(session, state) if options.resume else None
+        window = plan_window(session, query, state, options) if query_run is None else None
+        if empty_window(query, window):
+            return
+        wire_format = (
+            cached_wire_format(session, query, state, client.base_url, options)
+            if query_run is None
+            else None
+        )
+    if query_run is None:
+        probed = None if wire_format is not None else await client.probe_wire_format()
+        with session.begin_nested():
+            if probed is not None:
+                wire_format = record_wire_format(session, state, client.base_url, probed)
+            assert wire_format is not None
+            query_run = start_query_run(
+                session,
+                query=query,
+                state=state,
+                wire_format=wire_format,
+                search_url=client.search_url,
+                schema_version=schema_version,
+                window=window,
+            )
+    query = windowed_query(query, query_run)
+    try:
+        skip = state.checkpoint_skip or 0
+        page_number = state.checkpoint_page or 0
+        if options.shards > 1 and query_run.window_start is not None:
+            seed_shards(query_run, options.shards)
+            page_number = await paginate_windows_async(
+                session,
+                client,
+                query,
+                query_run,
+                state,
+                max_pages=max_pages,
+                page_number=page_number,
+                options=options,
+                accession_cache=accession_cache,
+            )
+        elif not options.bisect_windows or query_run.window_start is None:
+            pages_fetched, page_number = await paginate_async(
+                session,
+                client,
+                query,
+                query_run,
+                state,
+                max_pages=max_pages,
+                start_skip=skip,
+                page_number=page_number,
+                options=options,
+                accession_cache=accession_cache,
+                cutoff=watermark_cutoff(session, query, state, options),
+            )
+            if pages_fetched >= max_pages and query_run.stop_reason is None:
+                mark_page_cap_reached(query_run)
+        while options.bisect_windows and (windows := pending_windows(query_run)):
+            page_number, partial = await paginate_window_async(
+                session,
+                client,
+                query,
+                query_run,
+                state,
+                windows[0],
+                max_pages=max_pages,
+                start_skip=skip,
+                page_number=page_number,
+                options=options,
+                accession_cache=accession_cache,
+            )
+            if partial:
+                mark_page_cap_reached(query_run)
+            skip = state.checkpoint_skip = 0
+        finish_query_run(state, query_run)
+    except Exception as exc:
+        fail_query_run(session, query_run, exc)
+        raise
+    finally:
+        if query_run.ended_at is None:
+            query_run.ended_at = datetime.utcnow()
+
+
+async def paginate_async(
+    session: Session,
+    client: AsyncAPSClient,
+    query: QueryDefinition,
+    query_run: APSQueryRun,
+    state: APSQueryState,
+    *,
+    max_pages: int,
+    start_skip: int,
+    page_number: int,
+    options: RunOptions,
+    accession_cache: AccessionCache | None,
+    cutoff: date | None = None,
+) -> tuple[int, int]:
+    """
+    Fetch and record up to max_pages pages of one query window on the event loop.
+
+    With `stream_results` set, each page is recorded in batches of `stream_batch_size`
+    results while its response is still streaming. Given a `cutoff` date, paging stops
+    after the first page that is `behind_watermark`.
+    """
+
+    skip = start_skip
+    pages_fetched = 0
+    while pages_fetched < max_pages:
+        payload = serialize_query(query, wire_format=query_run.wire_format, skip=skip)
+        if options.stream_results:
+            page_size = 0
+            behind = cutoff is not None
+            batches = _batched(client.search_stream(payload), max(1, options.stream_batch_size))
+            async for batch in batches:
+                if page_size == 0:
+                    page_number += 1
+                if behind:
+                    assert cutoff is not None
+                    behind = behind_watermark(session, batch, cutoff)
+                with session.begin_nested():
+                    record_page(
+                        session,
+                        query_run,
+                        batch,
+                        skip,
+                        page_number,
+                        options=options,
+                        accession_cache=accession_cache,
+                    )
+                page_size += len(batch)
+            if page_size == 0:
+                break
+            pages_fetched += 1
+            skip += page_size
+            checkpoint_page(session, state, skip, page_number, options)
+            if behind:
+                assert cutoff is not None
+                mark_watermark_cutoff(query_run, page_number, cutoff)
+                break
+            continue
+        response = await client.search(payload)
+        results = response.get("results", [])
+        if not results:
+            break
+        page_number += 1
+        pages_fetched += 1
+        behind = cutoff is not None and behind_watermark(session, results, cutoff)
+        with session.begin_nested():
+            record_page(
+                session,
+                query_run,
+                results,
+                skip,
+                page_number,
+                options=options,
+                accession_cache=accession_cache,
+            )
+        skip += len(results)
+        checkpoint_page(session, state, skip, page_number, options)
+        if behind:
+            assert cutoff is not None
+            mark_watermark_cutoff(query_run, page_number, cutoff)
+            break
+    return pages_fetched, page_number
+
+
+async def paginate_window_async(
+    session: Session,
+    client: AsyncAPSClient,
+    query: QueryDefinition,
+    query_run: APSQueryRun,
+    state: APSQueryState,
+    window: tuple[date, date],
+    *,
+    max_pages: int,
+    start_skip: int,
+    page_number: int,
+    options: RunOptions,
+    accession_cache: AccessionCache | None,
+) -> tuple[int, bool]:
+    """
+    Fetch one pending window of a bisected run on the event loop and settle it.
+
+    Mirrors `paginate_window`: an overflowing window is split after its first page, and
+    a paged window only counts as capped if a page beyond the cap still has results.
+    Returns (last_page_number, partial).
+    """
+
+    windowed = with_date_range(query, DATE_WINDOW_FIELD, *window)
+    skip = start_skip
+    pages_fetched = 0
+    if skip == 0 and max_pages > 0:
+        response = await client.search(
+            serialize_query(windowed, wire_format=query_run.wire_format, skip=0)
+        )
+        results = response.get("results", [])
+        if not results or (window[0] < window[1] and window_overflows(response, max_pages)):
+            with session.begin_nested():
+                partial = settle_window(query_run, window, 0, capped=bool(results))
+            return page_number, partial
+        page_number += 1
+        pages_fetched = 1
+        with session.begin_nested():
+            record_page(
+                session,
+                query_run,
+                results,
+                skip,
+                page_number,
+                options=options,
+                accession_cache=accession_cache,
+            )
+        skip += len(results)
+        checkpoint_page(session, state, skip, page_number, options)
+    if pages_fetched < max_pages:
+        more, page_number = await paginate_async(
+            session,
+            client,
+            windowed,
+            query_run,
+            state,
+            max_pages=max_pages - pages_fetched,
+            start_skip=skip,
+            page_number=page_number,
+            options=options,
+            accession_cache=accession_cache,
+        )
+        pages_fetched += more
+        skip = state.checkpoint_skip or skip
+    capped = False
+    if pages_fetched >= max_pages:
+        beyond = await client.search(
+            serialize_query(windowed, wire_format=query_run.wire_format, skip=skip)
+        )
+        capped = bool(beyond.get("results"))
+    return page_number, settle_window(query_run, window, pages_fetched, capped=capped)
+
+
+async def _batched[T](entries: AsyncIterator[T], size: int) -> AsyncIterator[list[T]]:
+    batch: list[T] = []
+    async for entry in entries:
+        batch.append(entry)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def paginate_windows_async(
+    session: Session,
+    client: AsyncAPSClient,
+    query: QueryDefinition,
+    query_run: APSQueryRun,
+    state: APSQueryState,
+    *,
+    max_pages: int,
+    page_number: int,
+    options: RunOptions,
+    accession_cache: AccessionCache | None,
+) -> int:
+    """
+    Fetch the run's pending windows concurrently, at most `options.shards` at a time.
+
+    Windows restart from skip 0 on resume. With `bisect_windows` set, halves of capped
+    windows are fetched in the next round; as in `paginate_window_async`, an overflowing
+    window is split after its first page. If a window fails, the others are cancelled
+    before the error propagates, so none writes to the run after it has failed. Returns
+    the last page number.
+    """
+
+    semaphore = asyncio.Semaphore(options.shards)
+    started: set[tuple[date, date]] = set()
+
+    async def run_window(window: tuple[date, date]) -> None:
+        nonlocal page_number
+        windowed = with_date_range(query, DATE_WINDOW_FIELD, *window)
+        splittable = options.bisect_windows and window[0] < window[1]
+        skip = 0
+        pages_fetched = 0
+        capped = False
+        async with semaphore:
+            while pages_fetched < max_pages:
+                payload = serialize_query(windowed, wire_format=query_run.wire_format, skip=skip)
+                response = await client.search(payload)
+                results = response.get("results", [])
+                if not results:
+                    break
+                if skip == 0 and splittable and window_overflows(response, max_pages):
+                    capped = True
+                    break
+                page_number += 1
+                pages_fetched += 1
+                with session.begin_nested():
+                    record_page(
+                        session,
+                        query_run,
+                        results,
+                        skip,
+                        page_number,
+                        options=options,
+                        accession_cache=accession_cache,
+                    )
+                skip += len(results)
+                checkpoint_page(session, state, 0, page_number, options)
+            if pages_fetched >= max_pages:
+                payload = serialize_query(windowed, wire_format=query_run.wire_format, skip=skip)
+                capped = bool((await client.search(payload)).get("results"))
+        partial = settle_window(
+            query_run, window, pages_fetched, capped=capped, split=options.bisect_windows
+        )
+        if partial:
+            mark_page_cap_reached(query_run)
+
+    while windows := [window for window in pending_windows(query_run) if window not in started]:
+        started.update(windows)
+        await _gather_or_cancel([run_window(window) for window in windows])
+    return page_number
+
+
+async def _gather_or_cancel(coroutines: Sequence[Coroutine[Any, Any, None]]) -> None:
+    """Run coroutines concurrently; on the first failure, cancel and await the rest."""
+
+    tasks = [asyncio.create_task(coroutine) for coroutine in coroutines]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    for task in done:
+        if not task.cancelled() and (error := task.exception()) is not None:
+            raise error
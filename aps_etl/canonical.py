@@ -4,8 +4,12 @@ from __future__ import annotations
 
 import hashlib
 import json
+import zlib
 from typing import Any
 
+# zlib level for stored metadata; higher levels gain little on canonical JSON.
+METADATA_COMPRESSION_LEVEL = 6
+
 
 def canon_json_bytes(payload: Any) -> bytes:
     """Return canonical JSON bytes for deterministic hashing."""
@@ -14,6 +18,18 @@ def canon_json_bytes(payload: Any) -> bytes:
     return normalized.encode("utf-8")
 
 
+def compress_canonical(payload: Any) -> bytes:
+    """Return zlib-compressed canonical JSON bytes for storage."""
+
+    return zlib.compress(canon_json_bytes(payload), METADATA_COMPRESSION_LEVEL)
+
+
+def decompress_canonical(data: bytes) -> Any:
+    """Decode a payload stored by `compress_canonical`."""
+
+    return json.loads(zlib.decompress(data))
+
+
 def sha256_hex(payload: Any) -> str:
     """Return the SHA256 hex digest for canonical JSON payloads."""
 
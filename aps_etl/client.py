@@ -2,13 +2,56 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+import importlib.util
+import logging
+from collections.abc import AsyncIterator, Callable, Iterator
+from dataclasses import dataclass, field
+from types import TracebackType
 from typing import Any
 
 import httpx
-from tenacity import Retrying, retry_if_exception_type, stop_after_attempt, wait_exponential
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    Retrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential,
+)
 
-from aps_etl.serialization import serialize_query
+from aps_etl.canonical import request_fingerprint
+from aps_etl.json_stream import PageSummary, ResultsParser
+from aps_etl.key_pool import KeyPool
+from aps_etl.rate_limit import RateLimiter, retry_after_seconds
+from aps_etl.registry import (
+    Libraries,
+    QueryDefinition,
+    SortSpec,
+    compile_date_range_filter,
+)
+from aps_etl.response_cache import ResponseCache
+from aps_etl.serialization import payload_wire_format, serialize_query
+
+logger = logging.getLogger(__name__)
+
+API_KEY_HEADER = "Ocp-Apim-Subscription-Key"
+
+# Cheapest request that still exercises the A/B differences (filter keys, range operator,
+# sort direction): a plain search over a single day, main library only, without content.
+WIRE_FORMAT_PROBE_QUERY = QueryDefinition(
+    query_id="wire-format-probe",
+    name="Wire format probe",
+    q="NuScale",
+    filters_and=(compile_date_range_filter("DateAddedTimestamp", "2024-01-23", "2024-01-23"),),
+    filters_or=(),
+    libraries=Libraries(legacy=False, main=True),
+    sort=SortSpec(field="DateAddedTimestamp", direction="DESC"),
+    content=False,
+    safety_buffer_days=0,
+    wire_format=None,
+    enabled=True,
+)
 
 
 class APSClientError(RuntimeError):
@@ -19,9 +62,28 @@ class APSUnauthorizedError(APSClientError):
     """Raised when APS returns 401/403."""
 
 
+class APSRequestRejectedError(APSClientError):
+    """Raised when APS returns 400/422, i.e. it could not accept the request body."""
+
+
+def accept_encoding() -> str:
+    """Return the Accept-Encoding header value for the installed decoders."""
+
+    encodings = ["gzip", "deflate"]
+    if any(importlib.util.find_spec(name) for name in ("brotli", "brotlicffi")):
+        encodings.append("br")
+    return ", ".join(encodings)
+
+
+def http2_available() -> bool:
+    """Return True if the h2 package httpx needs for HTTP/2 is installed."""
+
+    return importlib.util.find_spec("h2") is not None
+
+
 @dataclass
-class APSClient:
-    """Client for APS API access."""
+class _APSClientBase:
+    """Configuration and response handling shared by the sync and async clients."""
 
     base_url: str
     api_key: str
@@ -29,56 +91,395 @@ class APSClient:
     retry_max_attempts: int
     retry_min_wait_s: float
     retry_max_wait_s: float
+    max_connections: int = 10
+    max_keepalive_connections: int = 5
+    keepalive_expiry_s: float = 30.0
+    http2: bool = False
+    response_cache: ResponseCache | None = None
+    rate_limiter: RateLimiter | None = None
+    secondary_api_keys: tuple[str, ...] = ()
+    _key_pool: KeyPool = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._key_pool = KeyPool((self.api_key, *self.secondary_api_keys))
+
+    @property
+    def search_url(self) -> str:
+        return f"{self.base_url}/aps/api/search"
+
+    def _cache_key(self, payload: dict[str, Any]) -> str:
+        return request_fingerprint(
+            method="POST",
+            url=self.search_url,
+            wire_format=payload_wire_format(payload),
+            body=payload,
+        )
+
+    def _cached(self, payload: dict[str, Any]) -> tuple[str | None, dict[str, Any] | None]:
+        if self.response_cache is None:
+            return None, None
+        key = self._cache_key(payload)
+        return key, self.response_cache.get(key)
+
+    def _store(self, key: str | None, result: dict[str, Any]) -> None:
+        if key is not None and self.response_cache is not None:
+            self.response_cache.put(key, result)
 
     def _headers(self) -> dict[str, str]:
         return {
-            "Ocp-Apim-Subscription-Key": self.api_key,
             "Accept": "application/json",
+            "Accept-Encoding": accept_encoding(),
             "Content-Type": "application/json",
         }
 
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry_s,
+        )
+
+    def _use_http2(self) -> bool:
+        if self.http2 and not http2_available():
+            logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1.")
+            return False
+        return self.http2
+
+    def _retry_kwargs(self) -> dict[str, Any]:
+        return {
+            "retry": retry_if_exception_type(httpx.HTTPError),
+            "stop": stop_after_attempt(self.retry_max_attempts),
+            "wait": self._retry_wait(),
+            "reraise": True,
+        }
+
+    def _retry_wait(self) -> Callable[[RetryCallState], float]:
+        backoff = wait_exponential(
+            multiplier=1,
+            min=self.retry_min_wait_s,
+            max=self.retry_max_wait_s,
+        )
+
+        def wait(retry_state: RetryCallState) -> float:
+            exc = retry_state.outcome.exception() if retry_state.outcome is not None else None
+            if isinstance(exc, httpx.HTTPStatusError):
+                delay = retry_after_seconds(exc.response)
+                if delay is not None:
+                    return min(delay, self.retry_max_wait_s)
+            return backoff(retry_state)
+
+        return wait
+
+    def _next_key(self) -> str:
+        key = self._key_pool.next_key()
+        if key is None:
+            raise APSUnauthorizedError("APS API authentication failed for every key.")
+        return key
+
+    def _finish(self, key: str, response: httpx.Response | None) -> None:
+        retry_after_s = retry_after_seconds(response) if response is not None else None
+        throttled = False
+        pause_s = None
+        if response is not None:
+            self._key_pool.report(key, response.status_code, retry_after_s)
+            throttled = response.status_code == 429 or response.status_code >= 500
+            # A 429 only cools down its own key; every caller waits only once no other key
+            # can take over. A 5xx Retry-After is about the service, so it always applies.
+            if response.status_code >= 500 or self._key_pool.available() == 0:
+                pause_s = retry_after_s
+        if self.rate_limiter is not None:
+            self.rate_limiter.release(throttled=throttled, retry_after_s=pause_s)
+
+    def _fail_over(self, response: httpx.Response) -> bool:
+        return response.status_code in {401, 403, 429} and self._key_pool.available() > 0
+
     def _raise_for_status(self, response: httpx.Response) -> None:
         if response.status_code in {401, 403}:
             raise APSUnauthorizedError("APS API authentication failed.")
         if response.status_code in {429} or response.status_code >= 500:
             response.raise_for_status()
+        if response.status_code in {400, 422}:
+            raise APSRequestRejectedError(
+                f"APS rejected the request with status {response.status_code}."
+            )
         if response.status_code >= 400:
             raise APSClientError(f"APS request failed with status {response.status_code}.")
 
-    def _request(self, method: str, url: str, json: dict[str, Any]) -> httpx.Response:
-        with httpx.Client(timeout=self.timeout_s, headers=self._headers()) as client:
-            response = client.request(method, url, json=json)
-        self._raise_for_status(response)
+
+@dataclass
+class APSClient(_APSClientBase):
+    """Client for APS API access."""
+
+    _http: httpx.Client | None = field(default=None, init=False, repr=False)
+    _wire_format: str | None = field(default=None, init=False, repr=False)
+
+    def _session(self) -> httpx.Client:
+        if self._http is None:
+            self._http = httpx.Client(
+                timeout=self.timeout_s,
+                headers=self._headers(),
+                limits=self._limits(),
+                http2=self._use_http2(),
+            )
+        return self._http
+
+    def open(self) -> None:
+        """Open the pooled HTTP session if it is not already open."""
+
+        self._session()
+
+    def close(self) -> None:
+        """Close the pooled HTTP session and release its connections."""
+
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+    def __enter__(self) -> APSClient:
+        self.open()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def _request(
+        self, method: str, url: str, json: dict[str, Any], *, stream: bool = False
+    ) -> httpx.Response:
+        for _ in self._key_pool.keys:
+            response = self._send(method, url, json, stream=stream)
+            if not self._fail_over(response):
+                break
+            response.close()
+        try:
+            self._raise_for_status(response)
+        except Exception:
+            response.close()
+            raise
+        return response
+
+    def _send(self, method: str, url: str, json: dict[str, Any], *, stream: bool) -> httpx.Response:
+        key = self._next_key()
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        session = self._session()
+        request = session.build_request(method, url, json=json, headers={API_KEY_HEADER: key})
+        response = None
+        try:
+            response = session.send(request, stream=stream)
+        finally:
+            self._finish(key, response)
         return response
 
     def search(self, payload: dict[str, Any]) -> dict[str, Any]:
-        """POST a search request to APS."""
-
-        url = f"{self.base_url}/aps/api/search"
-        retrying = Retrying(
-            retry=retry_if_exception_type(httpx.HTTPError),
-            stop=stop_after_attempt(self.retry_max_attempts),
-            wait=wait_exponential(
-                multiplier=1,
-                min=self.retry_min_wait_s,
-                max=self.retry_max_wait_s,
-            ),
-            reraise=True,
-        )
-        for attempt in retrying:
+        """POST a search request to APS, serving it from the response cache when possible."""
+
+        key, cached = self._cached(payload)
+        if cached is not None:
+            return cached
+        for attempt in Retrying(**self._retry_kwargs()):
+            with attempt:
+                response = self._request("POST", self.search_url, json=payload)
+                result = response.json()
+                self._store(key, result)
+                return result
+        raise APSClientError("Retry loop failed unexpectedly.")
+
+    def search_stream(
+        self, payload: dict[str, Any], summary: PageSummary | None = None
+    ) -> Iterator[dict[str, Any]]:
+        """
+        POST a search request and yield its `results` entries while the body is read.
+
+        Retries cover sending the request only; an error once entries are flowing is
+        raised to the caller. Cached responses are replayed, but streamed bodies are not
+        cached. `summary` receives the response's other members once the body is read.
+        """
+
+        summary = summary if summary is not None else PageSummary()
+        _, cached = self._cached(payload)
+        if cached is not None:
+            yield from _replay(cached, summary)
+            return
+        response = self._open_stream(payload)
+        try:
+            parser = ResultsParser(summary=summary)
+            for chunk in response.iter_bytes():
+                yield from parser.feed(chunk)
+            yield from parser.close()
+        finally:
+            response.close()
+
+    def _open_stream(self, payload: dict[str, Any]) -> httpx.Response:
+        for attempt in Retrying(**self._retry_kwargs()):
+            with attempt:
+                return self._request("POST", self.search_url, json=payload, stream=True)
+        raise APSClientError("Retry loop failed unexpectedly.")
+
+    def probe_wire_format(self, query: Any = None) -> str:
+        """
+        Probe APS to determine wire-format support.
+
+        Without a query the minimal `WIRE_FORMAT_PROBE_QUERY` is sent, and the result is
+        remembered for the client's lifetime so an endpoint is probed at most once. Only a
+        rejected format-A body falls back to format B; any other failure propagates and
+        nothing is remembered.
+        """
+
+        if query is not None:
+            return self._probe(query)
+        if self._wire_format is None:
+            self._wire_format = self._probe(WIRE_FORMAT_PROBE_QUERY)
+        return self._wire_format
+
+    def _probe(self, query: Any) -> str:
+        try:
+            self.search(serialize_query(query, wire_format="A", skip=0))
+            return "A"
+        except APSRequestRejectedError:
+            self.search(serialize_query(query, wire_format="B", skip=0))
+            return "B"
+
+
+@dataclass
+class AsyncAPSClient(_APSClientBase):
+    """Asyncio client for APS API access, sharing retry and status rules with APSClient."""
+
+    _http: httpx.AsyncClient | None = field(default=None, init=False, repr=False)
+    _wire_format: str | None = field(default=None, init=False, repr=False)
+    _probe_lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False, repr=False)
+
+    def _session(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout_s,
+                headers=self._headers(),
+                limits=self._limits(),
+                http2=self._use_http2(),
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP session and release its connections."""
+
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def __aenter__(self) -> AsyncAPSClient:
+        self._session()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+    async def _request(
+        self, method: str, url: str, json: dict[str, Any], *, stream: bool = False
+    ) -> httpx.Response:
+        for _ in self._key_pool.keys:
+            response = await self._send(method, url, json, stream=stream)
+            if not self._fail_over(response):
+                break
+            await response.aclose()
+        try:
+            self._raise_for_status(response)
+        except Exception:
+            await response.aclose()
+            raise
+        return response
+
+    async def _send(
+        self, method: str, url: str, json: dict[str, Any], *, stream: bool
+    ) -> httpx.Response:
+        key = self._next_key()
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async()
+        session = self._session()
+        request = session.build_request(method, url, json=json, headers={API_KEY_HEADER: key})
+        response = None
+        try:
+            response = await session.send(request, stream=stream)
+        finally:
+            self._finish(key, response)
+        return response
+
+    async def search(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """POST a search request to APS, serving it from the response cache when possible."""
+
+        key, cached = self._cached(payload)
+        if cached is not None:
+            return cached
+        async for attempt in AsyncRetrying(**self._retry_kwargs()):
             with attempt:
-                response = self._request("POST", url, json=payload)
-                return response.json()
+                response = await self._request("POST", self.search_url, json=payload)
+                result = response.json()
+                self._store(key, result)
+                return result
         raise APSClientError("Retry loop failed unexpectedly.")
 
-    def probe_wire_format(self, query: Any) -> str:
-        """Probe APS to determine wire-format support for the query."""
+    async def search_stream(
+        self, payload: dict[str, Any], summary: PageSummary | None = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Asyncio counterpart of `APSClient.search_stream`."""
 
-        payload_a = serialize_query(query, wire_format="A", skip=0)
+        summary = summary if summary is not None else PageSummary()
+        _, cached = self._cached(payload)
+        if cached is not None:
+            for entry in _replay(cached, summary):
+                yield entry
+            return
+        response = await self._open_stream(payload)
         try:
-            self.search(payload_a)
+            parser = ResultsParser(summary=summary)
+            async for chunk in response.aiter_bytes():
+                for entry in parser.feed(chunk):
+                    yield entry
+            for entry in parser.close():
+                yield entry
+        finally:
+            await response.aclose()
+
+    async def _open_stream(self, payload: dict[str, Any]) -> httpx.Response:
+        async for attempt in AsyncRetrying(**self._retry_kwargs()):
+            with attempt:
+                return await self._request("POST", self.search_url, json=payload, stream=True)
+        raise APSClientError("Retry loop failed unexpectedly.")
+
+    async def probe_wire_format(self, query: Any = None) -> str:
+        """
+        Probe APS to determine wire-format support.
+
+        Mirrors `APSClient.probe_wire_format`; concurrent callers without a query share a
+        single probe.
+        """
+
+        if query is not None:
+            return await self._probe(query)
+        async with self._probe_lock:
+            if self._wire_format is None:
+                self._wire_format = await self._probe(WIRE_FORMAT_PROBE_QUERY)
+            return self._wire_format
+
+    async def _probe(self, query: Any) -> str:
+        try:
+            await self.search(serialize_query(query, wire_format="A", skip=0))
             return "A"
-        except APSClientError:
-            payload_b = serialize_query(query, wire_format="B", skip=0)
-            self.search(payload_b)
+        except APSRequestRejectedError:
+            await self.search(serialize_query(query, wire_format="B", skip=0))
             return "B"
+
+
+def _replay(page: dict[str, Any], summary: PageSummary) -> Iterator[dict[str, Any]]:
+    results = page.get("results") or []
+    summary.members.update((name, value) for name, value in page.items() if name != "results")
+    summary.result_count = len(results)
+    yield from results
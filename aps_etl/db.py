@@ -2,16 +2,127 @@
 
 from __future__ import annotations
 
-from collections.abc import Iterable
+from collections import OrderedDict
+from collections.abc import Iterable, Sequence
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import Engine, func, select
+from sqlalchemy import (
+    ColumnElement,
+    Engine,
+    and_,
+    case,
+    exists,
+    func,
+    null,
+    select,
+    type_coerce,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session, sessionmaker
 
-from aps_etl.models import APSDiscovery, APSDocument, APSQuery, APSQueryRun, APSQueryState
+from aps_etl.canonical import canon_json_bytes, compress_canonical, sha256_hex
+from aps_etl.models import (
+    APSDiscovery,
+    APSDocument,
+    APSDocumentMetadata,
+    APSEndpointState,
+    APSQuery,
+    APSQueryRun,
+    APSQueryState,
+    QueryRunStatus,
+)
+
+DOCUMENT_UPSERT_BATCH_SIZE = 500
+DISCOVERY_INSERT_BATCH_SIZE = 1000
+
+# Metadata columns left as they are when a rediscovered document's metadata_hash matches.
+HASHED_DOCUMENT_COLUMNS = (
+    "url",
+    "document_date",
+    "date_added_timestamp",
+    "document_type",
+    "docket_number",
+    "title",
+    "raw_metadata_json",
+)
+
+COALESCED_DOCUMENT_COLUMNS = (
+    "accession_number_lower",
+    *HASHED_DOCUMENT_COLUMNS,
+    "metadata_hash",
+    "last_seen_at",
+    "last_modified_at",
+)
+
+
+class AccessionCache:
+    """
+    Bounded LRU cache of lowercased accession to canonical accession.
+
+    Shared across pages and queries within a process so repeat accessions skip the
+    casing lookup against aps_document.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, str] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, accession_lower: str) -> str | None:
+        """Return the cached canonical accession, counting the hit or miss."""
+
+        canonical = self._entries.get(accession_lower)
+        if canonical is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(accession_lower)
+        self.hits += 1
+        return canonical
+
+    def put(self, accession_lower: str, canonical: str) -> None:
+        """Store a canonical accession, evicting the least recently used entry."""
+
+        if self.maxsize <= 0:
+            return
+        self._entries[accession_lower] = canonical
+        self._entries.move_to_end(accession_lower)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def warm(self, session: Session, *, limit: int | None = None, batch_size: int = 10_000) -> int:
+        """
+        Load up to `limit` accessions (at most the cache size); returns the number loaded.
+
+        Rows are streamed `batch_size` at a time in table order. Choosing the most recently
+        seen would need an index on last_seen_at, which every rediscovery has to update.
+        """
+
+        rows = self.maxsize if limit is None else min(self.maxsize, limit)
+        if rows <= 0:
+            return 0
+        stmt = (
+            select(APSDocument.accession_number_lower, APSDocument.accession_number)
+            .limit(rows)
+            .execution_options(yield_per=batch_size)
+        )
+        loaded = 0
+        for partition in session.execute(stmt).partitions():
+            for accession_lower, accession in partition:
+                self.put(accession_lower, accession)
+            loaded += len(partition)
+        return loaded
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss counters and current size."""
+
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
 
 
 def create_session_factory(engine: Engine) -> sessionmaker[Session]:
@@ -27,107 +138,221 @@ def resolve_accession(session: Session, raw_accession: str) -> tuple[str, str]:
     Returns (canonical_accession, accession_lower).
     """
 
-    normalized = raw_accession.strip().lower()
-    existing_accession = session.scalar(
-        select(APSDocument.accession_number).where(APSDocument.accession_number_lower == normalized)
+    accession_lower = raw_accession.strip().lower()
+    canonical_accession = resolve_accessions(session, [raw_accession])[accession_lower]
+    return canonical_accession, canonical_accession.lower()
+
+
+def resolve_accessions(
+    session: Session,
+    raw_accessions: Iterable[str],
+    *,
+    cache: AccessionCache | None = None,
+) -> dict[str, str]:
+    """
+    Resolve accession casing for many accessions with a single query.
+
+    Accessions found in `cache` are not looked up; the rest are resolved together and
+    written back to the cache. Returns a mapping of lowercased accession to canonical
+    accession.
+    """
+
+    normalized: dict[str, str] = {}
+    missing: dict[str, str] = {}
+    for raw in raw_accessions:
+        accession_lower = raw.strip().lower()
+        if accession_lower in normalized or accession_lower in missing:
+            continue
+        cached = cache.get(accession_lower) if cache is not None else None
+        if cached is not None:
+            normalized[accession_lower] = cached
+        else:
+            missing[accession_lower] = raw.strip().upper()
+    if missing:
+        existing = session.execute(
+            select(APSDocument.accession_number_lower, APSDocument.accession_number).where(
+                APSDocument.accession_number_lower.in_(list(missing))
+            )
+        )
+        for accession_lower, accession in existing:
+            missing[accession_lower] = accession
+        if cache is not None:
+            for accession_lower, accession in missing.items():
+                cache.put(accession_lower, accession)
+        normalized.update(missing)
+    return normalized
+
+
+def existing_accessions(session: Session, raw_accessions: Iterable[str]) -> set[str]:
+    """Return the lowercased accessions, among `raw_accessions`, already in aps_document."""
+
+    normalized = {raw.strip().lower() for raw in raw_accessions}
+    if not normalized:
+        return set()
+    return set(
+        session.scalars(
+            select(APSDocument.accession_number_lower).where(
+                APSDocument.accession_number_lower.in_(normalized)
+            )
+        )
     )
-    if existing_accession:
-        canonical_accession = existing_accession
-    else:
-        canonical_accession = raw_accession.strip().upper()
-    accession_lower = canonical_accession.lower()
-    return canonical_accession, accession_lower
 
 
 def upsert_document(session: Session, accession_number: str, values: dict[str, Any]) -> str:
     """Upsert an APS document, preserving existing non-null fields when stubbing."""
 
+    return upsert_documents(session, [{**values, "accession_number": accession_number}])[0]
+
+
+def upsert_documents(
+    session: Session,
+    rows: Sequence[dict[str, Any]],
+    *,
+    cache: AccessionCache | None = None,
+    metadata_store: bool = False,
+) -> list[str]:
+    """
+    Upsert many APS documents with one accession lookup and multi-row upserts.
+
+    Each row carries its raw `accession_number` alongside the column values. Merge rules
+    match `upsert_document`, including for repeated accessions within `rows`. Rows with
+    `raw_metadata_json` get a `metadata_hash`; when it matches the stored hash only
+    `last_seen_at` moves, and `last_modified_at` advances only when it differs. With
+    `metadata_store` set, payloads go to `aps_document_metadata` instead of being held
+    inline (see `store_document_metadata`). Returns the canonical accession for each input
+    row, in order.
+    """
+
     if session.bind is None:
         raise RuntimeError("Session is not bound to an engine.")
-    canonical_accession, normalized = resolve_accession(session, accession_number)
-    cleaned_values = {
-        key: value
-        for key, value in values.items()
-        if key not in {"accession_number", "accession_number_lower"}
-    }
-    payload = {
-        "accession_number": canonical_accession,
-        "accession_number_lower": normalized,
-        **cleaned_values,
-    }
-    dialect_name = session.bind.dialect.name
-    if dialect_name == "postgresql":
-        stmt_pg = pg_insert(APSDocument).values(**payload)
-        excluded_is_stub = func.coalesce(stmt_pg.excluded.is_stub, APSDocument.is_stub)
-        excluded_is_package = func.coalesce(stmt_pg.excluded.is_package, APSDocument.is_package)
-        update_values = {
-            "accession_number_lower": func.coalesce(
-                stmt_pg.excluded.accession_number_lower, APSDocument.accession_number_lower
-            ),
-            "url": func.coalesce(stmt_pg.excluded.url, APSDocument.url),
-            "is_package": APSDocument.is_package | excluded_is_package,
-            "is_stub": APSDocument.is_stub & excluded_is_stub,
-            "document_date": func.coalesce(
-                stmt_pg.excluded.document_date, APSDocument.document_date
-            ),
-            "date_added_timestamp": func.coalesce(
-                stmt_pg.excluded.date_added_timestamp, APSDocument.date_added_timestamp
-            ),
-            "document_type": func.coalesce(
-                stmt_pg.excluded.document_type, APSDocument.document_type
-            ),
-            "docket_number": func.coalesce(
-                stmt_pg.excluded.docket_number, APSDocument.docket_number
-            ),
-            "title": func.coalesce(stmt_pg.excluded.title, APSDocument.title),
-            "raw_metadata_json": func.coalesce(
-                stmt_pg.excluded.raw_metadata_json, APSDocument.raw_metadata_json
-            ),
-            "last_seen_at": func.coalesce(stmt_pg.excluded.last_seen_at, APSDocument.last_seen_at),
-            "last_modified_at": func.coalesce(
-                stmt_pg.excluded.last_modified_at, APSDocument.last_modified_at
-            ),
+    if metadata_store:
+        store_document_metadata(session, rows)
+    canonical = resolve_accessions(session, (row["accession_number"] for row in rows), cache=cache)
+    merged: dict[str, dict[str, Any]] = {}
+    accessions: list[str] = []
+    for row in rows:
+        canonical_accession = canonical[row["accession_number"].strip().lower()]
+        accessions.append(canonical_accession)
+        payload = {
+            key: value
+            for key, value in row.items()
+            if key not in {"accession_number", "accession_number_lower"}
         }
-        session.execute(
-            stmt_pg.on_conflict_do_update(index_elements=["accession_number"], set_=update_values)
+        payload["accession_number"] = canonical_accession
+        payload["accession_number_lower"] = canonical_accession.lower()
+        if payload.get("raw_metadata_json") is not None and "metadata_hash" not in payload:
+            payload["metadata_hash"] = sha256_hex(payload["raw_metadata_json"])
+        if metadata_store:
+            payload.pop("raw_metadata_json", None)
+        previous = merged.get(canonical_accession)
+        merged[canonical_accession] = (
+            payload if previous is None else _merge_document_payloads(previous, payload)
         )
-        return canonical_accession
 
-    stmt_sqlite = sqlite_insert(APSDocument).values(**payload)
-    excluded_is_stub = func.coalesce(stmt_sqlite.excluded.is_stub, APSDocument.is_stub)
-    excluded_is_package = func.coalesce(stmt_sqlite.excluded.is_package, APSDocument.is_package)
-    update_values = {
-        "accession_number_lower": func.coalesce(
-            stmt_sqlite.excluded.accession_number_lower, APSDocument.accession_number_lower
-        ),
-        "url": func.coalesce(stmt_sqlite.excluded.url, APSDocument.url),
-        "is_package": APSDocument.is_package | excluded_is_package,
-        "is_stub": APSDocument.is_stub & excluded_is_stub,
-        "document_date": func.coalesce(
-            stmt_sqlite.excluded.document_date, APSDocument.document_date
-        ),
-        "date_added_timestamp": func.coalesce(
-            stmt_sqlite.excluded.date_added_timestamp, APSDocument.date_added_timestamp
-        ),
-        "document_type": func.coalesce(
-            stmt_sqlite.excluded.document_type, APSDocument.document_type
-        ),
-        "docket_number": func.coalesce(
-            stmt_sqlite.excluded.docket_number, APSDocument.docket_number
-        ),
-        "title": func.coalesce(stmt_sqlite.excluded.title, APSDocument.title),
-        "raw_metadata_json": func.coalesce(
-            stmt_sqlite.excluded.raw_metadata_json, APSDocument.raw_metadata_json
-        ),
-        "last_seen_at": func.coalesce(stmt_sqlite.excluded.last_seen_at, APSDocument.last_seen_at),
-        "last_modified_at": func.coalesce(
-            stmt_sqlite.excluded.last_modified_at, APSDocument.last_modified_at
-        ),
+    # Multi-row VALUES need a uniform column set, so rows are grouped by their keys.
+    groups: dict[frozenset[str], list[dict[str, Any]]] = {}
+    for payload in merged.values():
+        groups.setdefault(frozenset(payload), []).append(payload)
+    insert = pg_insert if session.bind.dialect.name == "postgresql" else sqlite_insert
+    for payloads in groups.values():
+        for start in range(0, len(payloads), DOCUMENT_UPSERT_BATCH_SIZE):
+            stmt = insert(APSDocument).values(payloads[start : start + DOCUMENT_UPSERT_BATCH_SIZE])
+            session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["accession_number"],
+                    set_=_document_update_values(stmt.excluded, metadata_store=metadata_store),
+                )
+            )
+    return accessions
+
+
+def store_document_metadata(session: Session, rows: Sequence[dict[str, Any]]) -> int:
+    """
+    Add the rows' `raw_metadata_json` payloads to the content-addressed metadata store.
+
+    Payloads are keyed by their canonical sha256_hex and stored as zlib-compressed
+    canonical JSON; hashes already stored are neither recompressed nor rewritten. Returns
+    the number of payloads added.
+    """
+
+    if session.bind is None:
+        raise RuntimeError("Session is not bound to an engine.")
+    payloads: dict[str, Any] = {}
+    for row in rows:
+        raw = row.get("raw_metadata_json")
+        if raw is not None:
+            payloads.setdefault(row.get("metadata_hash") or sha256_hex(raw), raw)
+    if not payloads:
+        return 0
+    stored = set(
+        session.scalars(
+            select(APSDocumentMetadata.content_hash).where(
+                APSDocumentMetadata.content_hash.in_(list(payloads))
+            )
+        )
+    )
+    missing = [
+        {
+            "content_hash": content_hash,
+            "payload": compress_canonical(raw),
+            "raw_size": len(canon_json_bytes(raw)),
+        }
+        for content_hash, raw in payloads.items()
+        if content_hash not in stored
+    ]
+    if missing:
+        insert = pg_insert if session.bind.dialect.name == "postgresql" else sqlite_insert
+        session.execute(insert(APSDocumentMetadata).on_conflict_do_nothing(), missing)
+    return len(missing)
+
+
+def _document_update_values(excluded: Any, *, metadata_store: bool = False) -> dict[str, Any]:
+    excluded_is_stub = func.coalesce(excluded.is_stub, APSDocument.is_stub)
+    excluded_is_package = func.coalesce(excluded.is_package, APSDocument.is_package)
+    update_values: dict[str, Any] = {
+        column: func.coalesce(excluded[column], getattr(APSDocument, column))
+        for column in COALESCED_DOCUMENT_COLUMNS
     }
-    session.execute(
-        stmt_sqlite.on_conflict_do_update(index_elements=["accession_number"], set_=update_values)
+    unchanged = APSDocument.metadata_hash == excluded.metadata_hash
+    for column in HASHED_DOCUMENT_COLUMNS:
+        update_values[column] = case(
+            (unchanged, getattr(APSDocument, column)), else_=update_values[column]
+        )
+    changed = and_(
+        excluded.metadata_hash.is_not(None),
+        APSDocument.metadata_hash.is_distinct_from(excluded.metadata_hash),
+    )
+    update_values["last_modified_at"] = case(
+        (changed, func.coalesce(excluded.last_modified_at, excluded.last_seen_at, func.now())),
+        (excluded.metadata_hash.is_(None), update_values["last_modified_at"]),
+        else_=APSDocument.last_modified_at,
     )
-    return canonical_accession
+    if metadata_store:
+        # A changed payload lives in the store under its new hash; drop the stale inline copy.
+        update_values["raw_metadata_json"] = case(
+            (unchanged, APSDocument.raw_metadata_json),
+            (excluded.metadata_hash.is_(None), APSDocument.raw_metadata_json),
+            else_=null(),
+        )
+    update_values["is_package"] = APSDocument.is_package | excluded_is_package
+    update_values["is_stub"] = APSDocument.is_stub & excluded_is_stub
+    return update_values
+
+
+def _merge_document_payloads(previous: dict[str, Any], current: dict[str, Any]) -> dict[str, Any]:
+    """Apply the upsert merge rules in Python to repeated accessions within one batch."""
+
+    merged = {**previous, **current}
+    for column in COALESCED_DOCUMENT_COLUMNS:
+        if current.get(column) is None and previous.get(column) is not None:
+            merged[column] = previous[column]
+    if "is_package" in previous or "is_package" in current:
+        merged["is_package"] = bool(previous.get("is_package")) or bool(current.get("is_package"))
+    if "is_stub" in previous or "is_stub" in current:
+        merged["is_stub"] = previous.get("is_stub", True) is not False and (
+            current.get("is_stub", True) is not False
+        )
+    return merged
 
 
 def upsert_query(session: Session, query_id: str, values: dict[str, Any]) -> None:
@@ -176,10 +401,122 @@ def get_or_create_query_state(
     return state
 
 
-def insert_discoveries(session: Session, discoveries: Iterable[APSDiscovery]) -> None:
-    """Insert discovery rows."""
+def get_endpoint_state(session: Session, base_url: str) -> APSEndpointState | None:
+    """Fetch the wire-format detection recorded for an endpoint."""
+
+    return session.get(APSEndpointState, base_url)
+
+
+def record_endpoint_wire_format(
+    session: Session, base_url: str, wire_format: str, verified_at: datetime
+) -> APSEndpointState:
+    """Create or refresh the wire-format detection for an endpoint."""
+
+    endpoint = get_endpoint_state(session, base_url)
+    if endpoint is None:
+        endpoint = APSEndpointState(base_url=base_url)
+        session.add(endpoint)
+    endpoint.wire_format = wire_format
+    endpoint.wire_format_verified_at = verified_at
+    session.flush()
+    return endpoint
+
+
+def insert_discoveries(
+    session: Session,
+    rows: Sequence[dict[str, Any]],
+    *,
+    batch_size: int = DISCOVERY_INSERT_BATCH_SIZE,
+) -> None:
+    """
+    Bulk insert discovery rows, ignoring accessions already recorded for the run.
+
+    Skip-based paging can return the same accession twice within one run; the first
+    discovery is kept and later repeats are dropped by ON CONFLICT DO NOTHING. The
+    conflict target is left implicit so the statement also works against the partitioned
+    layout, where (run_id, accession_number) is unique per partition rather than on the
+    parent table.
+    """
+
+    if session.bind is None:
+        raise RuntimeError("Session is not bound to an engine.")
+    if not rows:
+        return
+    insert = pg_insert if session.bind.dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(APSDiscovery).on_conflict_do_nothing()
+    step = max(1, batch_size)
+    for start in range(0, len(rows), step):
+        session.execute(stmt, list(rows[start : start + step]))
+
 
-    session.add_all(list(discoveries))
+def has_successful_run(session: Session, query_id: str) -> bool:
+    """Return True if the query has completed at least one successful run."""
+
+    run_id = session.scalar(
+        select(APSQueryRun.run_id)
+        .where(APSQueryRun.query_id == query_id, APSQueryRun.status == QueryRunStatus.SUCCESS)
+        .where(APSQueryRun.ended_at.is_not(None))
+        .limit(1)
+    )
+    return run_id is not None
+
+
+def last_successful_run_started_at(session: Session, query_id: str) -> datetime | None:
+    """Return when the query's most recent completed successful run started, if any."""
+
+    return session.scalar(
+        select(func.max(APSQueryRun.started_at))
+        .where(APSQueryRun.query_id == query_id, APSQueryRun.status == QueryRunStatus.SUCCESS)
+        .where(APSQueryRun.ended_at.is_not(None))
+    )
+
+
+def runs_for_accession(session: Session, raw_accession: str) -> list[APSQueryRun]:
+    """Return the runs that discovered an accession, most recent first."""
+
+    stmt = (
+        select(APSQueryRun)
+        .join(APSDiscovery, APSDiscovery.run_id == APSQueryRun.run_id)
+        .join(APSDocument, APSDocument.accession_number == APSDiscovery.accession_number)
+        .where(APSDocument.accession_number_lower == raw_accession.strip().lower())
+        .order_by(APSQueryRun.started_at.desc(), APSQueryRun.run_id.desc())
+    )
+    return list(session.scalars(stmt))
+
+
+def documents_for_docket(session: Session, docket_number: str) -> list[APSDocument]:
+    """Return documents filed under `docket_number`, newest first."""
+
+    return _documents_containing(session, APSDocument.docket_number, docket_number)
+
+
+def documents_of_type(session: Session, document_type: str) -> list[APSDocument]:
+    """Return documents tagged with `document_type`, newest first."""
+
+    return _documents_containing(session, APSDocument.document_type, document_type)
+
+
+def _documents_containing(session: Session, column: Any, value: str) -> list[APSDocument]:
+    stmt = (
+        select(APSDocument)
+        .where(json_array_contains(session.get_bind().dialect.name, column, value))
+        .order_by(APSDocument.date_added_timestamp.desc(), APSDocument.accession_number)
+    )
+    return list(session.scalars(stmt))
+
+
+def json_array_contains(dialect_name: str, column: Any, value: Any) -> ColumnElement[bool]:
+    """
+    Match rows whose JSON array `column` includes `value`.
+
+    On Postgres this is JSONB containment (`@>`), which the GIN indexes on document_type
+    and docket_number serve; elsewhere it falls back to scanning with json_each.
+    """
+
+    if dialect_name == "postgresql":
+        return type_coerce(column, JSONB).contains([value])
+    elements = func.json_each(column).table_valued("value")
+    return exists(select(1).select_from(elements).where(elements.c.value == value))
 
 
 def insert_query_run(session: Session, query_run: APSQueryRun) -> None:
@@ -0,0 +1,220 @@
+"""Incremental parsing of APS search response bodies."""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+_WHITESPACE = frozenset(" \t\n\r")
+
+# First characters of values whose end can be found without decoding them.
+_DELIMITED = frozenset('{["')
+
+_STRING_STOPS = re.compile(r'["\\]')
+_VALUE_STOPS = re.compile(r'["{}\[\]]')
+
+# Returned by ResultsParser._decode when the buffer ends before the next value does.
+_INCOMPLETE = object()
+
+
+@dataclass
+class PageSummary:
+    """Top-level members of a search response other than its results."""
+
+    members: dict[str, Any] = field(default_factory=dict)
+    result_count: int = 0
+
+
+class _ValueScanner:
+    """
+    Finds where a JSON object, array or string ends, one chunk at a time.
+
+    Only quotes, escapes and brackets are inspected, so the value is decoded once, after
+    it is complete, instead of on every chunk that arrives while it is still open.
+    """
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def scan(self, text: str, start: int = 0) -> int:
+        """Return the index just past the value's end in `text`, or -1 if it continues."""
+
+        index = start
+        if self.escaped:
+            if index >= len(text):
+                return -1
+            self.escaped = False
+            index += 1
+        while True:
+            match = (_STRING_STOPS if self.in_string else _VALUE_STOPS).search(text, index)
+            if match is None:
+                return -1
+            char = match.group()
+            index = match.end()
+            if self.in_string:
+                if char == "\\":
+                    if index >= len(text):
+                        self.escaped = True
+                        return -1
+                    index += 1
+                    continue
+                self.in_string = False
+            elif char == '"':
+                self.in_string = True
+                continue
+            elif char in "{[":
+                self.depth += 1
+                continue
+            else:
+                self.depth -= 1
+            if self.depth == 0:
+                return index
+
+
+class ResultsParser:
+    """
+    Push parser yielding a search response's `results` entries as soon as each completes.
+
+    Only the enclosing object and the results array are walked by hand; member values and
+    entries are decoded with `json.JSONDecoder.raw_decode`, so the parser holds at most
+    the unparsed tail of the body. An incomplete object, array or string is scanned
+    chunk by chunk and decoded once it ends, keeping large entries linear in their size.
+    Other members are collected into `summary`.
+    """
+
+    def __init__(self, key: str = "results", summary: PageSummary | None = None) -> None:
+        self.key = key
+        self.summary = summary if summary is not None else PageSummary()
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+        self._member: str | None = None
+        self._scanner: _ValueScanner | None = None
+        self._parts: list[str] = []
+
+    def feed(self, chunk: bytes) -> list[Any]:
+        """Add a chunk of the body and return the entries it completed."""
+
+        text = self._text.decode(chunk)
+        if self._scanner is not None:
+            self._parts.append(text)
+            if self._scanner.scan(text) < 0:
+                return []
+            self._join_parts()
+        else:
+            self._buffer += text
+        return self._parse(final=False)
+
+    def close(self) -> list[Any]:
+        """Finish the body, returning any last entries; raises ValueError if truncated."""
+
+        self._parts.append(self._text.decode(b"", final=True))
+        self._join_parts()
+        entries = self._parse(final=True)
+        if self._state != "done":
+            raise ValueError("Search response body ended before the JSON object closed.")
+        return entries
+
+    def _parse(self, *, final: bool) -> list[Any]:
+        entries: list[Any] = []
+        while self._state != "done":
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos >= len(self._buffer):
+                break
+            char = self._buffer[self._pos]
+            if self._state == "start":
+                self._expect(char, "{")
+                self._state = "member"
+            elif self._state == "member":
+                if char == "}":
+                    self._pos += 1
+                    self._state = "done"
+                    continue
+                member = self._decode(final=final)
+                if member is _INCOMPLETE:
+                    break
+                if not isinstance(member, str):
+                    raise ValueError("Expected a member name in the search response.")
+                self._member = member
+                self._state = "colon"
+            elif self._state == "colon":
+                self._expect(char, ":")
+                self._state = "array" if self._member == self.key else "value"
+            elif self._state == "array" and char == "[":
+                self._pos += 1
+                self._state = "entry"
+            elif self._state in {"array", "value"}:
+                value = self._decode(final=final)
+                if value is _INCOMPLETE:
+                    break
+                assert self._member is not None
+                self.summary.members[self._member] = value
+                self._state = "next_member"
+            elif self._state == "next_member":
+                self._pos += 1
+                if char == "}":
+                    self._state = "done"
+                elif char == ",":
+                    self._state = "member"
+                else:
+                    raise ValueError(f"Unexpected {char!r} in the search response.")
+            elif self._state == "entry":
+                if char == "]":
+                    self._pos += 1
+                    self._state = "next_member"
+                    continue
+                entry = self._decode(final=final)
+                if entry is _INCOMPLETE:
+                    break
+                entries.append(entry)
+                self.summary.result_count += 1
+                self._state = "next_entry"
+            elif self._state == "next_entry":
+                self._pos += 1
+                if char == "]":
+                    self._state = "next_member"
+                elif char == ",":
+                    self._state = "entry"
+                else:
+                    raise ValueError(f"Unexpected {char!r} in the search results array.")
+        self._buffer = self._buffer[self._pos :]
+        self._pos = 0
+        return entries
+
+    def _expect(self, char: str, expected: str) -> None:
+        if char != expected:
+            raise ValueError(f"Expected {expected!r} in the search response, got {char!r}.")
+        self._pos += 1
+
+    def _join_parts(self) -> None:
+        self._buffer = "".join([self._buffer, *self._parts])
+        self._parts = []
+        self._scanner = None
+
+    def _decode(self, *, final: bool) -> Any:
+        delimited = self._buffer[self._pos] in _DELIMITED
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            if delimited:
+                scanner = _ValueScanner()
+                if scanner.scan(self._buffer, self._pos) >= 0:
+                    raise
+                # Later chunks are only scanned until the value ends.
+                self._scanner = scanner
+            return _INCOMPLETE
+        # A number or literal running to the end of the buffer may be cut mid-token.
+        if end == len(self._buffer) and not final and not delimited:
+            return _INCOMPLETE
+        self._pos = end
+        return value
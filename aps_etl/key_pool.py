@@ -0,0 +1,83 @@
+"""Subscription key rotation for the APS API."""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+
+# Cool-down applied to a throttled key when APS sends no Retry-After header.
+DEFAULT_KEY_COOLDOWN_S = 1.0
+
+
+@dataclass
+class KeyPool:
+    """
+    Round-robin pool of APS subscription keys with per-key throttle tracking.
+
+    A key answered with 401/403 is retired for the pool's lifetime. A key answered with
+    429 cools down for its Retry-After delay (or `DEFAULT_KEY_COOLDOWN_S`, doubled for
+    each consecutive throttle) and is skipped while another key is available.
+    """
+
+    keys: tuple[str, ...]
+    _next: int = field(default=0, init=False, repr=False)
+    _cooldown_until: dict[str, float] = field(default_factory=dict, init=False, repr=False)
+    _throttles: dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    _retired: set[str] = field(default_factory=set, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.keys = tuple(dict.fromkeys(key for key in self.keys if key))
+        if not self.keys:
+            raise ValueError("At least one APS subscription key is required.")
+
+    def next_key(self) -> str | None:
+        """
+        Return the next usable key, or None once every key has been retired.
+
+        Keys that are cooling down are only returned when all usable keys are, in which
+        case the one whose cool-down ends first is chosen.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            usable = [key for key in self._rotation() if key not in self._retired]
+            if not usable:
+                return None
+            key = next(
+                (key for key in usable if self._cooldown_until.get(key, 0.0) <= now),
+                min(usable, key=lambda candidate: self._cooldown_until.get(candidate, 0.0)),
+            )
+            self._next = (self.keys.index(key) + 1) % len(self.keys)
+            return key
+
+    def available(self) -> int:
+        """Return how many keys are neither retired nor cooling down."""
+
+        with self._lock:
+            now = time.monotonic()
+            return sum(
+                1
+                for key in self.keys
+                if key not in self._retired and self._cooldown_until.get(key, 0.0) <= now
+            )
+
+    def report(self, key: str, status_code: int, retry_after_s: float | None = None) -> None:
+        """Record the response status APS returned for a request made with `key`."""
+
+        with self._lock:
+            if status_code in {401, 403}:
+                self._retired.add(key)
+            elif status_code == 429:
+                throttles = self._throttles.get(key, 0) + 1
+                self._throttles[key] = throttles
+                delay = retry_after_s
+                if delay is None:
+                    delay = DEFAULT_KEY_COOLDOWN_S * 2 ** (throttles - 1)
+                self._cooldown_until[key] = time.monotonic() + delay
+            elif status_code < 400:
+                self._throttles.pop(key, None)
+
+    def _rotation(self) -> list[str]:
+        return [*self.keys[self._next :], *self.keys[: self._next]]
@@ -14,12 +14,17 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     Text,
     func,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
+from aps_etl.canonical import decompress_canonical
+
 
 class Base(DeclarativeBase):
     """Base class for all ORM models."""
@@ -36,6 +41,10 @@ class QueryRunStatus(enum.StrEnum):
 JsonValue = dict[str, Any] | list[Any]
 JsonValueOrNone = JsonValue | None
 
+# Document metadata is JSONB on Postgres, so it can be GIN-indexed and queried by
+# containment, and plain JSON elsewhere.
+DocumentJSON = JSON().with_variant(JSONB(), "postgresql")
+
 
 class APSQuery(Base):
     """Registered APS query definitions."""
@@ -67,15 +76,31 @@ class APSQueryState(Base):
     safety_buffer_days: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
     wire_format: Mapped[str | None] = mapped_column(Text, nullable=True)
     wire_format_verified_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    checkpoint_run_id: Mapped[int | None] = mapped_column(Integer)
+    checkpoint_skip: Mapped[int | None] = mapped_column(Integer)
+    checkpoint_page: Mapped[int | None] = mapped_column(Integer)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     query: Mapped[APSQuery] = relationship(back_populates="state")
 
 
+class APSEndpointState(Base):
+    """Per-endpoint wire-format detection shared by every query against a base URL."""
+
+    __tablename__ = "aps_endpoint_state"
+
+    base_url: Mapped[str] = mapped_column(Text, primary_key=True)
+    wire_format: Mapped[str] = mapped_column(Text, nullable=False)
+    wire_format_verified_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+
+
 class APSQueryRun(Base):
     """Execution metadata for a query run."""
 
     __tablename__ = "aps_query_run"
+    __table_args__ = (Index("ix_aps_query_run_query_id_started_at", "query_id", "started_at"),)
 
     run_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     query_id: Mapped[str] = mapped_column(
@@ -88,6 +113,10 @@ class APSQueryRun(Base):
     wire_format: Mapped[str] = mapped_column(Text, nullable=False)
     request_fingerprint: Mapped[str] = mapped_column(Text, nullable=False)
     schema_version: Mapped[str] = mapped_column(Text, nullable=False)
+    window_start: Mapped[date | None] = mapped_column(Date)
+    window_end: Mapped[date | None] = mapped_column(Date)
+    windows_json: Mapped[JsonValueOrNone] = mapped_column(JSON)
+    stop_reason: Mapped[str | None] = mapped_column(Text)
     notes: Mapped[str | None] = mapped_column(Text)
 
     query: Mapped[APSQuery] = relationship(back_populates="runs")
@@ -98,18 +127,30 @@ class APSDocument(Base):
     """APS document metadata."""
 
     __tablename__ = "aps_document"
+    __table_args__ = tuple(
+        Index(
+            f"ix_aps_document_{column}_gin",
+            column,
+            postgresql_using="gin",
+            postgresql_ops={column: "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql")
+        for column in ("document_type", "docket_number")
+    )
 
     accession_number: Mapped[str] = mapped_column(Text, primary_key=True)
     accession_number_lower: Mapped[str] = mapped_column(Text, unique=True, nullable=False)
     url: Mapped[str | None] = mapped_column(Text)
     is_package: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
     is_stub: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
-    document_date: Mapped[date | None] = mapped_column(Date)
-    date_added_timestamp: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
-    document_type: Mapped[JsonValueOrNone] = mapped_column(JSON)
-    docket_number: Mapped[JsonValueOrNone] = mapped_column(JSON)
+    document_date: Mapped[date | None] = mapped_column(Date, index=True)
+    date_added_timestamp: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), index=True
+    )
+    document_type: Mapped[JsonValueOrNone] = mapped_column(DocumentJSON)
+    docket_number: Mapped[JsonValueOrNone] = mapped_column(DocumentJSON)
     title: Mapped[str | None] = mapped_column(Text)
-    raw_metadata_json: Mapped[JsonValueOrNone] = mapped_column(JSON)
+    raw_metadata_json: Mapped[JsonValueOrNone] = mapped_column(DocumentJSON)
+    metadata_hash: Mapped[str | None] = mapped_column(Text, index=True)
     first_seen_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
@@ -119,18 +160,63 @@ class APSDocument(Base):
     last_modified_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
 
     discoveries: Mapped[list[APSDiscovery]] = relationship(back_populates="document")
+    stored_metadata: Mapped[APSDocumentMetadata | None] = relationship(
+        primaryjoin="foreign(APSDocument.metadata_hash) == APSDocumentMetadata.content_hash",
+        viewonly=True,
+    )
+
+    @property
+    def metadata_json(self) -> JsonValueOrNone:
+        """The APS metadata, held inline or in the content-addressed metadata store."""
+
+        if self.raw_metadata_json is not None:
+            return self.raw_metadata_json
+        if self.stored_metadata is not None:
+            return self.stored_metadata.payload_json
+        return None
+
+
+class APSDocumentMetadata(Base):
+    """Compressed canonical APS metadata, keyed by its sha256_hex content hash."""
+
+    __tablename__ = "aps_document_metadata"
+
+    content_hash: Mapped[str] = mapped_column(Text, primary_key=True)
+    payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    raw_size: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    @property
+    def payload_json(self) -> JsonValue:
+        """The decompressed metadata."""
+
+        return decompress_canonical(self.payload)
 
 
 class APSDiscovery(Base):
-    """Search result discovery rows."""
+    """
+    Search result discovery rows.
+
+    The primary key includes `discovered_at` because the partitioned layout (see
+    partitions.py) needs its partition key in every table-wide unique constraint. Runs
+    stamp all their discoveries with their own `started_at`, so `(run_id,
+    accession_number)` stays unique: table-wide in the plain layout, and per partition,
+    which holds a whole run, once partitioned.
+    """
 
     __tablename__ = "aps_discovery"
+    __table_args__ = (
+        Index("uq_aps_discovery_run_accession", "run_id", "accession_number", unique=True),
+    )
 
     run_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("aps_query_run.run_id", ondelete="CASCADE"), primary_key=True
     )
     accession_number: Mapped[str] = mapped_column(
-        Text, ForeignKey("aps_document.accession_number", ondelete="CASCADE"), primary_key=True
+        Text,
+        ForeignKey("aps_document.accession_number", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
     )
     skip_value: Mapped[int] = mapped_column(Integer, nullable=False)
     page_number: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -138,7 +224,7 @@ class APSDiscovery(Base):
     highlights_json: Mapped[JsonValueOrNone] = mapped_column(JSON)
     semantic_search_json: Mapped[JsonValueOrNone] = mapped_column(JSON)
     discovered_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now()
+        DateTime(timezone=True), primary_key=True, server_default=func.now()
     )
 
     run: Mapped[APSQueryRun] = relationship(back_populates="discoveries")
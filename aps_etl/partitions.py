@@ -0,0 +1,170 @@
+"""Monthly range partitions of aps_discovery on Postgres."""
+
+from __future__ import annotations
+
+import logging
+import re
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+DISCOVERY_TABLE = "aps_discovery"
+# Catches discoveries outside every monthly partition (see alembic revision 0010).
+DEFAULT_PARTITION = f"{DISCOVERY_TABLE}_default"
+
+_PARTITION_NAME = re.compile(rf"^{DISCOVERY_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+
+def month_start(day: date) -> date:
+    """Return the first day of `day`'s month."""
+
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    """Return the first day of the month `months` after `month`'s."""
+
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Name of the partition holding discoveries made in `month`."""
+
+    return f"{DISCOVERY_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_month(name: str) -> date | None:
+    """Return the month a partition covers, or None if `name` is not a monthly partition."""
+
+    match = _PARTITION_NAME.match(name)
+    if match is None:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def partition_ddl(month: date) -> list[str]:
+    """
+    Statements creating the partition for `month`, bounded at UTC midnight.
+
+    The partition is built detached and filled with the rows the DEFAULT partition holds
+    for its range before it is attached; attaching over such rows would fail. Partitioned
+    tables cannot have a unique index without the partition key, so each partition
+    carries its own unique (run_id, accession_number) index for ON CONFLICT.
+    """
+
+    name = partition_name(month)
+    lower = f"{month.isoformat()} 00:00:00+00"
+    upper = f"{add_months(month, 1).isoformat()} 00:00:00+00"
+    return [
+        f"CREATE TABLE IF NOT EXISTS {name} (LIKE {DISCOVERY_TABLE} INCLUDING DEFAULTS)",
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE discovered_at >= '{lower}' AND discovered_at < '{upper}' RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved",
+        f"ALTER TABLE {DISCOVERY_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{lower}') TO ('{upper}')",
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {name}_run_accession "
+        f"ON {name} (run_id, accession_number)",
+    ]
+
+
+def is_partitioned(session: Session) -> bool:
+    """Return True if aps_discovery uses the partitioned layout."""
+
+    if session.get_bind().dialect.name != "postgresql":
+        return False
+    return bool(
+        session.scalar(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = to_regclass(:table))"
+            ),
+            {"table": DISCOVERY_TABLE},
+        )
+    )
+
+
+def discovery_partitions(session: Session) -> list[str]:
+    """Return the names of the partitions attached to aps_discovery."""
+
+    names = session.scalars(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(:table)"
+        ),
+        {"table": DISCOVERY_TABLE},
+    )
+    return sorted(names)
+
+
+def ensure_discovery_partitions(
+    session: Session, *, months_ahead: int, today: date | None = None
+) -> list[str]:
+    """Create partitions from the current month through `months_ahead` months ahead."""
+
+    current = month_start(today or date.today())
+    existing = set(discovery_partitions(session))
+    created: list[str] = []
+    for offset in range(max(0, months_ahead) + 1):
+        month = add_months(current, offset)
+        if partition_name(month) in existing:
+            continue
+        for statement in partition_ddl(month):
+            session.execute(text(statement))
+        created.append(partition_name(month))
+    return created
+
+
+def drop_discovery_partitions(
+    session: Session, *, retention_months: int, today: date | None = None
+) -> list[str]:
+    """
+    Detach and drop partitions lying wholly before the retention window.
+
+    The window is the current month plus the `retention_months` months before it, so
+    retention costs one catalog change per month instead of a DELETE over its rows.
+    """
+
+    cutoff = add_months(month_start(today or date.today()), -max(0, retention_months))
+    dropped: list[str] = []
+    for name in discovery_partitions(session):
+        month = partition_month(name)
+        if month is None or add_months(month, 1) > cutoff:
+            continue
+        session.execute(text(f"ALTER TABLE {DISCOVERY_TABLE} DETACH PARTITION {name}"))
+        session.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    return dropped
+
+
+def maintain_discovery_partitions(
+    session: Session,
+    *,
+    months_ahead: int,
+    retention_months: int,
+    today: date | None = None,
+) -> None:
+    """
+    Create upcoming partitions and drop expired ones when aps_discovery is partitioned.
+
+    A `retention_months` of 0 keeps every partition. Does nothing for the plain layout.
+    """
+
+    if not is_partitioned(session):
+        return
+    created = ensure_discovery_partitions(session, months_ahead=months_ahead, today=today)
+    dropped = (
+        drop_discovery_partitions(session, retention_months=retention_months, today=today)
+        if retention_months > 0
+        else []
+    )
+    if created or dropped:
+        logger.info(
+            "Discovery partitions created: %s; dropped: %s",
+            ", ".join(created) or "none",
+            ", ".join(dropped) or "none",
+        )
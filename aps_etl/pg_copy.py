@@ -0,0 +1,217 @@
+"""Postgres COPY-based staging loader for high-volume backfills."""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from aps_etl.db import (
+    COALESCED_DOCUMENT_COLUMNS,
+    HASHED_DOCUMENT_COLUMNS,
+    store_document_metadata,
+)
+
+STAGE_TABLE = "aps_load_stage"
+
+# Staged document columns, in COPY order, with their Postgres types.
+DOCUMENT_STAGE_COLUMNS: dict[str, str] = {
+    "url": "text",
+    "is_package": "boolean",
+    "is_stub": "boolean",
+    "document_date": "date",
+    "date_added_timestamp": "timestamptz",
+    "document_type": "jsonb",
+    "docket_number": "jsonb",
+    "title": "text",
+    "raw_metadata_json": "jsonb",
+    "metadata_hash": "text",
+    "last_seen_at": "timestamptz",
+    "last_modified_at": "timestamptz",
+}
+
+# Staged discovery columns, in COPY order, with their Postgres types.
+DISCOVERY_STAGE_COLUMNS: dict[str, str] = {
+    "run_id": "integer",
+    "skip_value": "integer",
+    "page_number": "integer",
+    "search_score": "double precision",
+    "highlights_json": "json",
+    "semantic_search_json": "json",
+    "discovered_at": "timestamptz",
+}
+
+_JSON_STAGE_COLUMNS = frozenset(
+    column
+    for columns in (DOCUMENT_STAGE_COLUMNS, DISCOVERY_STAGE_COLUMNS)
+    for column, column_type in columns.items()
+    if column_type in {"json", "jsonb"}
+)
+
+
+def supports_copy(session: Session) -> bool:
+    """Return True when the session is bound to Postgres through psycopg 3."""
+
+    bind = session.bind
+    return (
+        bind is not None and bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg"
+    )
+
+
+def copy_load_page(
+    session: Session, rows: Sequence[dict[str, Any]], *, metadata_store: bool = False
+) -> None:
+    """
+    Stream rows into a temp staging table with COPY and merge them in one statement.
+
+    Each row combines a document upsert row (raw `accession_number` plus document columns)
+    with the discovery columns for the same hit. The merge resolves accession casing
+    against `aps_document`, collapses repeated accessions with the same coalesce /
+    `is_stub` / `is_package` rules as `upsert_documents`, and inserts discoveries with
+    ON CONFLICT DO NOTHING. With `metadata_store` set, payloads are written to the
+    metadata store first and staged without `raw_metadata_json`, as in `upsert_documents`.
+    """
+
+    if not rows:
+        return
+    if not supports_copy(session):
+        raise RuntimeError("COPY loading requires a Postgres session using psycopg.")
+    if metadata_store:
+        store_document_metadata(session, rows)
+        rows = [{**row, "raw_metadata_json": None} for row in rows]
+    session.flush()
+    driver_connection = session.connection().connection.driver_connection
+    if driver_connection is None:
+        raise RuntimeError("Session connection has no driver connection.")
+    cursor = driver_connection.cursor()
+    cursor.execute(_stage_ddl())
+    cursor.execute(f"TRUNCATE {STAGE_TABLE}")
+    columns = ["ord", "accession_raw", *DOCUMENT_STAGE_COLUMNS, *DISCOVERY_STAGE_COLUMNS]
+    with cursor.copy(f"COPY {STAGE_TABLE} ({', '.join(columns)}) FROM STDIN") as copy:
+        for ordinal, row in enumerate(rows):
+            copy.write_row(
+                [ordinal, row["accession_number"]]
+                + [_stage_value(column, row.get(column)) for column in columns[2:]]
+            )
+    cursor.execute(_merge_sql(metadata_store=metadata_store))
+
+
+def _stage_value(column: str, value: Any) -> Any:
+    if value is not None and column in _JSON_STAGE_COLUMNS:
+        return json.dumps(value)
+    return value
+
+
+def _stage_ddl() -> str:
+    column_defs = ",\n    ".join(
+        f"{column} {column_type}"
+        for column, column_type in {
+            "ord": "integer",
+            "accession_raw": "text",
+            **DOCUMENT_STAGE_COLUMNS,
+            **DISCOVERY_STAGE_COLUMNS,
+        }.items()
+    )
+    return (
+        f"CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} (\n    {column_defs}\n)"
+        " ON COMMIT DELETE ROWS"
+    )
+
+
+def _latest_non_null(column: str) -> str:
+    return f"(array_agg({column} ORDER BY ord DESC) FILTER (WHERE {column} IS NOT NULL))[1]"
+
+
+def _update_expression(column: str, *, metadata_store: bool = False) -> str:
+    coalesced = f"coalesce(EXCLUDED.{column}, aps_document.{column})"
+    if column == "raw_metadata_json" and metadata_store:
+        return (
+            "CASE WHEN aps_document.metadata_hash = EXCLUDED.metadata_hash "
+            "OR EXCLUDED.metadata_hash IS NULL THEN aps_document.raw_metadata_json ELSE NULL END"
+        )
+    if column in HASHED_DOCUMENT_COLUMNS:
+        return (
+            "CASE WHEN aps_document.metadata_hash = EXCLUDED.metadata_hash "
+            f"THEN aps_document.{column} ELSE {coalesced} END"
+        )
+    if column == "last_modified_at":
+        return (
+            "CASE WHEN EXCLUDED.metadata_hash IS NOT NULL AND aps_document.metadata_hash "
+            "IS DISTINCT FROM EXCLUDED.metadata_hash "
+            "THEN coalesce(EXCLUDED.last_modified_at, EXCLUDED.last_seen_at, now()) "
+            f"WHEN EXCLUDED.metadata_hash IS NULL THEN {coalesced} "
+            "ELSE aps_document.last_modified_at END"
+        )
+    return coalesced
+
+
+def _merge_sql(*, metadata_store: bool = False) -> str:
+    merged_columns = [
+        column
+        for column in DOCUMENT_STAGE_COLUMNS
+        if column in COALESCED_DOCUMENT_COLUMNS and column != "last_seen_at"
+    ]
+    merged_selects = ",\n        ".join(
+        [
+            "accession_number",
+            "lower(accession_number) AS accession_number_lower",
+            "coalesce(bool_or(is_package), false) AS is_package",
+            "coalesce(bool_and(is_stub), true) AS is_stub",
+            f"coalesce({_latest_non_null('last_seen_at')}, now()) AS last_seen_at",
+            *(f"{_latest_non_null(column)} AS {column}" for column in merged_columns),
+        ]
+    )
+    document_columns = [
+        "accession_number",
+        "accession_number_lower",
+        "is_package",
+        "is_stub",
+        "last_seen_at",
+        *merged_columns,
+    ]
+    updates = ",\n        ".join(
+        [
+            "is_package = aps_document.is_package OR coalesce(EXCLUDED.is_package, "
+            "aps_document.is_package)",
+            "is_stub = aps_document.is_stub AND coalesce(EXCLUDED.is_stub, aps_document.is_stub)",
+            *(
+                f"{column} = {_update_expression(column, metadata_store=metadata_store)}"
+                for column in COALESCED_DOCUMENT_COLUMNS
+            ),
+        ]
+    )
+    discovery_columns = ", ".join(DISCOVERY_STAGE_COLUMNS)
+    discovery_values = discovery_columns.replace(
+        "discovered_at", "coalesce(discovered_at, now()) AS discovered_at"
+    )
+    return f"""
+WITH staged AS (
+    SELECT
+        stage.*,
+        coalesce(existing.accession_number, upper(btrim(stage.accession_raw)))
+            AS accession_number
+    FROM {STAGE_TABLE} AS stage
+    LEFT JOIN aps_document AS existing
+        ON existing.accession_number_lower = lower(btrim(stage.accession_raw))
+),
+merged AS (
+    SELECT
+        {merged_selects}
+    FROM staged
+    GROUP BY accession_number
+),
+upserted AS (
+    INSERT INTO aps_document ({", ".join(document_columns)})
+    SELECT {", ".join(document_columns)} FROM merged
+    ON CONFLICT (accession_number) DO UPDATE SET
+        {updates}
+    RETURNING accession_number
+)
+INSERT INTO aps_discovery (accession_number, {discovery_columns})
+SELECT DISTINCT ON (run_id, accession_number) accession_number, {discovery_values}
+FROM staged
+ORDER BY run_id, accession_number, ord
+ON CONFLICT DO NOTHING
+"""
@@ -0,0 +1,165 @@
+"""Fetch → transform → load pipeline connected by bounded queues."""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+# How often a stage blocked on a queue re-checks whether the pipeline is stopping.
+STOP_POLL_S = 0.1
+
+
+@dataclass
+class StageStats:
+    """Throughput counters for one pipeline stage."""
+
+    name: str
+    items: int = 0
+    busy_s: float = 0.0
+    waiting_s: float = 0.0
+
+    @property
+    def items_per_s(self) -> float:
+        """Items handled per second of busy time."""
+
+        return self.items / self.busy_s if self.busy_s > 0 else 0.0
+
+    def describe(self) -> str:
+        """One-line summary of the stage's work."""
+
+        return (
+            f"{self.name}: {self.items} items, {self.busy_s:.2f}s busy, "
+            f"{self.waiting_s:.2f}s waiting, {self.items_per_s:.1f}/s"
+        )
+
+
+@dataclass
+class _Failure:
+    error: BaseException
+
+
+_DONE = object()
+
+
+@dataclass
+class Pipeline[S, T]:
+    """
+    Run `source` and `transform` on worker threads and `load` on the calling thread.
+
+    Stages are connected by queues holding at most `depth` items, so a slow stage
+    applies backpressure upstream instead of buffering a backlog. `load` runs on the
+    caller's thread so it can own non-thread-safe resources such as a Session. The first
+    error in any stage stops the others and is re-raised from `run`.
+    """
+
+    source: Iterable[S]
+    transform: Callable[[S], T]
+    load: Callable[[T], None]
+    depth: int = 2
+    stats: dict[str, StageStats] = field(init=False)
+    _stop: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.stats = {name: StageStats(name) for name in ("fetch", "transform", "load")}
+
+    def run(self) -> dict[str, StageStats]:
+        """Drive every item through the pipeline and return per-stage stats."""
+
+        fetched: queue.Queue[Any] = queue.Queue(maxsize=max(1, self.depth))
+        transformed: queue.Queue[Any] = queue.Queue(maxsize=max(1, self.depth))
+        workers = [
+            threading.Thread(
+                target=self._fetch, args=(fetched,), name="pipeline-fetch", daemon=True
+            ),
+            threading.Thread(
+                target=self._transform,
+                args=(fetched, transformed),
+                name="pipeline-transform",
+                daemon=True,
+            ),
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            stats = self.stats["load"]
+            for item in self._drain(transformed, stats):
+                started = time.perf_counter()
+                self.load(item)
+                stats.busy_s += time.perf_counter() - started
+                stats.items += 1
+        finally:
+            self._stop.set()
+            for worker in workers:
+                worker.join()
+        return self.stats
+
+    def stop(self) -> None:
+        """Stop the pipeline after the item `load` is handling; safe to call from `load`."""
+
+        self._stop.set()
+
+    def _fetch(self, output: queue.Queue[Any]) -> None:
+        stats = self.stats["fetch"]
+        items = iter(self.source)
+        try:
+            while not self._stop.is_set():
+                started = time.perf_counter()
+                try:
+                    item = next(items)
+                except StopIteration:
+                    break
+                finally:
+                    stats.busy_s += time.perf_counter() - started
+                stats.items += 1
+                self._put(output, item, stats)
+            self._put(output, _DONE, stats)
+        except BaseException as exc:
+            self._put(output, _Failure(exc), stats)
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+
+    def _transform(self, source: queue.Queue[Any], output: queue.Queue[Any]) -> None:
+        stats = self.stats["transform"]
+        try:
+            for item in self._drain(source, stats):
+                started = time.perf_counter()
+                result = self.transform(item)
+                stats.busy_s += time.perf_counter() - started
+                stats.items += 1
+                self._put(output, result, stats)
+            self._put(output, _DONE, stats)
+        except BaseException as exc:
+            self._put(output, _Failure(exc), stats)
+
+    def _drain(self, source: queue.Queue[Any], stats: StageStats) -> Iterator[Any]:
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            try:
+                item = source.get(timeout=STOP_POLL_S)
+            except queue.Empty:
+                continue
+            finally:
+                stats.waiting_s += time.perf_counter() - started
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+    def _put(self, output: queue.Queue[Any], item: Any, stats: StageStats) -> None:
+        started = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    output.put(item, timeout=STOP_POLL_S)
+                    return
+                except queue.Full:
+                    continue
+        finally:
+            stats.waiting_s += time.perf_counter() - started
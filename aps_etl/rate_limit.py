@@ -0,0 +1,112 @@
+"""Client-side request throttling for the APS API."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+# How long a caller waits before re-checking a full concurrency window.
+CONCURRENCY_POLL_S = 0.05
+
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    """Return the delay requested by a `Retry-After` header, in seconds, if any."""
+
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=UTC)
+    return max(0.0, (retry_at - datetime.now(UTC)).total_seconds())
+
+
+@dataclass
+class RateLimiter:
+    """
+    Shared throttle combining a token bucket, Retry-After pauses and AIMD concurrency.
+
+    Every request takes a token (refilled at `rate_per_s`, up to `burst`; a rate of 0
+    disables the bucket) and one of `limit` concurrent slots. A throttled response
+    (429/5xx) halves `limit` and, with a `Retry-After` header, pauses every caller until
+    it has elapsed; each successful response grows `limit` by `1 / limit`, back up to
+    `max_concurrency`.
+    """
+
+    rate_per_s: float
+    burst: int
+    max_concurrency: int
+    min_concurrency: int = 1
+    _tokens: float = field(init=False, repr=False)
+    _refilled_at: float = field(init=False, repr=False)
+    _paused_until: float = field(default=0.0, init=False, repr=False)
+    _limit: float = field(init=False, repr=False)
+    _in_flight: int = field(default=0, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._limit = float(self.max_concurrency)
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+
+        return int(self._limit)
+
+    def try_acquire(self) -> float:
+        """Take a slot and a token, or return how many seconds to wait before retrying."""
+
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._in_flight >= int(self._limit):
+                return CONCURRENCY_POLL_S
+            if self.rate_per_s > 0:
+                self._tokens = min(
+                    float(self.burst), self._tokens + (now - self._refilled_at) * self.rate_per_s
+                )
+                self._refilled_at = now
+                if self._tokens < 1:
+                    return (1 - self._tokens) / self.rate_per_s
+                self._tokens -= 1
+            self._in_flight += 1
+            return 0.0
+
+    def acquire(self) -> None:
+        """Block the calling thread until a request may be sent."""
+
+        while (delay := self.try_acquire()) > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        """Wait on the event loop until a request may be sent."""
+
+        while (delay := self.try_acquire()) > 0:
+            await asyncio.sleep(delay)
+
+    def release(self, *, throttled: bool = False, retry_after_s: float | None = None) -> None:
+        """Return a slot and adjust the concurrency limit from the response outcome."""
+
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if throttled:
+                self._limit = max(float(self.min_concurrency), self._limit / 2)
+                if retry_after_s is not None:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after_s)
+            else:
+                self._limit = min(float(self.max_concurrency), self._limit + 1 / self._limit)
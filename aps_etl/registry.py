@@ -2,7 +2,11 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import hashlib
+import re
+import threading
+from dataclasses import dataclass, replace
+from datetime import date
 from pathlib import Path
 from typing import Any
 
@@ -85,6 +89,77 @@ def compile_date_range_filter(field: str, ge: str, le: str) -> Filter:
     return Filter(field=field, operator=None, value=value)
 
 
+_DATE_RANGE_PATTERN = re.compile(r"^\((\w+) ge '([^']*)' and \1 le '([^']*)'\)$")
+
+
+def parse_date_range_filter(filter_: Filter) -> tuple[str, str] | None:
+    """Return the (ge, le) bounds of a compiled date range filter, or None."""
+
+    if filter_.operator is not None or not isinstance(filter_.value, str):
+        return None
+    match = _DATE_RANGE_PATTERN.match(filter_.value)
+    if match is None or match.group(1) != filter_.field:
+        return None
+    return match.group(2), match.group(3)
+
+
+def date_range_bounds(query: QueryDefinition, field: str) -> tuple[date, date] | None:
+    """Return the query's AND date range on `field` as dates, if it has one."""
+
+    for filter_ in query.filters_and:
+        bounds = parse_date_range_filter(filter_) if filter_.field == field else None
+        if bounds is not None:
+            try:
+                return date.fromisoformat(bounds[0]), date.fromisoformat(bounds[1])
+            except ValueError:
+                return None
+    return None
+
+
+def with_date_range(query: QueryDefinition, field: str, ge: date, le: date) -> QueryDefinition:
+    """Return a copy of the query with its AND date range on `field` replaced or appended."""
+
+    window = compile_date_range_filter(field=field, ge=ge.isoformat(), le=le.isoformat())
+    filters_and: list[Filter] = []
+    replaced = False
+    for filter_ in query.filters_and:
+        if filter_.field == field and parse_date_range_filter(filter_) is not None:
+            if not replaced:
+                filters_and.append(window)
+                replaced = True
+            continue
+        filters_and.append(filter_)
+    if not replaced:
+        filters_and.append(window)
+    return replace(query, filters_and=tuple(filters_and))
+
+
+@dataclass(frozen=True)
+class CompiledRegistry:
+    """A registry parsed and validated once, with its canonical query definitions."""
+
+    version: str
+    queries: tuple[QueryDefinition, ...]
+
+    def enabled_queries(self) -> list[QueryDefinition]:
+        """Return the enabled query definitions."""
+
+        return [query for query in self.queries if query.enabled]
+
+
+@dataclass
+class _CompiledEntry:
+    stats: tuple[tuple[int, int], ...]
+    digest: str
+    registry: CompiledRegistry
+
+
+_cache_lock = threading.Lock()
+# Compiled registries by (registry, schema) path, and validators by schema content hash.
+_compiled: dict[tuple[Path, Path], _CompiledEntry] = {}
+_validators: dict[str, Any] = {}
+
+
 def load_registry_schema(schema_path: Path) -> dict[str, Any]:
     """Load registry JSON schema."""
 
@@ -94,18 +169,86 @@ def load_registry_schema(schema_path: Path) -> dict[str, Any]:
 def load_registry_payload(registry_path: Path, schema_path: Path) -> dict[str, Any]:
     """Load and validate registry payload."""
 
+    schema_text = schema_path.read_text(encoding="utf-8")
     payload = yaml.safe_load(registry_path.read_text(encoding="utf-8")) or {}
-    schema = load_registry_schema(schema_path)
-    jsonschema.validate(instance=payload, schema=schema)
+    validate_registry_payload(payload, schema_text)
     return payload
 
 
+def validate_registry_payload(payload: Any, schema_text: str) -> None:
+    """
+    Validate a registry payload, raising jsonschema.ValidationError like `jsonschema.validate`.
+
+    The validator for each distinct schema is checked and built once and then reused.
+    """
+
+    schema_digest = hashlib.sha256(schema_text.encode("utf-8")).hexdigest()
+    with _cache_lock:
+        validator = _validators.get(schema_digest)
+    if validator is None:
+        schema = yaml.safe_load(schema_text)
+        validator_cls = jsonschema.validators.validator_for(schema)
+        validator_cls.check_schema(schema)
+        validator = validator_cls(schema)
+        with _cache_lock:
+            _validators[schema_digest] = validator
+    error = jsonschema.exceptions.best_match(validator.iter_errors(payload))
+    if error is not None:
+        raise error
+
+
+def compile_registry(registry_path: Path, schema_path: Path) -> CompiledRegistry:
+    """
+    Return the registry's compiled form, parsing and validating it only when it changed.
+
+    Results are memoized per file pair. Unchanged mtimes and sizes are trusted without
+    reading the files; otherwise the contents are hashed, so a touched but identical
+    registry is not recompiled.
+    """
+
+    key = (registry_path.resolve(), schema_path.resolve())
+    stats = tuple((stat.st_mtime_ns, stat.st_size) for stat in (path.stat() for path in key))
+    with _cache_lock:
+        entry = _compiled.get(key)
+    if entry is not None and entry.stats == stats:
+        return entry.registry
+    registry_text = registry_path.read_text(encoding="utf-8")
+    schema_text = schema_path.read_text(encoding="utf-8")
+    digest = hashlib.sha256(f"{registry_text}\0{schema_text}".encode()).hexdigest()
+    if entry is None or entry.digest != digest:
+        payload = yaml.safe_load(registry_text) or {}
+        validate_registry_payload(payload, schema_text)
+        registry = CompiledRegistry(
+            version=str(payload.get("version", "1")),
+            queries=tuple(compile_queries(payload)),
+        )
+        entry = _CompiledEntry(stats=stats, digest=digest, registry=registry)
+    else:
+        entry = replace(entry, stats=stats)
+    with _cache_lock:
+        _compiled[key] = entry
+    return entry.registry
+
+
+def clear_registry_cache() -> None:
+    """Forget every compiled registry and cached validator."""
+
+    with _cache_lock:
+        _compiled.clear()
+        _validators.clear()
+
+
 def load_registry(
     registry_path: Path, schema_path: Path, *, allow_disabled: bool = True
 ) -> list[QueryDefinition]:
     """Load registry YAML and return canonical query definitions."""
 
-    payload = load_registry_payload(registry_path, schema_path)
+    registry = compile_registry(registry_path, schema_path)
+    return list(registry.queries) if allow_disabled else registry.enabled_queries()
+
+
+def compile_queries(payload: dict[str, Any]) -> list[QueryDefinition]:
+    """Compile a validated registry payload into canonical query definitions."""
 
     defaults = payload.get("defaults", {})
     default_libraries = defaults.get("libraries", {})
@@ -119,8 +262,6 @@ def load_registry(
         libraries = query.get("libraries", default_libraries)
         sort = query.get("sort", default_sort)
         enabled = query.get("enabled", True)
-        if not allow_disabled and not enabled:
-            continue
         query_id = query.get("query_id") or query["name"]
         filters_and = compile_filters(query.get("filters_and", []))
         filters_or = compile_filters(query.get("filters_or", []))
@@ -151,8 +292,7 @@ def load_registry(
 def registry_version(registry_path: Path, schema_path: Path) -> str:
     """Return the registry schema version."""
 
-    payload = load_registry_payload(registry_path, schema_path)
-    return str(payload.get("version", "1"))
+    return compile_registry(registry_path, schema_path).version
 
 
 def compile_filters(filters: list[dict[str, Any]]) -> list[Filter]:
@@ -0,0 +1,124 @@
+"""On-disk cache of APS search responses keyed by request fingerprint."""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+ENTRY_SUFFIX = ".json.gz"
+
+
+@dataclass
+class ResponseCache:
+    """
+    Content-addressed store of gzip-compressed search responses.
+
+    Entries live at `<directory>/<key[:2]>/<key>.json.gz`. Entries older than `ttl_s` are
+    misses and are removed on read; once the cache grows past `max_bytes`, the oldest
+    entries are evicted until it is back under 90% of the limit.
+    """
+
+    directory: Path
+    ttl_s: float
+    max_bytes: int
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    _size: int | None = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Return the cached response for `key`, or None if missing or expired."""
+
+        path = self._path(key)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        if time.time() - stat.st_mtime > self.ttl_s:
+            self._remove(path, stat.st_size)
+            self.misses += 1
+            return None
+        try:
+            with gzip.open(path, "rb") as handle:
+                payload = json.loads(handle.read())
+        except (OSError, ValueError):
+            self._remove(path, stat.st_size)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return payload
+
+    def put(self, key: str, payload: dict[str, Any]) -> None:
+        """Store a response under `key`, evicting old entries if the cache is over size."""
+
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = gzip.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temp_path.write_bytes(data)
+        with self._lock:
+            size = self._current_size()
+            try:
+                size -= path.stat().st_size
+            except FileNotFoundError:
+                pass
+            os.replace(temp_path, path)
+            self._size = size + len(data)
+            over_limit = self._size > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    def evict(self) -> int:
+        """Remove expired entries, then the oldest ones until under 90% of `max_bytes`."""
+
+        now = time.time()
+        entries = []
+        for path in self.directory.glob(f"*/*{ENTRY_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for mtime, size, path in entries:
+            if total <= target and now - mtime <= self.ttl_s:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        with self._lock:
+            self._size = total
+        return removed
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss counters and the tracked size in bytes."""
+
+        with self._lock:
+            size = self._current_size()
+        return {"hits": self.hits, "misses": self.misses, "bytes": size}
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{ENTRY_SUFFIX}"
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(
+                path.stat().st_size for path in self.directory.glob(f"*/*{ENTRY_SUFFIX}")
+            )
+        return self._size
+
+    def _remove(self, path: Path, size: int) -> None:
+        path.unlink(missing_ok=True)
+        with self._lock:
+            if self._size is not None:
+                self._size = max(0, self._size - size)
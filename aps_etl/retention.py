@@ -0,0 +1,299 @@
+"""Batched retention and compaction of query runs, discoveries and document metadata."""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import (
+    CursorResult,
+    Delete,
+    Text,
+    Update,
+    bindparam,
+    cast,
+    create_engine,
+    delete,
+    exists,
+    func,
+    null,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.orm import Session
+
+from aps_etl.canonical import sha256_hex
+from aps_etl.db import create_session_factory, store_document_metadata
+from aps_etl.models import (
+    APSDiscovery,
+    APSDocument,
+    APSDocumentMetadata,
+    APSQueryRun,
+    APSQueryState,
+    QueryRunStatus,
+)
+from aps_etl.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_BATCH_RUNS = 100
+DEFAULT_RETENTION_BATCH_DOCUMENTS = 1000
+
+
+@dataclass
+class RetentionReport:
+    """Rows and payload bytes removed by a retention pass."""
+
+    runs_deleted: int = 0
+    discoveries_deleted: int = 0
+    discoveries_compacted: int = 0
+    payload_bytes_reclaimed: int = 0
+    metadata_moved: int = 0
+    metadata_pruned: int = 0
+
+    def describe(self) -> str:
+        """One-line summary of the pass."""
+
+        return (
+            f"{self.runs_deleted} runs and {self.discoveries_deleted} discoveries deleted, "
+            f"{self.discoveries_compacted} discoveries compacted, "
+            f"{self.payload_bytes_reclaimed} payload bytes reclaimed, "
+            f"{self.metadata_moved} documents' metadata moved to the store, "
+            f"{self.metadata_pruned} unreferenced stored payloads pruned"
+        )
+
+
+def apply_retention(
+    session: Session,
+    *,
+    run_retention_days: int,
+    payload_retention_days: int,
+    batch_runs: int = DEFAULT_RETENTION_BATCH_RUNS,
+    metadata_store: bool = False,
+    batch_documents: int = DEFAULT_RETENTION_BATCH_DOCUMENTS,
+    now: datetime | None = None,
+) -> RetentionReport:
+    """
+    Compact, then delete, runs that ended before their retention cutoffs.
+
+    Discoveries of runs older than `payload_retention_days` lose their highlights and
+    semantic-search payloads but keep the accession lineage; runs older than
+    `run_retention_days` are deleted with their discoveries. A value of 0 disables either
+    step. Runs are processed `batch_runs` at a time in run_id order and each batch is
+    committed, so no statement locks more than one batch. Unfinished runs, checkpointed
+    runs and each query's latest successful run are always kept. On Postgres the space
+    is reusable once the table is vacuumed.
+
+    With `metadata_store` set, documents still holding `raw_metadata_json` inline have it
+    moved to the metadata store, `batch_documents` at a time. Stored payloads created
+    before `now` that no document references any more are then pruned, in batches of the
+    same size.
+    """
+
+    now = now or datetime.utcnow()
+    report = RetentionReport()
+    if payload_retention_days > 0:
+        before = now - timedelta(days=payload_retention_days)
+        for run_ids in _expired_run_batches(session, before, batch_runs):
+            _compact_runs(session, run_ids, report)
+            session.commit()
+    if run_retention_days > 0:
+        before = now - timedelta(days=run_retention_days)
+        for run_ids in _expired_run_batches(session, before, batch_runs):
+            _delete_runs(session, run_ids, report)
+            session.commit()
+    if metadata_store:
+        _move_inline_metadata(session, batch_documents, report)
+    _prune_document_metadata(session, batch_documents, now, report)
+    return report
+
+
+def _expired_run_batches(
+    session: Session, before: datetime, batch_runs: int
+) -> Iterator[list[int]]:
+    protected = _protected_run_ids(session)
+    last_run_id = 0
+    while True:
+        run_ids = list(
+            session.scalars(
+                select(APSQueryRun.run_id)
+                .where(APSQueryRun.run_id > last_run_id, APSQueryRun.ended_at < before)
+                .order_by(APSQueryRun.run_id)
+                .limit(max(1, batch_runs))
+            )
+        )
+        if not run_ids:
+            return
+        last_run_id = run_ids[-1]
+        eligible = [run_id for run_id in run_ids if run_id not in protected]
+        if eligible:
+            yield eligible
+
+
+def _protected_run_ids(session: Session) -> set[int]:
+    checkpointed = session.scalars(
+        select(APSQueryState.checkpoint_run_id).where(APSQueryState.checkpoint_run_id.is_not(None))
+    )
+    latest_successful = session.scalars(
+        select(func.max(APSQueryRun.run_id))
+        .where(APSQueryRun.status == QueryRunStatus.SUCCESS, APSQueryRun.ended_at.is_not(None))
+        .group_by(APSQueryRun.query_id)
+    )
+    return {run_id for run_id in (*checkpointed, *latest_successful) if run_id is not None}
+
+
+def _payload_bytes(session: Session, run_ids: list[int]) -> int:
+    total = session.scalar(
+        select(
+            func.coalesce(
+                func.sum(
+                    func.coalesce(func.length(cast(APSDiscovery.highlights_json, Text)), 0)
+                    + func.coalesce(func.length(cast(APSDiscovery.semantic_search_json, Text)), 0)
+                ),
+                0,
+            )
+        ).where(APSDiscovery.run_id.in_(run_ids))
+    )
+    return int(total or 0)
+
+
+def _compact_runs(session: Session, run_ids: list[int], report: RetentionReport) -> None:
+    report.payload_bytes_reclaimed += _payload_bytes(session, run_ids)
+    report.discoveries_compacted += _rowcount(
+        session,
+        update(APSDiscovery)
+        .where(
+            APSDiscovery.run_id.in_(run_ids),
+            or_(
+                APSDiscovery.highlights_json.is_not(None),
+                APSDiscovery.semantic_search_json.is_not(None),
+            ),
+        )
+        # SQL NULL rather than JSON null, so compacted rows are not matched again.
+        .values(highlights_json=null(), semantic_search_json=null()),
+    )
+
+
+def _delete_runs(session: Session, run_ids: list[int], report: RetentionReport) -> None:
+    report.payload_bytes_reclaimed += _payload_bytes(session, run_ids)
+    # Deleting discoveries explicitly keeps each batch bounded instead of relying on a cascade.
+    report.discoveries_deleted += _rowcount(
+        session, delete(APSDiscovery).where(APSDiscovery.run_id.in_(run_ids))
+    )
+    report.runs_deleted += _rowcount(
+        session, delete(APSQueryRun).where(APSQueryRun.run_id.in_(run_ids))
+    )
+
+
+def _move_inline_metadata(session: Session, batch_documents: int, report: RetentionReport) -> None:
+    last_accession = ""
+    clear_inline = (
+        update(APSDocument)
+        .where(APSDocument.accession_number == bindparam("accession"))
+        .values(metadata_hash=bindparam("content_hash"), raw_metadata_json=null())
+    )
+    while True:
+        documents = session.execute(
+            select(
+                APSDocument.accession_number,
+                APSDocument.metadata_hash,
+                APSDocument.raw_metadata_json,
+            )
+            .where(
+                APSDocument.accession_number > last_accession,
+                APSDocument.raw_metadata_json.is_not(None),
+            )
+            .order_by(APSDocument.accession_number)
+            .limit(max(1, batch_documents))
+        ).all()
+        if not documents:
+            return
+        last_accession = documents[-1].accession_number
+        rows = [
+            {
+                "accession": accession,
+                "metadata_hash": content_hash or sha256_hex(raw),
+                "raw_metadata_json": raw,
+            }
+            for accession, content_hash, raw in documents
+        ]
+        store_document_metadata(session, rows)
+        # Run on the connection as one executemany rather than an ORM bulk update.
+        session.connection().execute(
+            clear_inline,
+            [{"accession": row["accession"], "content_hash": row["metadata_hash"]} for row in rows],
+        )
+        report.metadata_moved += len(rows)
+        session.commit()
+
+
+def _prune_document_metadata(
+    session: Session, batch_documents: int, before: datetime, report: RetentionReport
+) -> None:
+    # Payloads stored after the pass started may belong to a run that has not yet
+    # committed the documents referencing them.
+    prunable = (
+        APSDocumentMetadata.created_at < before,
+        ~exists().where(APSDocument.metadata_hash == APSDocumentMetadata.content_hash),
+    )
+    last_hash = ""
+    while True:
+        batch = (
+            select(APSDocumentMetadata.content_hash)
+            .where(APSDocumentMetadata.content_hash > last_hash, *prunable)
+            .order_by(APSDocumentMetadata.content_hash)
+            .limit(max(1, batch_documents))
+            .subquery()
+        )
+        upper_hash = session.scalar(select(func.max(batch.c.content_hash)))
+        if upper_hash is None:
+            return
+        # Checked again in the DELETE in case a payload was referenced after the scan.
+        report.metadata_pruned += _rowcount(
+            session,
+            delete(APSDocumentMetadata).where(
+                APSDocumentMetadata.content_hash > last_hash,
+                APSDocumentMetadata.content_hash <= upper_hash,
+                *prunable,
+            ),
+        )
+        session.commit()
+        last_hash = upper_hash
+
+
+def _rowcount(session: Session, statement: Update | Delete) -> int:
+    result = session.execute(statement)
+    # Bulk UPDATE and DELETE always return a cursor result, which carries the rowcount.
+    assert isinstance(result, CursorResult)
+    return result.rowcount
+
+
+def run_retention(settings: Settings) -> RetentionReport:
+    """Apply the configured retention to the settings' database."""
+
+    engine = create_engine(settings.database_url, future=True)
+    with create_session_factory(engine)() as session:
+        report = apply_retention(
+            session,
+            run_retention_days=settings.retention_run_days,
+            payload_retention_days=settings.retention_payload_days,
+            batch_runs=settings.retention_batch_runs,
+            metadata_store=settings.metadata_store,
+            batch_documents=settings.retention_batch_documents,
+        )
+    logger.info("Retention: %s", report.describe())
+    return report
+
+
+def main() -> None:
+    """Entry point for `python -m aps_etl.retention`."""
+
+    logging.basicConfig(level=logging.INFO)
+    run_retention(Settings.model_validate({}))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,29 +2,55 @@
 
 from __future__ import annotations
 
-from collections.abc import Iterable
-from datetime import date, datetime
+import logging
+import queue
+import threading
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, timedelta
+from itertools import batched
 from pathlib import Path
 from typing import Any
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 
-from aps_etl.canonical import request_fingerprint
+from aps_etl.canonical import request_fingerprint, sha256_hex
 from aps_etl.client import APSClient
 from aps_etl.db import (
+    DISCOVERY_INSERT_BATCH_SIZE,
+    AccessionCache,
     create_session_factory,
+    existing_accessions,
+    get_endpoint_state,
     get_or_create_query_state,
+    has_successful_run,
     insert_discoveries,
     insert_query_run,
-    upsert_document,
+    last_successful_run_started_at,
+    record_endpoint_wire_format,
+    upsert_documents,
     upsert_query,
 )
-from aps_etl.models import APSDiscovery, APSQueryRun, QueryRunStatus
-from aps_etl.registry import QueryDefinition, load_registry, registry_version
+from aps_etl.models import APSQueryRun, APSQueryState, QueryRunStatus
+from aps_etl.partitions import maintain_discovery_partitions
+from aps_etl.pg_copy import copy_load_page, supports_copy
+from aps_etl.pipeline import STOP_POLL_S, Pipeline
+from aps_etl.rate_limit import RateLimiter
+from aps_etl.registry import (
+    QueryDefinition,
+    compile_registry,
+    date_range_bounds,
+    with_date_range,
+)
+from aps_etl.response_cache import ResponseCache
 from aps_etl.serialization import serialize_query
 from aps_etl.settings import Settings
 
+logger = logging.getLogger(__name__)
+
 
 def build_client(settings: Settings) -> APSClient:
     """Build an APS client."""
@@ -32,17 +58,127 @@ def build_client(settings: Settings) -> APSClient:
     return APSClient(
         base_url=settings.aps_base_url,
         api_key=settings.aps_primary_key,
+        secondary_api_keys=secondary_api_keys(settings),
         timeout_s=settings.request_timeout_s,
         retry_max_attempts=settings.retry_max_attempts,
         retry_min_wait_s=settings.retry_min_wait_s,
         retry_max_wait_s=settings.retry_max_wait_s,
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry_s=settings.http_keepalive_expiry_s,
+        http2=settings.http2,
+        response_cache=build_response_cache(settings),
+        rate_limiter=build_rate_limiter(settings),
+    )
+
+
+def secondary_api_keys(settings: Settings) -> tuple[str, ...]:
+    """Return the configured subscription keys besides the primary key."""
+
+    return tuple(key for key in (settings.aps_secondary_key,) if key)
+
+
+def build_rate_limiter(settings: Settings) -> RateLimiter:
+    """
+    Build the client's shared throttle, allowing up to `http_max_connections` in flight.
+
+    APS quotas are per subscription key, so the configured rate and burst are scaled by
+    the number of keys.
+    """
+
+    keys = 1 + len(secondary_api_keys(settings))
+    return RateLimiter(
+        rate_per_s=settings.rate_limit_per_s * keys,
+        burst=settings.rate_limit_burst * keys,
+        max_concurrency=settings.http_max_connections,
+    )
+
+
+def build_response_cache(settings: Settings) -> ResponseCache | None:
+    """Build the on-disk response cache when `response_cache_dir` is set."""
+
+    if settings.response_cache_dir is None:
+        return None
+    return ResponseCache(
+        directory=Path(settings.response_cache_dir),
+        ttl_s=settings.response_cache_ttl_s,
+        max_bytes=settings.response_cache_max_bytes,
+    )
+
+
+def prepare_discovery_partitions(settings: Settings, session: Session) -> None:
+    """
+    Create upcoming aps_discovery partitions and apply partition retention, if partitioned.
+
+    Committed straight away so the partition DDL's lock on aps_discovery is not held for
+    the rest of the run.
+    """
+
+    maintain_discovery_partitions(
+        session,
+        months_ahead=settings.discovery_partition_months_ahead,
+        retention_months=settings.discovery_retention_months,
     )
+    session.commit()
+
+
+def build_accession_cache(settings: Settings, session: Session) -> AccessionCache:
+    """Build the process-wide accession cache, warming it from aps_document if enabled."""
+
+    cache = AccessionCache(settings.accession_cache_size)
+    if settings.accession_cache_warm:
+        cache.warm(session, limit=settings.accession_cache_warm_rows)
+    return cache
 
 
 def load_queries(registry_path: Path, schema_path: Path) -> list[QueryDefinition]:
     """Load enabled queries from registry."""
 
-    return load_registry(registry_path, schema_path, allow_disabled=False)
+    return compile_registry(registry_path, schema_path).enabled_queries()
+
+
+DATE_WINDOW_FIELD = "DateAddedTimestamp"
+
+
+@dataclass(frozen=True)
+class RunOptions:
+    """Execution and loading options applied to every query in a run."""
+
+    prefetch_pages: int = 0
+    pipeline_depth: int = 0
+    stream_results: bool = False
+    stream_batch_size: int = 100
+    discovery_batch_size: int = DISCOVERY_INSERT_BATCH_SIZE
+    copy_loader: bool = False
+    checkpoint_every_pages: int = 0
+    resume: bool = False
+    incremental: bool = False
+    bisect_windows: bool = False
+    early_cutoff: bool = False
+    metadata_store: bool = False
+    shards: int = 1
+    wire_format_ttl_hours: float = 168.0
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> RunOptions:
+        """Build run options from settings."""
+
+        return cls(
+            prefetch_pages=settings.prefetch_pages,
+            pipeline_depth=settings.pipeline_depth,
+            stream_results=settings.stream_results,
+            stream_batch_size=settings.stream_batch_size,
+            discovery_batch_size=settings.discovery_batch_size,
+            copy_loader=settings.copy_loader,
+            checkpoint_every_pages=settings.checkpoint_every_pages,
+            resume=settings.resume_runs,
+            incremental=settings.incremental,
+            bisect_windows=settings.bisect_windows,
+            early_cutoff=settings.early_cutoff,
+            metadata_store=settings.metadata_store,
+            shards=settings.query_shards,
+            wire_format_ttl_hours=settings.wire_format_ttl_hours,
+        )
 
 
 def run_all_queries(
@@ -55,11 +191,14 @@ def run_all_queries(
 
     engine = create_engine(settings.database_url, future=True)
     session_factory = create_session_factory(engine)
-    schema_version = registry_version(registry_path, schema_path)
-    queries = load_queries(registry_path, schema_path)
-    client = build_client(settings)
+    registry = compile_registry(registry_path, schema_path)
+    schema_version = registry.version
+    queries = registry.enabled_queries()
+    options = RunOptions.from_settings(settings)
 
-    with session_factory() as session:
+    with build_client(settings) as client, session_factory() as session:
+        prepare_discovery_partitions(settings, session)
+        accession_cache = build_accession_cache(settings, session)
         for query in queries:
             run_query(
                 session=session,
@@ -67,6 +206,8 @@ def run_all_queries(
                 query=query,
                 schema_version=schema_version,
                 max_pages=settings.max_pages_per_window,
+                options=options,
+                accession_cache=accession_cache,
             )
         session.commit()
 
@@ -78,8 +219,581 @@ def run_query(
     query: QueryDefinition,
     schema_version: str,
     max_pages: int,
+    options: RunOptions | None = None,
+    accession_cache: AccessionCache | None = None,
 ) -> None:
-    """Run a single query with pagination."""
+    """
+    Run a single query with pagination.
+
+    The next skip and page number are checkpointed on the query state after every page and
+    committed every `checkpoint_every_pages` pages. With `resume` set, an unfinished run
+    is continued from its checkpoint instead of starting a new run at skip 0. With
+    `incremental` set, the run only covers DateAddedTimestamp values from the query's
+    watermark (less its safety buffer) to today. With `early_cutoff` set, a single-window
+    run stops at the first page lying wholly behind the watermark (see `watermark_cutoff`).
+    """
+
+    options = options or RunOptions()
+    state = prepare_query(session, query)
+    query_run = resume_query_run(session, state) if options.resume else None
+    if query_run is None:
+        window = plan_window(session, query, state, options)
+        if empty_window(query, window):
+            return
+        wire_format = cached_wire_format(
+            session, query, state, client.base_url, options
+        ) or record_wire_format(session, state, client.base_url, client.probe_wire_format())
+        query_run = start_query_run(
+            session,
+            query=query,
+            state=state,
+            wire_format=wire_format,
+            search_url=client.search_url,
+            schema_version=schema_version,
+            window=window,
+        )
+    query = windowed_query(query, query_run)
+    try:
+        skip = state.checkpoint_skip or 0
+        page_number = state.checkpoint_page or 0
+        if options.shards > 1 and query_run.window_start is not None:
+            seed_shards(query_run, options.shards)
+            page_number = paginate_windows_concurrently(
+                session,
+                client,
+                query,
+                query_run,
+                state,
+                max_pages=max_pages,
+                page_number=page_number,
+                options=options,
+                accession_cache=accession_cache,
+            )
+        elif not options.bisect_windows or query_run.window_start is None:
+            pages_fetched, page_number = paginate(
+                session,
+                client,
+                query,
+                query_run,
+                state,
+                max_pages=max_pages,
+                start_skip=skip,
+                page_number=page_number,
+                options=options,
+                accession_cache=accession_cache,
+                cutoff=watermark_cutoff(session, query, state, options),
+            )
+            if pages_fetched >= max_pages and query_run.stop_reason is None:
+                mark_page_cap_reached(query_run)
+        while options.bisect_windows and (windows := pending_windows(query_run)):
+            page_number, partial = paginate_window(
+                session,
+                client,
+                query,
+                query_run,
+                state,
+                windows[0],
+                max_pages=max_pages,
+                start_skip=skip,
+                page_number=page_number,
+                options=options,
+                accession_cache=accession_cache,
+            )
+            if partial:
+                mark_page_cap_reached(query_run)
+            skip = state.checkpoint_skip = 0
+        finish_query_run(state, query_run)
+    except Exception as exc:  # pragma: no cover - defensive status setting
+        fail_query_run(session, query_run, exc)
+        raise
+    finally:
+        if query_run.ended_at is None:
+            query_run.ended_at = datetime.utcnow()
+
+
+def paginate(
+    session: Session,
+    client: APSClient,
+    query: QueryDefinition,
+    query_run: APSQueryRun,
+    state: APSQueryState,
+    *,
+    max_pages: int,
+    start_skip: int,
+    page_number: int,
+    options: RunOptions,
+    accession_cache: AccessionCache | None,
+    cutoff: date | None = None,
+) -> tuple[int, int]:
+    """
+    Fetch and record up to max_pages pages of one query window.
+
+    Returns (pages_fetched, last_page_number); pages_fetched == max_pages means the cap
+    was reached unless the run records a `stop_reason`. Given a `cutoff` date, paging
+    stops after the first page that is `behind_watermark`. With `stream_results` set (and
+    no prefetch), pages are streamed and recorded in batches of `stream_batch_size`
+    results. With `pipeline_depth` set, pages go through `paginate_pipelined` instead.
+    """
+
+    if options.stream_results and options.prefetch_pages <= 0:
+        return paginate_streamed(
+            session,
+            client,
+            query,
+            query_run,
+            state,
+            max_pages=max_pages,
+            start_skip=start_skip,
+            page_number=page_number,
+            options=options,
+            accession_cache=accession_cache,
+            cutoff=cutoff,
+        )
+    if options.pipeline_depth > 0:
+        return paginate_pipelined(
+            session,
+            client,
+            query,
+            query_run,
+            state,
+            max_pages=max_pages,
+            start_skip=start_skip,
+            page_number=page_number,
+            options=options,
+            accession_cache=accession_cache,
+            cutoff=cutoff,
+        )
+    pages_fetched = 0
+    pages = iter_pages(
+        client,
+        query,
+        wire_format=query_run.wire_format,
+        max_pages=max_pages,
+        prefetch=options.prefetch_pages,
+        start_skip=start_skip,
+    )
+    for skip, results in pages:
+        page_number += 1
+        pages_fetched += 1
+        behind = cutoff is not None and behind_watermark(session, results, cutoff)
+        record_page(
+            session,
+            query_run,
+            results,
+            skip,
+            page_number,
+            options=options,
+            accession_cache=accession_cache,
+        )
+        checkpoint_page(session, state, skip + len(results), page_number, options)
+        if behind:
+            assert cutoff is not None
+            mark_watermark_cutoff(query_run, page_number, cutoff)
+            break
+    return pages_fetched, page_number
+
+
+def paginate_window(
+    session: Session,
+    client: APSClient,
+    query: QueryDefinition,
+    query_run: APSQueryRun,
+    state: APSQueryState,
+    window: tuple[date, date],
+    *,
+    max_pages: int,
+    start_skip: int,
+    page_number: int,
+    options: RunOptions,
+    accession_cache: AccessionCache | None,
+) -> tuple[int, bool]:
+    """
+    Fetch one pending window of a bisected run and settle it.
+
+    A window whose first page reports more results than `max_pages` pages can hold is
+    split before any deeper page is fetched (see `window_overflows`). Otherwise it is
+    paged, and only counts as capped if a page beyond the cap still has results. Returns
+    (last_page_number, partial).
+    """
+
+    windowed = with_date_range(query, DATE_WINDOW_FIELD, *window)
+    skip = start_skip
+    pages_fetched = 0
+    if skip == 0 and max_pages > 0:
+        response = fetch_page(client, windowed, wire_format=query_run.wire_format, skip=0)
+        results = response.get("results", [])
+        if not results or (window[0] < window[1] and window_overflows(response, max_pages)):
+            partial = settle_window(query_run, window, 0, capped=bool(results))
+            return page_number, partial
+        page_number += 1
+        pages_fetched = 1
+        record_page(
+            session,
+            query_run,
+            results,
+            skip,
+            page_number,
+            options=options,
+            accession_cache=accession_cache,
+        )
+        skip += len(results)
+        checkpoint_page(session, state, skip, page_number, options)
+    if pages_fetched < max_pages:
+        more, page_number = paginate(
+            session,
+            client,
+            windowed,
+            query_run,
+            state,
+            max_pages=max_pages - pages_fetched,
+            start_skip=skip,
+            page_number=page_number,
+            options=options,
+            accession_cache=accession_cache,
+        )
+        pages_fetched += more
+        skip = state.checkpoint_skip or skip
+    capped = pages_fetched >= max_pages and bool(
+        fetch_page(client, windowed, wire_format=query_run.wire_format, skip=skip).get("results")
+    )
+    return page_number, settle_window(query_run, window, pages_fetched, capped=capped)
+
+
+def window_overflows(response: dict[str, Any], max_pages: int) -> bool:
+    """Return True if a first page's `count` exceeds what `max_pages` pages of its size hold."""
+
+    count = response.get("count")
+    page_size = len(response.get("results") or [])
+    return isinstance(count, int) and page_size > 0 and count > max_pages * page_size
+
+
+def paginate_pipelined(
+    session: Session,
+    client: APSClient,
+    query: QueryDefinition,
+    query_run: APSQueryRun,
+    state: APSQueryState,
+    *,
+    max_pages: int,
+    start_skip: int,
+    page_number: int,
+    options: RunOptions,
+    accession_cache: AccessionCache | None,
+    cutoff: date | None = None,
+) -> tuple[int, int]:
+    """
+    Like `paginate`, but fetch, transform and load pages on separate pipeline stages.
+
+    Fetching (with `prefetch_pages` speculation, if set) and row mapping run on worker
+    threads while this thread writes to the database, with at most `pipeline_depth` pages
+    queued between stages. Per-stage stats are logged when the window is done.
+    """
+
+    run_id = query_run.run_id
+    started_at = query_run.started_at
+    pages_fetched = 0
+    numbered = page_number
+
+    def transform(
+        page: tuple[int, list[dict[str, Any]]],
+    ) -> tuple[int, int, list[dict[str, Any]], PageRows]:
+        nonlocal numbered
+        skip, results = page
+        numbered += 1
+        rows = transform_page(results, run_id, skip, numbered, discovered_at=started_at)
+        return skip + len(results), numbered, results, rows
+
+    def load(item: tuple[int, int, list[dict[str, Any]], PageRows]) -> None:
+        nonlocal page_number, pages_fetched
+        next_skip, page_number, results, rows = item
+        pages_fetched += 1
+        behind = cutoff is not None and behind_watermark(session, results, cutoff)
+        load_page(session, rows, options=options, accession_cache=accession_cache)
+        checkpoint_page(session, state, next_skip, page_number, options)
+        if behind:
+            assert cutoff is not None
+            mark_watermark_cutoff(query_run, page_number, cutoff)
+            pipeline.stop()
+
+    pipeline = Pipeline(
+        source=iter_pages(
+            client,
+            query,
+            wire_format=query_run.wire_format,
+            max_pages=max_pages,
+            prefetch=options.prefetch_pages,
+            start_skip=start_skip,
+        ),
+        transform=transform,
+        load=load,
+        depth=options.pipeline_depth,
+    )
+    stats = pipeline.run()
+    logger.info(
+        "Query %s pipeline: %s",
+        query_run.query_id,
+        "; ".join(stage.describe() for stage in stats.values()),
+    )
+    return pages_fetched, page_number
+
+
+def paginate_streamed(
+    session: Session,
+    client: APSClient,
+    query: QueryDefinition,
+    query_run: APSQueryRun,
+    state: APSQueryState,
+    *,
+    max_pages: int,
+    start_skip: int,
+    page_number: int,
+    options: RunOptions,
+    accession_cache: AccessionCache | None,
+    cutoff: date | None = None,
+) -> tuple[int, int]:
+    """
+    Like `paginate`, but record each page in batches while its response is still streaming.
+
+    Peak memory is bounded by `stream_batch_size` results rather than a whole page.
+    """
+
+    skip = start_skip
+    pages_fetched = 0
+    while pages_fetched < max_pages:
+        payload = serialize_query(query, wire_format=query_run.wire_format, skip=skip)
+        page_size = 0
+        behind = cutoff is not None
+        for batch in batched(client.search_stream(payload), max(1, options.stream_batch_size)):
+            if page_size == 0:
+                page_number += 1
+            if behind:
+                assert cutoff is not None
+                behind = behind_watermark(session, batch, cutoff)
+            record_page(
+                session,
+                query_run,
+                batch,
+                skip,
+                page_number,
+                options=options,
+                accession_cache=accession_cache,
+            )
+            page_size += len(batch)
+        if page_size == 0:
+            break
+        pages_fetched += 1
+        skip += page_size
+        checkpoint_page(session, state, skip, page_number, options)
+        if behind:
+            assert cutoff is not None
+            mark_watermark_cutoff(query_run, page_number, cutoff)
+            break
+    return pages_fetched, page_number
+
+
+@dataclass
+class _WindowEvent:
+    """A page fetched for a window, or the end (or failure) of that window's pagination."""
+
+    window: tuple[date, date]
+    skip: int = 0
+    results: list[dict[str, Any]] | None = None
+    pages_fetched: int = 0
+    capped: bool = False
+    error: BaseException | None = None
+
+
+def paginate_windows_concurrently(
+    session: Session,
+    client: APSClient,
+    query: QueryDefinition,
+    query_run: APSQueryRun,
+    state: APSQueryState,
+    *,
+    max_pages: int,
+    page_number: int,
+    options: RunOptions,
+    accession_cache: AccessionCache | None,
+) -> int:
+    """
+    Fetch the run's pending windows on `options.shards` worker threads.
+
+    Workers only talk to APS; every page is recorded on the calling thread, so the
+    session is never shared across threads. Repeats across windows are absorbed by the
+    discovery insert's ON CONFLICT DO NOTHING. Workers hand over pages through a queue of
+    `options.shards` slots, so a slow writer holds them back instead of letting fetched
+    pages pile up. Windows restart from skip 0 on resume. With `bisect_windows` set,
+    capped windows are split and their halves are fetched concurrently as well; as in
+    `paginate_window`, an overflowing window is split after its first page. Returns the
+    last page number.
+    """
+
+    events: queue.Queue[_WindowEvent] = queue.Queue(maxsize=max(1, options.shards))
+    stop = threading.Event()
+
+    def publish(event: _WindowEvent) -> bool:
+        while not stop.is_set():
+            try:
+                events.put(event, timeout=STOP_POLL_S)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch_window(window: tuple[date, date]) -> None:
+        windowed = with_date_range(query, DATE_WINDOW_FIELD, *window)
+        pages_fetched = 0
+        next_skip = 0
+        try:
+            if max_pages > 0:
+                first = fetch_page(client, windowed, wire_format=query_run.wire_format, skip=0)
+                results = first.get("results", [])
+                splittable = options.bisect_windows and window[0] < window[1]
+                if splittable and window_overflows(first, max_pages):
+                    publish(_WindowEvent(window, capped=True))
+                    return
+                if results:
+                    pages_fetched = 1
+                    next_skip = len(results)
+                    if not publish(_WindowEvent(window, skip=0, results=results)):
+                        return
+            if 0 < pages_fetched < max_pages:
+                pages = iter_pages(
+                    client,
+                    windowed,
+                    wire_format=query_run.wire_format,
+                    max_pages=max_pages - pages_fetched,
+                    start_skip=next_skip,
+                )
+                for skip, results in pages:
+                    pages_fetched += 1
+                    next_skip = skip + len(results)
+                    if not publish(_WindowEvent(window, skip=skip, results=results)):
+                        return
+            capped = pages_fetched >= max_pages and bool(
+                fetch_page(client, windowed, wire_format=query_run.wire_format, skip=next_skip).get(
+                    "results"
+                )
+            )
+            publish(_WindowEvent(window, pages_fetched=pages_fetched, capped=capped))
+        except BaseException as exc:
+            publish(_WindowEvent(window, error=exc))
+
+    executor = ThreadPoolExecutor(max_workers=options.shards)
+    in_flight: set[tuple[date, date]] = set()
+    try:
+        while True:
+            for window in pending_windows(query_run):
+                if window not in in_flight:
+                    in_flight.add(window)
+                    executor.submit(fetch_window, window)
+            if not in_flight:
+                return page_number
+            event = events.get()
+            if event.error is not None:
+                raise event.error
+            if event.results is not None:
+                page_number += 1
+                record_page(
+                    session,
+                    query_run,
+                    event.results,
+                    event.skip,
+                    page_number,
+                    options=options,
+                    accession_cache=accession_cache,
+                )
+                checkpoint_page(session, state, 0, page_number, options)
+                continue
+            in_flight.discard(event.window)
+            partial = settle_window(
+                query_run,
+                event.window,
+                event.pages_fetched,
+                capped=event.capped,
+                split=options.bisect_windows,
+            )
+            if partial:
+                mark_page_cap_reached(query_run)
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def fetch_page(
+    client: APSClient, query: QueryDefinition, *, wire_format: str, skip: int
+) -> dict[str, Any]:
+    """Fetch one search response for `query` at `skip`."""
+
+    return client.search(serialize_query(query, wire_format=wire_format, skip=skip))
+
+
+def iter_pages(
+    client: APSClient,
+    query: QueryDefinition,
+    *,
+    wire_format: str,
+    max_pages: int,
+    prefetch: int = 0,
+    start_skip: int = 0,
+) -> Iterator[tuple[int, list[dict[str, Any]]]]:
+    """
+    Yield (skip, results) for each non-empty page, up to max_pages pages.
+
+    With prefetch > 0, the page size of the first page is used as the skip stride and up
+    to `prefetch` further pages are requested on worker threads while the caller processes
+    the current one. Speculative pages past the first empty page are discarded, and if a
+    page comes back shorter than the stride the speculation restarts from its real offset.
+    """
+
+    def fetch(skip: int) -> list[dict[str, Any]]:
+        return fetch_page(client, query, wire_format=wire_format, skip=skip).get("results", [])
+
+    if max_pages <= 0:
+        return
+    skip = start_skip
+    results = fetch(skip)
+    if not results:
+        return
+    fetched = 1
+    yield skip, results
+    stride = len(results)
+    skip += stride
+
+    if prefetch <= 0:
+        while fetched < max_pages:
+            results = fetch(skip)
+            if not results:
+                return
+            fetched += 1
+            yield skip, results
+            skip += len(results)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=prefetch)
+    pending: deque[tuple[int, Future[list[dict[str, Any]]]]] = deque()
+    try:
+        while fetched < max_pages:
+            while len(pending) < prefetch and fetched + len(pending) < max_pages:
+                pending.append((skip, executor.submit(fetch, skip)))
+                skip += stride
+            page_skip, future = pending.popleft()
+            results = future.result()
+            if not results:
+                return
+            fetched += 1
+            yield page_skip, results
+            if len(results) != stride:
+                for _, stale in pending:
+                    stale.cancel()
+                pending.clear()
+                skip = page_skip + len(results)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def prepare_query(session: Session, query: QueryDefinition) -> APSQueryState:
+    """Persist the query definition and return its state row."""
 
     upsert_query(
         session,
@@ -90,7 +804,7 @@ def run_query(
             "enabled": query.enabled,
         },
     )
-    state = get_or_create_query_state(
+    return get_or_create_query_state(
         session,
         query.query_id,
         {
@@ -99,99 +813,510 @@ def run_query(
             "wire_format": query.wire_format,
         },
     )
-    wire_format = state.wire_format or client.probe_wire_format(query)
+
+
+def cached_wire_format(
+    session: Session,
+    query: QueryDefinition,
+    state: APSQueryState,
+    base_url: str,
+    options: RunOptions,
+    *,
+    now: datetime | None = None,
+) -> str | None:
+    """
+    Return the query's pinned wire format or the endpoint's still-fresh detection.
+
+    Detections older than `wire_format_ttl_hours` return None so the endpoint is probed
+    again; a fresh detection's verification time is copied onto the query state.
+    """
+
+    if query.wire_format is not None:
+        return query.wire_format
+    endpoint = get_endpoint_state(session, base_url)
+    if endpoint is None:
+        return None
+    now = now or datetime.utcnow()
+    age = now - _naive_utc(endpoint.wire_format_verified_at)
+    if age > timedelta(hours=options.wire_format_ttl_hours):
+        return None
+    state.wire_format_verified_at = endpoint.wire_format_verified_at
+    return endpoint.wire_format
+
+
+def record_wire_format(
+    session: Session, state: APSQueryState, base_url: str, wire_format: str
+) -> str:
+    """Persist a freshly probed wire format for the endpoint and the query state."""
+
+    verified_at = datetime.utcnow()
+    record_endpoint_wire_format(session, base_url, wire_format, verified_at)
+    state.wire_format_verified_at = verified_at
+    return wire_format
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(UTC).replace(tzinfo=None)
+
+
+def start_query_run(
+    session: Session,
+    *,
+    query: QueryDefinition,
+    state: APSQueryState,
+    wire_format: str,
+    search_url: str,
+    schema_version: str,
+    window: tuple[date, date] | None = None,
+) -> APSQueryRun:
+    """Record the wire format and insert a new query run over `window`."""
+
     state.wire_format = wire_format
-    state.wire_format_verified_at = datetime.utcnow()
 
+    if window is not None:
+        query = with_date_range(query, DATE_WINDOW_FIELD, *window)
     base_payload = serialize_query(query, wire_format=wire_format, skip=0)
     fingerprint = request_fingerprint(
         method="POST",
-        url=f"{client.base_url}/aps/api/search",
+        url=search_url,
         wire_format=wire_format,
         body=base_payload,
     )
     query_run = APSQueryRun(
         query_id=query.query_id,
+        started_at=datetime.now(UTC),
         status=QueryRunStatus.SUCCESS,
         wire_format=wire_format,
         request_fingerprint=fingerprint,
         schema_version=schema_version,
+        window_start=window[0] if window is not None else None,
+        window_end=window[1] if window is not None else None,
     )
     insert_query_run(session, query_run)
-    try:
-        skip = 0
-        page_number = 0
-        total_pages = 0
-        while True:
-            if total_pages >= max_pages:
-                query_run.status = QueryRunStatus.PARTIAL
-                query_run.notes = "Page cap reached for window."
-                break
-            payload = serialize_query(query, wire_format=wire_format, skip=skip)
-            response = client.search(payload)
-            results = response.get("results", [])
-            if not results:
-                break
-            page_number += 1
-            discoveries = build_discoveries(results, query_run.run_id, skip, page_number, session)
-            insert_discoveries(session, discoveries)
-            skip += len(results)
-            total_pages += 1
-    except Exception as exc:  # pragma: no cover - defensive status setting
-        query_run.status = QueryRunStatus.FAILED
-        query_run.error_message = str(exc)
-        query_run.ended_at = datetime.utcnow()
+    state.checkpoint_run_id = query_run.run_id
+    state.checkpoint_skip = 0
+    state.checkpoint_page = 0
+    return query_run
+
+
+def resume_query_run(session: Session, state: APSQueryState) -> APSQueryRun | None:
+    """
+    Reopen the unfinished run recorded on the query state's checkpoint, if any.
+
+    A run with a window already settled as partial stays PARTIAL, so finishing it neither
+    clears the checkpoint nor advances the watermark over dates it could not fetch.
+    """
+
+    if state.checkpoint_run_id is None:
+        return None
+    query_run = session.get(APSQueryRun, state.checkpoint_run_id)
+    if query_run is None:
+        state.checkpoint_run_id = None
+        state.checkpoint_skip = None
+        state.checkpoint_page = None
+        return None
+    query_run.error_message = None
+    query_run.ended_at = None
+    if any(entry["status"] == "partial" for entry in _window_entries(query_run)):
+        mark_page_cap_reached(query_run)
+    else:
+        query_run.status = QueryRunStatus.SUCCESS
+        query_run.notes = f"Resumed at skip {state.checkpoint_skip or 0}."
+    return query_run
+
+
+def checkpoint_page(
+    session: Session,
+    state: APSQueryState,
+    next_skip: int,
+    page_number: int,
+    options: RunOptions,
+) -> None:
+    """Advance the query state's checkpoint, committing every N pages when enabled."""
+
+    state.checkpoint_skip = next_skip
+    state.checkpoint_page = page_number
+    every = options.checkpoint_every_pages
+    if every > 0 and page_number % every == 0:
         session.commit()
-        raise
-    finally:
-        if query_run.ended_at is None:
-            query_run.ended_at = datetime.utcnow()
 
 
-def build_discoveries(
+def finish_query_run(state: APSQueryState, query_run: APSQueryRun) -> None:
+    """Clear the checkpoint and advance the watermark once a run has completed successfully."""
+
+    if query_run.status == QueryRunStatus.SUCCESS:
+        state.checkpoint_run_id = None
+        state.checkpoint_skip = None
+        state.checkpoint_page = None
+        if query_run.window_end is not None:
+            state.last_seen_date = max(state.last_seen_date, query_run.window_end)
+
+
+def plan_window(
+    session: Session,
+    query: QueryDefinition,
+    state: APSQueryState,
+    options: RunOptions,
+    *,
+    today: date | None = None,
+) -> tuple[date, date] | None:
+    """
+    Return the DateAddedTimestamp window a new run should cover.
+
+    Outside incremental mode, and until the query has completed a run, this is the
+    registry's own date range (if any). Incremental runs cover
+    [last_seen_date - safety_buffer_days, today], clipped to the registry range; once the
+    watermark has passed a closed registry range the window is empty (see `empty_window`).
+    """
+
+    bounds = date_range_bounds(query, DATE_WINDOW_FIELD)
+    if not options.incremental or not has_successful_run(session, query.query_id):
+        return bounds
+    start = state.last_seen_date - timedelta(days=state.safety_buffer_days)
+    end = today or date.today()
+    if bounds is not None:
+        start, end = max(start, bounds[0]), min(end, bounds[1])
+    return start, end
+
+
+def empty_window(query: QueryDefinition, window: tuple[date, date] | None) -> bool:
+    """Return True, and log it, if `window` starts after it ends so there is nothing to fetch."""
+
+    if window is None or window[0] <= window[1]:
+        return False
+    logger.info(
+        "Query %s skipped: its date range ends %s, before the incremental window starts %s.",
+        query.query_id,
+        window[1].isoformat(),
+        window[0].isoformat(),
+    )
+    return True
+
+
+def pending_windows(query_run: APSQueryRun) -> list[tuple[date, date]]:
+    """
+    Return the date windows the run still has to execute, in order.
+
+    The run's own window seeds the list the first time it is asked for.
+    """
+
+    if query_run.windows_json is None:
+        if query_run.window_start is None or query_run.window_end is None:
+            return []
+        query_run.windows_json = [
+            _window_entry(query_run.window_start, query_run.window_end, "pending")
+        ]
+    return [
+        (date.fromisoformat(entry["start"]), date.fromisoformat(entry["end"]))
+        for entry in _window_entries(query_run)
+        if entry["status"] == "pending"
+    ]
+
+
+def settle_window(
+    query_run: APSQueryRun,
+    window: tuple[date, date],
+    pages_fetched: int,
+    *,
+    capped: bool,
+    split: bool = True,
+) -> bool:
+    """
+    Record the outcome of an executed window on the run.
+
+    A `capped` window has results beyond those fetched. With `split` set, it is split in
+    half and both halves are queued; a single-day window cannot be split and is recorded
+    as partial. Returns True if the window was left partial.
+    """
+
+    start, end = window
+    entries = _window_entries(query_run)
+    index = next(
+        (
+            position
+            for position, entry in enumerate(entries)
+            if entry["status"] == "pending"
+            and (entry["start"], entry["end"]) == (start.isoformat(), end.isoformat())
+        ),
+        len(entries),
+    )
+    if capped and split and start < end:
+        status = "split"
+        queued = [_window_entry(*half, "pending") for half in split_window(start, end, 2)]
+    else:
+        status = "partial" if capped else "complete"
+        queued = []
+    entries[index : index + 1] = [
+        {**_window_entry(start, end, status), "pages": pages_fetched},
+        *queued,
+    ]
+    query_run.windows_json = entries
+    return status == "partial"
+
+
+def seed_shards(query_run: APSQueryRun, shards: int) -> None:
+    """Queue the run's window as `shards` disjoint pending windows, unless already queued."""
+
+    if query_run.windows_json is not None:
+        return
+    if query_run.window_start is None or query_run.window_end is None:
+        return
+    query_run.windows_json = [
+        _window_entry(*shard, "pending")
+        for shard in split_window(query_run.window_start, query_run.window_end, shards)
+    ]
+
+
+def split_window(start: date, end: date, parts: int) -> list[tuple[date, date]]:
+    """Split an inclusive date range into at most `parts` contiguous, disjoint ranges."""
+
+    days = (end - start).days + 1
+    parts = max(1, min(parts, days))
+    bounds = [start + timedelta(days=days * index // parts) for index in range(parts + 1)]
+    return [(bounds[index], bounds[index + 1] - timedelta(days=1)) for index in range(parts)]
+
+
+def _window_entries(query_run: APSQueryRun) -> list[dict[str, Any]]:
+    windows = query_run.windows_json
+    return list(windows) if isinstance(windows, list) else []
+
+
+def _window_entry(start: date, end: date, status: str) -> dict[str, Any]:
+    return {"start": start.isoformat(), "end": end.isoformat(), "status": status}
+
+
+def windowed_query(query: QueryDefinition, query_run: APSQueryRun) -> QueryDefinition:
+    """Apply the run's recorded date window to the query."""
+
+    if query_run.window_start is None or query_run.window_end is None:
+        return query
+    return with_date_range(query, DATE_WINDOW_FIELD, query_run.window_start, query_run.window_end)
+
+
+@dataclass
+class PageRows:
+    """Document upsert rows and discovery rows derived from one page of results."""
+
+    documents: list[dict[str, Any]]
+    discoveries: list[dict[str, Any]]
+
+
+def record_page(
+    session: Session,
+    query_run: APSQueryRun,
+    results: Iterable[dict[str, Any]],
+    skip: int,
+    page_number: int,
+    *,
+    options: RunOptions | None = None,
+    accession_cache: AccessionCache | None = None,
+) -> None:
+    """Upsert documents and insert discoveries for one page of results."""
+
+    load_page(
+        session,
+        transform_page(
+            results, query_run.run_id, skip, page_number, discovered_at=query_run.started_at
+        ),
+        options=options,
+        accession_cache=accession_cache,
+    )
+
+
+def transform_page(
     results: Iterable[dict[str, Any]],
     run_id: int,
     skip_value: int,
     page_number: int,
+    *,
+    seen_at: datetime | None = None,
+    discovered_at: datetime | None = None,
+) -> PageRows:
+    """
+    Map a page of search results onto rows, without touching the database.
+
+    Runs pass their `started_at` as `discovered_at`, so all of a run's discoveries fall in
+    one aps_discovery partition; without it the column's default applies.
+    """
+
+    hits = page_hits(results)
+    seen_at = seen_at or datetime.utcnow()
+    return PageRows(
+        documents=[document_row(result["document"], seen_at) for result in hits],
+        discoveries=[
+            discovery_row(result, run_id, skip_value, page_number, discovered_at=discovered_at)
+            for result in hits
+        ],
+    )
+
+
+def load_page(
     session: Session,
-) -> list[APSDiscovery]:
-    """Create discovery rows and ensure document stubs exist."""
-
-    discoveries: list[APSDiscovery] = []
-    for result in results:
-        document = result.get("document", {})
-        accession = document.get("AccessionNumber")
-        if not accession:
-            continue
-        is_package = str(document.get("IsPackage", "No")).lower() in {"yes", "true", "1"}
-        canonical_accession = upsert_document(
+    rows: PageRows,
+    *,
+    options: RunOptions | None = None,
+    accession_cache: AccessionCache | None = None,
+) -> None:
+    """
+    Write a transformed page.
+
+    With `copy_loader` set and a psycopg Postgres session, the page is loaded through the
+    COPY staging table instead of multi-row upserts.
+    """
+
+    options = options or RunOptions()
+    if options.copy_loader and supports_copy(session):
+        copy_load_page(
             session,
-            accession,
-            {
-                "url": document.get("Url"),
-                "is_package": is_package,
-                "is_stub": True,
-                "document_date": parse_date(document.get("DocumentDate")),
-                "date_added_timestamp": parse_datetime(document.get("DateAddedTimestamp")),
-                "document_type": normalize_json_value(document.get("DocumentType")),
-                "docket_number": normalize_json_value(document.get("DocketNumber")),
-                "title": document.get("DocumentTitle"),
-                "raw_metadata_json": document,
-                "last_seen_at": datetime.utcnow(),
-            },
+            [
+                {**discovery, **document}
+                for discovery, document in zip(rows.discoveries, rows.documents, strict=True)
+            ],
+            metadata_store=options.metadata_store,
         )
-        discoveries.append(
-            APSDiscovery(
-                run_id=run_id,
-                accession_number=canonical_accession,
-                skip_value=skip_value,
-                page_number=page_number,
-                search_score=result.get("score"),
-                highlights_json=result.get("highlights"),
-                semantic_search_json=result.get("semanticSearch"),
-            )
-        )
-    return discoveries
+        return
+    discoveries = resolve_discoveries(
+        session, rows, accession_cache=accession_cache, metadata_store=options.metadata_store
+    )
+    insert_discoveries(session, discoveries, batch_size=options.discovery_batch_size)
+
+
+def watermark_cutoff(
+    session: Session,
+    query: QueryDefinition,
+    state: APSQueryState,
+    options: RunOptions,
+) -> date | None:
+    """
+    Return the date before which a fully loaded page ends pagination, if early cutoff applies.
+
+    Early cutoff needs `early_cutoff` set, a DateAddedTimestamp DESC sort (so every later
+    page is older still) and a completed successful run. That run loaded everything added
+    before it started, so the cutoff is its start date less the safety buffer; unlike
+    `last_seen_date`, it also moves forward for runs without a date window.
+    """
+
+    if not options.early_cutoff:
+        return None
+    if query.sort.field != DATE_WINDOW_FIELD or query.sort.direction != "DESC":
+        return None
+    started_at = last_successful_run_started_at(session, query.query_id)
+    if started_at is None:
+        return None
+    return started_at.date() - timedelta(days=state.safety_buffer_days)
+
+
+def behind_watermark(session: Session, results: Iterable[dict[str, Any]], cutoff: date) -> bool:
+    """
+    Return True if every result was added before `cutoff` and is already in aps_document.
+
+    Must be checked before the page is recorded, since recording upserts its documents.
+    """
+
+    hits = page_hits(results)
+    if not hits:
+        return False
+    for hit in hits:
+        added = parse_datetime(hit["document"].get("DateAddedTimestamp"))
+        if added is None or added.date() >= cutoff:
+            return False
+    accessions = {hit["document"]["AccessionNumber"].strip().lower() for hit in hits}
+    return existing_accessions(session, accessions) == accessions
+
+
+def mark_watermark_cutoff(query_run: APSQueryRun, page_number: int, cutoff: date) -> None:
+    """Record that pagination stopped early because a page was behind the watermark."""
+
+    query_run.stop_reason = (
+        f"Page {page_number} was added before {cutoff.isoformat()} and already loaded."
+    )
+
+
+def mark_page_cap_reached(query_run: APSQueryRun) -> None:
+    """Mark a run as partial because the page cap was reached."""
+
+    query_run.status = QueryRunStatus.PARTIAL
+    query_run.notes = "Page cap reached for window."
+
+
+def fail_query_run(session: Session, query_run: APSQueryRun, exc: BaseException) -> None:
+    """Persist a failed query run."""
+
+    query_run.status = QueryRunStatus.FAILED
+    query_run.error_message = str(exc)
+    query_run.ended_at = datetime.utcnow()
+    session.commit()
+
+
+def resolve_discoveries(
+    session: Session,
+    rows: PageRows,
+    *,
+    accession_cache: AccessionCache | None = None,
+    metadata_store: bool = False,
+) -> list[dict[str, Any]]:
+    """Upsert a page's documents and return its discoveries keyed by canonical accession."""
+
+    accessions = upsert_documents(
+        session, rows.documents, cache=accession_cache, metadata_store=metadata_store
+    )
+    return [
+        {**discovery, "accession_number": canonical_accession}
+        for discovery, canonical_accession in zip(rows.discoveries, accessions, strict=True)
+    ]
+
+
+def page_hits(results: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Return the results that carry an accession number."""
+
+    return [result for result in results if result.get("document", {}).get("AccessionNumber")]
+
+
+def discovery_row(
+    result: dict[str, Any],
+    run_id: int,
+    skip_value: int,
+    page_number: int,
+    *,
+    discovered_at: datetime | None = None,
+) -> dict[str, Any]:
+    """Map an APS search result onto aps_discovery values, keyed by its raw accession."""
+
+    row = {
+        "run_id": run_id,
+        "accession_number": result["document"]["AccessionNumber"],
+        "skip_value": skip_value,
+        "page_number": page_number,
+        "search_score": result.get("score"),
+        "highlights_json": result.get("highlights"),
+        "semantic_search_json": result.get("semanticSearch"),
+    }
+    if discovered_at is not None:
+        row["discovered_at"] = discovered_at
+    return row
+
+
+def document_row(document: dict[str, Any], seen_at: datetime) -> dict[str, Any]:
+    """Map an APS search document onto aps_document upsert values."""
+
+    is_package = str(document.get("IsPackage", "No")).lower() in {"yes", "true", "1"}
+    return {
+        "accession_number": document["AccessionNumber"],
+        "url": document.get("Url"),
+        "is_package": is_package,
+        "is_stub": True,
+        "document_date": parse_date(document.get("DocumentDate")),
+        "date_added_timestamp": parse_datetime(document.get("DateAddedTimestamp")),
+        "document_type": normalize_json_value(document.get("DocumentType")),
+        "docket_number": normalize_json_value(document.get("DocketNumber")),
+        "title": document.get("DocumentTitle"),
+        "raw_metadata_json": document,
+        "metadata_hash": sha256_hex(document),
+        "last_seen_at": seen_at,
+        "last_modified_at": seen_at,
+    }
 
 
 def parse_date(value: str | None) -> date | None:
@@ -37,6 +37,12 @@ def serialize_query(query: QueryDefinition, wire_format: str, skip: int) -> dict
     raise ValueError(f"Unsupported wire format: {wire_format}")
 
 
+def payload_wire_format(payload: dict[str, Any]) -> str:
+    """Return the wire format a serialized search payload was built with."""
+
+    return "B" if isinstance(payload.get("sortDirection"), str) else "A"
+
+
 def serialize_filter_a(filter_: Filter) -> dict[str, Any]:
     """Serialize a filter using APS wire format A."""
 
@@ -30,4 +30,39 @@ class Settings(BaseSettings):
     retry_min_wait_s: float = Field(default=0.5)
     retry_max_wait_s: float = Field(default=5.0)
 
+    http_max_connections: int = Field(default=10)
+    http_max_keepalive_connections: int = Field(default=5)
+    http_keepalive_expiry_s: float = Field(default=30.0)
+    http2: bool = Field(default=False)
+    rate_limit_per_s: float = Field(default=0.0)
+    rate_limit_burst: int = Field(default=10)
+
+    response_cache_dir: str | None = Field(default=None)
+    response_cache_ttl_s: float = Field(default=86_400.0)
+    response_cache_max_bytes: int = Field(default=512 * 1024 * 1024)
+    wire_format_ttl_hours: float = Field(default=168.0)
+
     max_pages_per_window: int = Field(default=200)
+    query_concurrency: int = Field(default=4)
+    prefetch_pages: int = Field(default=0)
+    pipeline_depth: int = Field(default=0)
+    stream_results: bool = Field(default=False)
+    stream_batch_size: int = Field(default=100)
+    discovery_batch_size: int = Field(default=1000)
+    copy_loader: bool = Field(default=False)
+    metadata_store: bool = Field(default=False)
+    accession_cache_size: int = Field(default=100_000)
+    accession_cache_warm: bool = Field(default=True)
+    accession_cache_warm_rows: int = Field(default=10_000)
+    checkpoint_every_pages: int = Field(default=0)
+    resume_runs: bool = Field(default=False)
+    incremental: bool = Field(default=False)
+    bisect_windows: bool = Field(default=False)
+    early_cutoff: bool = Field(default=False)
+    query_shards: int = Field(default=1)
+    discovery_partition_months_ahead: int = Field(default=2)
+    discovery_retention_months: int = Field(default=0)
+    retention_run_days: int = Field(default=0)
+    retention_payload_days: int = Field(default=0)
+    retention_batch_runs: int = Field(default=100)
+    retention_batch_documents: int = Field(default=1000)
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
 import json
+from datetime import UTC, datetime
 from typing import Any
 
 import vcr
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
 
 from aps_etl.canonical import canon_json_bytes
+from aps_etl.db import record_endpoint_wire_format
+
+RECORDED_BASE_URL = "https://adams-api.nrc.gov"
 
 
 def normalized_body_matcher(request1: Any, request2: Any) -> bool:
@@ -40,3 +46,13 @@ def build_vcr(record_mode: str) -> vcr.VCR:
     )
     recorder.register_matcher("normalized_body", normalized_body_matcher)
     return recorder
+
+
+def seed_recorded_wire_format(database_url: str) -> None:
+    """Store the wire format the cassettes were recorded with so replay skips the probe."""
+
+    engine = create_engine(database_url, future=True)
+    with Session(engine) as session:
+        record_endpoint_wire_format(session, RECORDED_BASE_URL, "A", datetime.now(UTC))
+        session.commit()
+    engine.dispose()
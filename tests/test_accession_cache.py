@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from aps_etl.db import AccessionCache, upsert_documents
+from aps_etl.models import APSDocument, Base
+
+
+def test_accession_cache_evicts_least_recently_used() -> None:
+    cache = AccessionCache(maxsize=2)
+    cache.put("ml1", "ML1")
+    cache.put("ml2", "ML2")
+    assert cache.get("ml1") == "ML1"
+    cache.put("ml3", "ML3")
+
+    assert cache.get("ml2") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 2}
+
+
+def test_warm_cache_skips_accession_lookups() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    selects: list[str] = []
+
+    with Session(engine) as session:
+        session.add(
+            APSDocument(
+                accession_number="ml-existing",
+                accession_number_lower="ml-existing",
+                is_stub=True,
+                is_package=False,
+            )
+        )
+        session.commit()
+        cache = AccessionCache(maxsize=10)
+
+        assert cache.warm(session) == 1
+
+        def _record(*args: Any) -> None:
+            if args[2].startswith("SELECT"):
+                selects.append(args[2])
+
+        event.listen(engine, "before_cursor_execute", _record)
+        first = upsert_documents(session, [{"accession_number": "ML-EXISTING"}], cache=cache)
+        upsert_documents(session, [{"accession_number": "ml-new"}], cache=cache)
+        second = upsert_documents(session, [{"accession_number": "ML-NEW"}], cache=cache)
+        event.remove(engine, "before_cursor_execute", _record)
+
+    assert first == ["ml-existing"]
+    assert second == ["ML-NEW"]
+    assert len(selects) == 1
+    assert cache.hits == 2
+    assert cache.misses == 1
+
+
+def test_warm_streams_at_most_limit_rows() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        session.add_all(
+            APSDocument(
+                accession_number=f"ML-{index}",
+                accession_number_lower=f"ml-{index}",
+                is_stub=True,
+                is_package=False,
+            )
+            for index in range(25)
+        )
+        session.commit()
+        statements: list[str] = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        cache = AccessionCache(maxsize=100)
+
+        loaded = cache.warm(session, limit=12, batch_size=5)
+        capped = AccessionCache(maxsize=3).warm(session, limit=12)
+
+    assert loaded == 12
+    assert len(cache) == 12
+    assert "ORDER BY" not in statements[0]
+    assert capped == 3
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import replace
+from typing import Any
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from aps_etl.async_runner import run_queries_async
+from aps_etl.client import AsyncAPSClient
+from aps_etl.models import APSDiscovery, APSQuery, APSQueryRun, Base, QueryRunStatus
+from aps_etl.registry import Libraries, QueryDefinition, SortSpec, compile_date_range_filter
+from aps_etl.runner import RunOptions, record_page
+
+
+def _query(query_id: str) -> QueryDefinition:
+    return QueryDefinition(
+        query_id=query_id,
+        name=query_id,
+        q=query_id,
+        filters_and=(),
+        filters_or=(),
+        libraries=Libraries(legacy=True, main=True),
+        sort=SortSpec(field="DateAddedTimestamp", direction="DESC"),
+        content=False,
+        safety_buffer_days=3,
+        wire_format="A",
+        enabled=True,
+    )
+
+
+def _client() -> AsyncAPSClient:
+    return AsyncAPSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+    )
+
+
+def test_async_runner_bounds_concurrency(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = _client()
+    in_flight = 0
+    peak = 0
+
+    async def _search(payload: dict[str, Any]) -> dict[str, Any]:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if payload["skip"] > 0:
+            return {"results": []}
+        accession = f"ML-{payload['q']}"
+        return {"results": [{"document": {"AccessionNumber": accession}}]}
+
+    monkeypatch.setattr(client, "search", _search)
+    queries = [_query(f"q{index}") for index in range(6)]
+
+    with Session(engine) as session:
+        asyncio.run(
+            run_queries_async(
+                session=session,
+                client=client,
+                queries=queries,
+                schema_version="1",
+                max_pages=5,
+                concurrency=2,
+            )
+        )
+
+    with Session(engine) as session:
+        run_count = session.scalar(select(func.count()).select_from(APSQueryRun)) or 0
+        discovery_count = session.scalar(select(func.count()).select_from(APSDiscovery)) or 0
+
+    assert peak == 2
+    assert run_count == 6
+    assert discovery_count == 6
+
+
+def test_async_runner_records_failure_without_cancelling_others(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = _client()
+
+    async def _search(payload: dict[str, Any]) -> dict[str, Any]:
+        if payload["q"] == "bad":
+            raise RuntimeError("boom")
+        return {"results": []}
+
+    monkeypatch.setattr(client, "search", _search)
+
+    with Session(engine) as session:
+        with pytest.raises(RuntimeError, match="boom"):
+            asyncio.run(
+                run_queries_async(
+                    session=session,
+                    client=client,
+                    queries=[_query("bad"), _query("good")],
+                    schema_version="1",
+                    max_pages=5,
+                    concurrency=2,
+                )
+            )
+
+    with Session(engine) as session:
+        statuses = dict(session.execute(select(APSQueryRun.query_id, APSQueryRun.status)).all())
+
+    assert statuses == {"bad": QueryRunStatus.FAILED, "good": QueryRunStatus.SUCCESS}
+
+
+def test_async_runner_contains_database_error_to_its_query(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = _client()
+
+    async def _search(payload: dict[str, Any]) -> dict[str, Any]:
+        await asyncio.sleep(0.01)
+        if payload["skip"] > 0:
+            return {"results": []}
+        return {"results": [{"document": {"AccessionNumber": f"ML-{payload['q']}"}}]}
+
+    def _record_page(session: Session, query_run: APSQueryRun, *args: Any, **kwargs: Any) -> None:
+        if query_run.query_id == "bad":
+            # A NOT NULL violation fails the flush and would poison a shared transaction.
+            session.add(APSQuery(query_id="broken"))
+            session.flush()
+        record_page(session, query_run, *args, **kwargs)
+
+    monkeypatch.setattr(client, "search", _search)
+    monkeypatch.setattr("aps_etl.async_runner.record_page", _record_page)
+
+    with Session(engine) as session:
+        with pytest.raises(IntegrityError):
+            asyncio.run(
+                run_queries_async(
+                    session=session,
+                    client=client,
+                    queries=[_query("bad"), _query("good")],
+                    schema_version="1",
+                    max_pages=5,
+                    concurrency=2,
+                )
+            )
+
+    with Session(engine) as session:
+        statuses = dict(session.execute(select(APSQueryRun.query_id, APSQueryRun.status)).all())
+        accessions = set(session.scalars(select(APSDiscovery.accession_number)))
+
+    assert statuses == {"bad": QueryRunStatus.FAILED, "good": QueryRunStatus.SUCCESS}
+    assert {accession.lower() for accession in accessions} == {"ml-good"}
+
+
+def test_failed_shard_cancels_its_siblings(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = _client()
+    sharded = replace(
+        _query("sharded"),
+        filters_and=(compile_date_range_filter("DateAddedTimestamp", "2024-01-01", "2024-01-04"),),
+    )
+    failed = False
+    recorded_after_failure: list[str] = []
+
+    async def _search(payload: dict[str, Any]) -> dict[str, Any]:
+        nonlocal failed
+        if payload["q"] == "slow":
+            await asyncio.sleep(0.2)
+            return {"results": []}
+        await asyncio.sleep(0.01)
+        if "2024-01-01" in str(payload["filters"]) and payload["skip"] >= 2:
+            failed = True
+            raise RuntimeError("shard failed")
+        accession = f"ML{len(str(payload['filters']))}-{payload['skip']}"
+        return {"results": [{"document": {"AccessionNumber": accession}}]}
+
+    def _record_page(session: Session, query_run: APSQueryRun, *args: Any, **kwargs: Any) -> None:
+        if failed:
+            recorded_after_failure.append(query_run.query_id)
+        record_page(session, query_run, *args, **kwargs)
+
+    monkeypatch.setattr(client, "search", _search)
+    monkeypatch.setattr("aps_etl.async_runner.record_page", _record_page)
+
+    with Session(engine) as session:
+        with pytest.raises(RuntimeError, match="shard failed"):
+            asyncio.run(
+                run_queries_async(
+                    session=session,
+                    client=client,
+                    # The slow query keeps the loop alive after the sharded query fails.
+                    queries=[sharded, _query("slow")],
+                    schema_version="1",
+                    max_pages=50,
+                    concurrency=2,
+                    options=RunOptions(shards=2),
+                )
+            )
+
+    with Session(engine) as session:
+        status = session.scalar(select(APSQueryRun.status).where(APSQueryRun.query_id == "sharded"))
+
+    assert recorded_after_failure == []
+    assert status == QueryRunStatus.FAILED
+
+
+def test_async_bisect_splits_oversized_window_from_its_count(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = _client()
+    windowed = replace(
+        _query("bisect"),
+        filters_and=(compile_date_range_filter("DateAddedTimestamp", "2024-01-01", "2024-01-08"),),
+    )
+    skips: list[int] = []
+
+    async def _search(payload: dict[str, Any]) -> dict[str, Any]:
+        skips.append(payload["skip"])
+        value = str(payload["filters"])
+        # 8 results for the full window, 4 for either half.
+        total = 8 if "2024-01-01" in value and "2024-01-08" in value else 4
+        results = [
+            {"document": {"AccessionNumber": f"ML{value.count('01-0')}{index}"}}
+            for index in range(total)
+        ]
+        return {"results": results[payload["skip"] : payload["skip"] + 2], "count": total}
+
+    monkeypatch.setattr(client, "search", _search)
+
+    with Session(engine) as session:
+        asyncio.run(
+            run_queries_async(
+                session=session,
+                client=client,
+                queries=[windowed],
+                schema_version="1",
+                max_pages=2,
+                concurrency=1,
+                options=RunOptions(bisect_windows=True),
+            )
+        )
+        status = session.scalar(select(APSQueryRun.status))
+
+    assert skips == [0, 0, 2, 4, 0, 2, 4]
+    assert status == QueryRunStatus.SUCCESS
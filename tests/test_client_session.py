@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import Any
+
+import httpx
+import pytest
+
+from aps_etl.client import APSClient, http2_available
+
+
+def _client() -> APSClient:
+    return APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+        max_connections=4,
+        max_keepalive_connections=2,
+    )
+
+
+def test_client_reuses_pooled_session() -> None:
+    client = _client()
+
+    with client:
+        first = client._session()
+        second = client._session()
+
+        assert first is second
+        assert first.headers["Accept-Encoding"].startswith("gzip")
+
+    assert client._http is None
+
+
+def test_client_close_is_idempotent() -> None:
+    client = _client()
+    client.open()
+    client.close()
+    client.close()
+
+    assert client._http is None
+
+
+def _record_http2(monkeypatch: pytest.MonkeyPatch) -> list[bool]:
+    requested: list[bool] = []
+    client_class = httpx.Client
+
+    def build(**kwargs: Any) -> httpx.Client:
+        requested.append(kwargs["http2"])
+        return client_class(**kwargs)
+
+    monkeypatch.setattr(httpx, "Client", build)
+    return requested
+
+
+def test_client_falls_back_to_http1_without_h2(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    monkeypatch.setattr("aps_etl.client.http2_available", lambda: False)
+    requested = _record_http2(monkeypatch)
+    client = _client()
+    client.http2 = True
+
+    with client:
+        client._session()
+
+    assert requested == [False]
+    assert "h2 package is not installed" in caplog.text
+
+
+def test_client_builds_http2_session_when_requested(monkeypatch: pytest.MonkeyPatch) -> None:
+    requested = _record_http2(monkeypatch)
+    client = _client()
+    client.http2 = True
+
+    with client:
+        client._session()
+
+    assert requested == [http2_available()]
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from aps_etl.db import insert_discoveries, upsert_documents
+from aps_etl.models import APSDiscovery, APSQueryRun, Base, QueryRunStatus
+
+
+def test_insert_discoveries_ignores_repeats_within_run() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        query_run = APSQueryRun(
+            query_id="seed-query",
+            status=QueryRunStatus.SUCCESS,
+            wire_format="A",
+            request_fingerprint="fingerprint",
+            schema_version="1",
+            ended_at=datetime.utcnow(),
+        )
+        session.add(query_run)
+        session.flush()
+        upsert_documents(session, [{"accession_number": "ML1"}, {"accession_number": "ML2"}])
+
+        rows = [
+            {
+                "run_id": query_run.run_id,
+                "accession_number": accession,
+                "skip_value": skip,
+                "page_number": skip + 1,
+            }
+            for skip, accession in enumerate(["ML1", "ML2", "ML1", "ML2", "ML1"])
+        ]
+        insert_discoveries(session, rows, batch_size=2)
+        session.commit()
+
+        discoveries = session.execute(
+            select(APSDiscovery.accession_number, APSDiscovery.page_number).order_by(
+                APSDiscovery.accession_number
+            )
+        ).all()
+
+    assert [tuple(row) for row in discoveries] == [("ML1", 1), ("ML2", 2)]
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, create_engine, event, select
+from sqlalchemy.orm import Session
+
+from aps_etl.db import has_successful_run, runs_for_accession
+from aps_etl.models import APSDocument, Base
+
+
+@pytest.fixture()
+def engine() -> Engine:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def _plan(engine: Engine, run: Callable[[Session], Any]) -> str:
+    """Run `run` and return the sqlite query plan of the statement it executed."""
+
+    executed: list[tuple[str, Any]] = []
+
+    def _capture(conn: Any, cursor: Any, statement: str, parameters: Any, *args: Any) -> None:
+        executed.append((statement, parameters))
+
+    with Session(engine) as session:
+        event.listen(engine, "before_cursor_execute", _capture)
+        try:
+            run(session)
+        finally:
+            event.remove(engine, "before_cursor_execute", _capture)
+        statement, parameters = executed[-1]
+        rows = session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return "\n".join(row[-1] for row in rows)
+
+
+def test_runs_for_accession_uses_discovery_accession_index(engine: Engine) -> None:
+    plan = _plan(engine, lambda session: runs_for_accession(session, "ml123"))
+
+    assert "ix_aps_discovery_accession_number" in plan
+    assert "SCAN aps_discovery" not in plan
+
+
+def test_run_history_uses_query_id_started_at_index(engine: Engine) -> None:
+    plan = _plan(engine, lambda session: has_successful_run(session, "query-1"))
+
+    assert "ix_aps_query_run_query_id_started_at" in plan
+
+
+@pytest.mark.parametrize(
+    ("column", "index"),
+    [
+        (APSDocument.date_added_timestamp, "ix_aps_document_date_added_timestamp"),
+        (APSDocument.document_date, "ix_aps_document_document_date"),
+    ],
+)
+def test_document_date_ranges_use_date_indexes(engine: Engine, column: Any, index: str) -> None:
+    since = datetime(2024, 1, 1)
+    stmt = select(APSDocument.accession_number).where(column >= since).order_by(column.desc())
+
+    plan = _plan(engine, lambda session: session.execute(stmt).all())
+
+    assert index in plan
+    assert "USE TEMP B-TREE" not in plan
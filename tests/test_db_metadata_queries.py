@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+
+from aps_etl.db import (
+    documents_for_docket,
+    documents_of_type,
+    json_array_contains,
+    upsert_documents,
+)
+from aps_etl.models import APSDocument, Base
+from aps_etl.runner import document_row
+
+
+def _document(accession: str, added: str, dockets: list[str], kind: str) -> dict[str, object]:
+    return {
+        "AccessionNumber": accession,
+        "DateAddedTimestamp": added,
+        "DocketNumber": dockets,
+        "DocumentType": kind,
+    }
+
+
+def test_containment_helpers_match_array_members() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    seen_at = datetime(2024, 6, 1)
+
+    with Session(engine) as session:
+        upsert_documents(
+            session,
+            [
+                document_row(_document("ML1", "2024-01-01 10:00", ["05200048"], "Letter"), seen_at),
+                document_row(
+                    _document("ML2", "2024-02-01 10:00", ["05000410", "05200048"], "Report"),
+                    seen_at,
+                ),
+                document_row(_document("ML3", "2024-03-01 10:00", ["05000410"], "Letter"), seen_at),
+            ],
+        )
+        session.commit()
+
+        docket = [
+            document.accession_number for document in documents_for_docket(session, "05200048")
+        ]
+        letters = [document.accession_number for document in documents_of_type(session, "Letter")]
+        missing = documents_for_docket(session, "0520004")
+
+    assert docket == ["ML2", "ML1"]
+    assert letters == ["ML3", "ML1"]
+    assert missing == []
+
+
+def test_postgres_uses_jsonb_containment_and_gin_indexes() -> None:
+    dialect = postgresql.dialect()  # type: ignore[no-untyped-call]
+    table = Base.metadata.tables["aps_document"]
+
+    stmt = select(APSDocument.accession_number).where(
+        json_array_contains("postgresql", APSDocument.docket_number, "05200048")
+    )
+    index_sql = {
+        str(index.name): str(CreateIndex(index).compile(dialect=dialect)) for index in table.indexes
+    }
+
+    assert "aps_document.docket_number @> " in str(stmt.compile(dialect=dialect))
+    assert isinstance(table.c.docket_number.type.dialect_impl(dialect), postgresql.JSONB)
+    assert index_sql["ix_aps_document_docket_number_gin"].endswith(
+        "USING gin (docket_number jsonb_path_ops)"
+    )
+    assert index_sql["ix_aps_document_document_type_gin"].endswith(
+        "USING gin (document_type jsonb_path_ops)"
+    )
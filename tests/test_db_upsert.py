@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 from datetime import datetime
+from typing import Any
 
-from sqlalchemy import create_engine, func, select
+from sqlalchemy import create_engine, event, func, select
 from sqlalchemy.orm import Session
 
-from aps_etl.db import upsert_document
+from aps_etl.db import resolve_accession, upsert_document, upsert_documents
 from aps_etl.models import APSDiscovery, APSDocument, APSQueryRun, Base, QueryRunStatus
+from aps_etl.runner import document_row
 
 
 def test_upsert_preserves_enriched_fields() -> None:
@@ -51,6 +53,20 @@ def test_upsert_canonicalizes_accession_casing() -> None:
     assert document.accession_number_lower == "abc-123"
 
 
+def test_resolve_accession_keeps_stored_casing() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        session.add(
+            APSDocument(accession_number="ml123", accession_number_lower="ml123", is_stub=True)
+        )
+        session.flush()
+
+        assert resolve_accession(session, " ML123 ") == ("ml123", "ml123")
+        assert resolve_accession(session, "ml456") == ("ML456", "ml456")
+
+
 def test_upsert_preserves_existing_accession_casing_for_fk() -> None:
     engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
     Base.metadata.create_all(engine)
@@ -98,3 +114,77 @@ def test_upsert_preserves_existing_accession_casing_for_fk() -> None:
     assert count == 1
     assert document is not None
     assert document.accession_number == "ml24018a111"
+
+
+def test_bulk_upsert_merges_repeats_in_two_statements() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    statements: list[str] = []
+
+    with Session(engine) as session:
+        session.add(
+            APSDocument(
+                accession_number="ml-existing",
+                accession_number_lower="ml-existing",
+                is_stub=False,
+                is_package=False,
+                url="https://example.com/existing",
+            )
+        )
+        session.commit()
+
+        def _record(*args: Any) -> None:
+            statements.append(args[2])
+
+        event.listen(engine, "before_cursor_execute", _record)
+        accessions = upsert_documents(
+            session,
+            [
+                {"accession_number": "ml1", "is_stub": False, "url": "https://example.com/1"},
+                {"accession_number": "ML1", "is_stub": True, "url": None},
+                {"accession_number": "ML-EXISTING", "is_stub": True, "url": None},
+            ],
+        )
+        event.remove(engine, "before_cursor_execute", _record)
+        session.commit()
+
+        documents = {
+            document.accession_number: document for document in session.scalars(select(APSDocument))
+        }
+
+    assert accessions == ["ML1", "ML1", "ml-existing"]
+    assert len(statements) == 2
+    assert documents["ML1"].is_stub is False
+    assert documents["ML1"].url == "https://example.com/1"
+    assert documents["ml-existing"].is_stub is False
+    assert documents["ml-existing"].url == "https://example.com/existing"
+
+
+def test_unchanged_metadata_only_bumps_last_seen_at() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    first_seen = datetime(2024, 1, 1, 8, 0)
+    metadata = {"AccessionNumber": "ML1", "DocumentTitle": "Original"}
+
+    with Session(engine) as session:
+        upsert_documents(session, [document_row(metadata, first_seen)])
+        rediscovered = {**document_row(metadata, datetime(2024, 1, 2, 8, 0)), "title": "Stale"}
+        upsert_documents(session, [rediscovered])
+        session.commit()
+        unchanged = session.scalar(select(APSDocument))
+        assert unchanged is not None
+        assert unchanged.title == "Original"
+        assert unchanged.last_seen_at == datetime(2024, 1, 2, 8, 0)
+        assert unchanged.last_modified_at == first_seen
+        first_hash = unchanged.metadata_hash
+
+        edited = {**metadata, "DocumentTitle": "Revised"}
+        upsert_documents(session, [document_row(edited, datetime(2024, 1, 3, 8, 0))])
+        session.commit()
+        session.expire_all()
+        changed = session.scalar(select(APSDocument))
+
+    assert changed is not None
+    assert changed.title == "Revised"
+    assert changed.metadata_hash != first_hash
+    assert changed.last_modified_at == datetime(2024, 1, 3, 8, 0)
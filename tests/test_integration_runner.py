@@ -9,7 +9,7 @@ from sqlalchemy.orm import Session
 from aps_etl.models import APSDiscovery, APSDocument, APSQuery, APSQueryRun, Base
 from aps_etl.runner import run_all_queries
 from aps_etl.settings import Settings
-from tests.helpers import build_vcr
+from tests.helpers import build_vcr, seed_recorded_wire_format
 
 
 @pytest.mark.integration
@@ -18,6 +18,7 @@ def test_runner_writes_discoveries_and_documents(tmp_path: Path) -> None:
     database_url = f"sqlite+pysqlite:///{db_path}"
     engine = create_engine(database_url, future=True)
     Base.metadata.create_all(engine)
+    seed_recorded_wire_format(database_url)
 
     settings = Settings.model_validate(
         {"database_url": database_url, "aps_primary_key": "test-key"}
@@ -53,6 +54,7 @@ def test_runner_is_idempotent_on_documents(tmp_path: Path) -> None:
     database_url = f"sqlite+pysqlite:///{db_path}"
     engine = create_engine(database_url, future=True)
     Base.metadata.create_all(engine)
+    seed_recorded_wire_format(database_url)
 
     settings = Settings.model_validate(
         {"database_url": database_url, "aps_primary_key": "test-key"}
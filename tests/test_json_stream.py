@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Iterator
+from typing import Any
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from aps_etl import runner
+from aps_etl.client import APSClient
+from aps_etl.json_stream import PageSummary, ResultsParser
+from aps_etl.models import APSDiscovery, Base
+from aps_etl.registry import Libraries, QueryDefinition, SortSpec
+from aps_etl.runner import RunOptions, record_page, run_query
+
+QUERY = QueryDefinition(
+    query_id="stream-query",
+    name="Stream Query",
+    q="NuScale",
+    filters_and=(),
+    filters_or=(),
+    libraries=Libraries(legacy=True, main=True),
+    sort=SortSpec(field="DateAddedTimestamp", direction="DESC"),
+    content=True,
+    safety_buffer_days=3,
+    wire_format="A",
+    enabled=True,
+)
+
+BODY = {
+    "count": 12345,
+    "results": [
+        {
+            "score": 19.989679,
+            "highlights": {"Title": ["<em>NuScale</em> Power, été"]},
+            "document": {
+                "AccessionNumber": "ML24018A111",
+                "Pages": [1, 2, 3],
+                "content": 'He said "{not a [brace}" \\ ]',
+            },
+        },
+        {"score": 18.0, "document": {"AccessionNumber": "ML24018A112"}},
+    ],
+    "pageNumber": 1,
+}
+
+
+def _parse(body: bytes, chunk_size: int) -> tuple[list[Any], PageSummary]:
+    parser = ResultsParser()
+    entries: list[Any] = []
+    for start in range(0, len(body), chunk_size):
+        entries.extend(parser.feed(body[start : start + chunk_size]))
+    entries.extend(parser.close())
+    return entries, parser.summary
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_parser_matches_json_loads(chunk_size: int) -> None:
+    body = json.dumps(BODY, indent=2, ensure_ascii=False).encode("utf-8")
+
+    entries, summary = _parse(body, chunk_size)
+
+    assert entries == BODY["results"]
+    assert summary.members == {"count": 12345, "pageNumber": 1}
+    assert summary.result_count == 2
+
+
+def test_parser_yields_entries_before_the_body_ends() -> None:
+    parser = ResultsParser()
+
+    assert parser.feed(b'{"results": [{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(b': 2}], "count": 2') == [{"b": 2}]
+    assert parser.summary.members == {}
+    assert parser.feed(b"}") == []
+    assert parser.close() == []
+    assert parser.summary.members == {"count": 2}
+
+
+class _CountingDecoder(json.JSONDecoder):
+    calls = 0
+
+    def raw_decode(self, s: str, idx: int = 0) -> tuple[Any, int]:
+        self.calls += 1
+        return super().raw_decode(s, idx)
+
+
+def test_parser_decodes_a_large_entry_once() -> None:
+    content = "x" * 200_000
+    body = json.dumps({"results": [{"document": {"content": content}}]}).encode("utf-8")
+    parser = ResultsParser()
+    decoder = parser._decoder = _CountingDecoder()
+    entries: list[Any] = []
+    for start in range(0, len(body), 100):
+        entries.extend(parser.feed(body[start : start + 100]))
+    entries.extend(parser.close())
+
+    assert entries == [{"document": {"content": content}}]
+    # One member name, one failed attempt when the entry first arrives, one decode at its end.
+    assert decoder.calls <= 3
+
+
+def test_parser_rejects_truncated_bodies() -> None:
+    parser = ResultsParser()
+    parser.feed(b'{"results": [{"a": 1}')
+
+    with pytest.raises(ValueError):
+        parser.close()
+
+
+def test_client_streams_results() -> None:
+    body = json.dumps(BODY).encode("utf-8")
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        chunks = [body[start : start + 16] for start in range(0, len(body), 16)]
+        return httpx.Response(200, stream=httpx.ByteStream(b"".join(chunks)))
+
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+    )
+    client._http = httpx.Client(transport=httpx.MockTransport(handler))
+    summary = PageSummary()
+
+    with client:
+        entries = list(client.search_stream({"q": "NuScale", "skip": 0}, summary))
+
+    assert entries == BODY["results"]
+    assert summary.members["pageNumber"] == 1
+
+
+def test_runner_records_streamed_pages_in_batches(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+    )
+    batch_sizes: list[int] = []
+
+    def _search_stream(payload: dict[str, Any]) -> Iterator[dict[str, Any]]:
+        skip = payload["skip"]
+        for index in range(skip, min(skip + 5, 7)):
+            yield {"document": {"AccessionNumber": f"ML{index}"}}
+
+    def _record_page(*args: Any, **kwargs: Any) -> None:
+        batch_sizes.append(len(args[2]))
+        record_page(*args, **kwargs)
+
+    monkeypatch.setattr(client, "search_stream", _search_stream)
+    monkeypatch.setattr(runner, "record_page", _record_page)
+
+    with Session(engine) as session:
+        run_query(
+            session=session,
+            client=client,
+            query=QUERY,
+            schema_version="1",
+            max_pages=10,
+            options=RunOptions(stream_results=True, stream_batch_size=2),
+        )
+        session.commit()
+        pages = session.execute(
+            select(APSDiscovery.accession_number, APSDiscovery.page_number).order_by(
+                APSDiscovery.accession_number
+            )
+        ).all()
+
+    assert batch_sizes == [2, 2, 1, 2]
+    assert pages == [(f"ML{index}", 1 if index < 5 else 2) for index in range(7)]
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import time
+
+import httpx
+import pytest
+
+from aps_etl.client import API_KEY_HEADER, APSClient, APSUnauthorizedError
+from aps_etl.key_pool import KeyPool
+from aps_etl.rate_limit import RateLimiter
+
+
+def test_pool_round_robins_and_skips_throttled_keys() -> None:
+    pool = KeyPool(("primary", "secondary", "primary"))
+
+    assert pool.keys == ("primary", "secondary")
+    assert [pool.next_key() for _ in range(3)] == ["primary", "secondary", "primary"]
+
+    pool.report("secondary", 429, retry_after_s=60)
+    assert pool.available() == 1
+    assert [pool.next_key() for _ in range(2)] == ["primary", "primary"]
+
+    pool.report("primary", 401)
+    assert pool.next_key() == "secondary"
+    pool.report("secondary", 403)
+    assert pool.next_key() is None
+
+
+def _client(handler: httpx.MockTransport) -> APSClient:
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="primary",
+        secondary_api_keys=("secondary",),
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+    )
+    client._http = httpx.Client(transport=handler)
+    return client
+
+
+def test_client_fails_over_to_the_next_key() -> None:
+    seen: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        key = request.headers[API_KEY_HEADER]
+        seen.append(key)
+        if key == "primary":
+            return httpx.Response(429, headers={"Retry-After": "60"})
+        return httpx.Response(200, json={"results": []})
+
+    with _client(httpx.MockTransport(handler)) as client:
+        assert client.search({"q": "NuScale", "skip": 0}) == {"results": []}
+        assert client.search({"q": "NuScale", "skip": 0}) == {"results": []}
+
+    assert seen == ["primary", "secondary", "secondary"]
+
+
+def test_client_raises_once_every_key_is_rejected() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(401)
+
+    with _client(httpx.MockTransport(handler)) as client:
+        with pytest.raises(APSUnauthorizedError):
+            client.search({"q": "NuScale", "skip": 0})
+        with pytest.raises(APSUnauthorizedError):
+            client.search({"q": "NuScale", "skip": 0})
+
+
+def test_throttled_key_does_not_pause_failover_key() -> None:
+    sent_at: dict[str, float] = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        key = request.headers[API_KEY_HEADER]
+        sent_at.setdefault(key, time.monotonic())
+        if key == "primary":
+            return httpx.Response(429, headers={"Retry-After": "3"})
+        return httpx.Response(200, json={"results": []})
+
+    client = _client(httpx.MockTransport(handler))
+    client.rate_limiter = RateLimiter(rate_per_s=0, burst=1, max_concurrency=4)
+    with client:
+        assert client.search({"q": "NuScale", "skip": 0}) == {"results": []}
+        assert client.search({"q": "NuScale", "skip": 10}) == {"results": []}
+
+    assert sent_at["secondary"] - sent_at["primary"] < 1.0
+
+
+def test_throttle_pauses_every_caller_once_no_key_is_left() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(429, headers={"Retry-After": "3"})
+
+    client = _client(httpx.MockTransport(handler))
+    limiter = client.rate_limiter = RateLimiter(rate_per_s=0, burst=1, max_concurrency=4)
+    with client:
+        with pytest.raises(httpx.HTTPStatusError):
+            client.search({"q": "NuScale", "skip": 0})
+
+    assert limiter.try_acquire() > 2.0
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from aps_etl.canonical import canon_json_bytes, compress_canonical, decompress_canonical
+from aps_etl.db import upsert_documents
+from aps_etl.models import APSDocument, APSDocumentMetadata, Base
+from aps_etl.pg_copy import _merge_sql
+from aps_etl.retention import apply_retention
+from aps_etl.runner import document_row
+
+DOCUMENT: dict[str, Any] = {
+    "AccessionNumber": "ML24018A111",
+    "DocumentTitle": "NuScale Power, LLC - Response to Request for Additional Information",
+    "DocketNumber": ["05200048"],
+    "DocumentType": ["Letter"],
+    "Keywords": ["NuScale"] * 20,
+}
+
+
+def test_compressed_canonical_round_trip() -> None:
+    compressed = compress_canonical(DOCUMENT)
+
+    assert decompress_canonical(compressed) == DOCUMENT
+    assert len(compressed) < len(canon_json_bytes(DOCUMENT))
+
+
+def test_metadata_store_deduplicates_and_resolves_transparently() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    changed = {**DOCUMENT, "DocumentTitle": "Revised title"}
+
+    with Session(engine) as session:
+        # A document stored inline before the store was enabled.
+        upsert_documents(session, [document_row(DOCUMENT, datetime(2024, 1, 1))])
+        upsert_documents(
+            session, [document_row(DOCUMENT, datetime(2024, 1, 2))], metadata_store=True
+        )
+        session.commit()
+        document = session.scalar(select(APSDocument))
+        assert document is not None
+        assert document.raw_metadata_json == DOCUMENT
+        assert document.metadata_json == DOCUMENT
+
+        upsert_documents(
+            session, [document_row(changed, datetime(2024, 1, 3))], metadata_store=True
+        )
+        upsert_documents(
+            session, [document_row(changed, datetime(2024, 1, 4))], metadata_store=True
+        )
+        session.commit()
+        session.expire_all()
+        document = session.scalar(select(APSDocument))
+        stored = session.scalar(select(func.count()).select_from(APSDocumentMetadata))
+
+        assert document is not None
+        assert document.raw_metadata_json is None
+        assert document.title == "Revised title"
+        assert document.metadata_json == changed
+        assert stored == 2
+
+
+def test_merge_sql_clears_inline_metadata_in_store_mode() -> None:
+    assert (
+        "raw_metadata_json = CASE WHEN aps_document.metadata_hash = EXCLUDED.metadata_hash "
+        "OR EXCLUDED.metadata_hash IS NULL THEN aps_document.raw_metadata_json ELSE NULL END"
+    ) in _merge_sql(metadata_store=True)
+    assert "ELSE NULL END" not in _merge_sql()
+
+
+def test_retention_moves_inline_metadata_and_prunes_the_store() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    documents = [{**DOCUMENT, "AccessionNumber": f"ML24018A{index:03d}"} for index in range(5)]
+    changed = {**documents[0], "DocumentTitle": "Revised title"}
+
+    with Session(engine) as session:
+        upsert_documents(session, [document_row(doc, datetime(2024, 1, 1)) for doc in documents])
+        session.commit()
+
+        report = apply_retention(
+            session,
+            run_retention_days=0,
+            payload_retention_days=0,
+            metadata_store=True,
+            batch_documents=2,
+        )
+        session.expire_all()
+        inline = session.scalar(
+            select(func.count())
+            .select_from(APSDocument)
+            .where(APSDocument.raw_metadata_json.is_not(None))
+        )
+        resolved = {
+            doc.accession_number: doc.metadata_json for doc in session.scalars(select(APSDocument))
+        }
+        assert inline == 0
+        assert resolved == {doc["AccessionNumber"]: doc for doc in documents}
+        assert report.metadata_moved == 5
+
+        # The first document's old payload is left unreferenced once its metadata changes.
+        upsert_documents(
+            session, [document_row(changed, datetime(2024, 1, 2))], metadata_store=True
+        )
+        session.commit()
+        report = apply_retention(
+            session, run_retention_days=0, payload_retention_days=0, metadata_store=True
+        )
+        stored = session.scalar(select(func.count()).select_from(APSDocumentMetadata))
+        document = session.get(APSDocument, changed["AccessionNumber"])
+        assert document is not None
+        metadata = document.metadata_json
+
+    assert (report.metadata_moved, report.metadata_pruned) == (0, 1)
+    assert stored == 5
+    assert metadata == changed
+
+
+def test_retention_prunes_only_payloads_older_than_the_pass() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    started = datetime(2024, 1, 2)
+
+    with Session(engine) as session:
+        for index, created_at in enumerate(
+            [datetime(2024, 1, 1)] * 4 + [started, datetime(2024, 1, 3)]
+        ):
+            session.add(
+                APSDocumentMetadata(
+                    content_hash=f"hash-{index}",
+                    payload=compress_canonical({"index": index}),
+                    raw_size=1,
+                    created_at=created_at,
+                )
+            )
+        session.add(
+            APSDocument(
+                accession_number="ML24018A111",
+                accession_number_lower="ml24018a111",
+                is_stub=True,
+                metadata_hash="hash-2",
+            )
+        )
+        session.commit()
+
+        report = apply_retention(
+            session, run_retention_days=0, payload_retention_days=0, batch_documents=2, now=started
+        )
+        remaining = set(session.scalars(select(APSDocumentMetadata.content_hash)))
+
+    assert report.metadata_pruned == 3
+    assert remaining == {"hash-2", "hash-4", "hash-5"}
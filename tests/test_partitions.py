@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from aps_etl import partitions
+from aps_etl.models import Base
+from aps_etl.partitions import (
+    add_months,
+    is_partitioned,
+    maintain_discovery_partitions,
+    partition_ddl,
+    partition_month,
+    partition_name,
+)
+
+
+def test_partition_names_and_bounds() -> None:
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partition_name(date(2026, 10, 1)) == "aps_discovery_y2026m10"
+    assert partition_month("aps_discovery_y2026m10") == date(2026, 10, 1)
+    assert partition_month("aps_discovery_default") is None
+
+    create_table, move_rows, attach, create_index = partition_ddl(date(2026, 12, 1))
+
+    assert create_table.startswith("CREATE TABLE IF NOT EXISTS aps_discovery_y2026m12 (LIKE")
+    assert move_rows.startswith("WITH moved AS (DELETE FROM aps_discovery_default")
+    assert "discovered_at >= '2026-12-01 00:00:00+00'" in move_rows
+    assert "discovered_at < '2027-01-01 00:00:00+00'" in move_rows
+    assert move_rows.endswith("INSERT INTO aps_discovery_y2026m12 SELECT * FROM moved")
+    assert attach.startswith("ALTER TABLE aps_discovery ATTACH PARTITION aps_discovery_y2026m12")
+    assert attach.endswith("FROM ('2026-12-01 00:00:00+00') TO ('2027-01-01 00:00:00+00')")
+    assert create_index.endswith("ON aps_discovery_y2026m12 (run_id, accession_number)")
+
+
+class _RecordingSession:
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+
+    def execute(self, statement: Any) -> None:
+        self.statements.append(str(statement))
+
+
+def test_maintenance_creates_upcoming_and_drops_expired_partitions(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    existing = [partition_name(date(2026, month, 1)) for month in range(5, 11)]
+    existing.append("aps_discovery_default")
+    monkeypatch.setattr(partitions, "is_partitioned", lambda session: True)
+    monkeypatch.setattr(partitions, "discovery_partitions", lambda session: existing)
+    session = _RecordingSession()
+
+    maintain_discovery_partitions(
+        session,  # type: ignore[arg-type]
+        months_ahead=2,
+        retention_months=3,
+        today=date(2026, 10, 17),
+    )
+
+    created = [s for s in session.statements if s.startswith("CREATE TABLE")]
+    assert [s.split()[5] for s in created] == ["aps_discovery_y2026m11", "aps_discovery_y2026m12"]
+    assert [s for s in session.statements if "DETACH" in s or s.startswith("DROP")] == [
+        "ALTER TABLE aps_discovery DETACH PARTITION aps_discovery_y2026m05",
+        "DROP TABLE aps_discovery_y2026m05",
+        "ALTER TABLE aps_discovery DETACH PARTITION aps_discovery_y2026m06",
+        "DROP TABLE aps_discovery_y2026m06",
+    ]
+
+
+def test_maintenance_skips_the_plain_layout() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        assert is_partitioned(session) is False
+        maintain_discovery_partitions(session, months_ahead=2, retention_months=1)
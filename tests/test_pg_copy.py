@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import os
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from typing import Any
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+
+from aps_etl.db import COALESCED_DOCUMENT_COLUMNS, HASHED_DOCUMENT_COLUMNS, upsert_query
+from aps_etl.models import APSDiscovery, APSDocument, APSQueryRun, Base, QueryRunStatus
+from aps_etl.pg_copy import _merge_sql, copy_load_page, supports_copy
+from aps_etl.runner import RunOptions, load_page, transform_page
+
+
+def test_copy_loader_requires_postgres() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        assert supports_copy(session) is False
+        with pytest.raises(RuntimeError, match="Postgres"):
+            copy_load_page(session, [{"accession_number": "ML1"}])
+
+
+def test_merge_sql_preserves_upsert_merge_rules() -> None:
+    merge_sql = _merge_sql()
+
+    for column in COALESCED_DOCUMENT_COLUMNS:
+        assert f"coalesce(EXCLUDED.{column}, aps_document.{column})" in merge_sql
+    for column in HASHED_DOCUMENT_COLUMNS:
+        assert (
+            f"{column} = CASE WHEN aps_document.metadata_hash = EXCLUDED.metadata_hash "
+            f"THEN aps_document.{column}"
+        ) in merge_sql
+    assert "last_modified_at = CASE WHEN EXCLUDED.metadata_hash IS NOT NULL" in merge_sql
+    assert "is_stub = aps_document.is_stub AND" in merge_sql
+    assert "is_package = aps_document.is_package OR" in merge_sql
+    assert "ON CONFLICT DO NOTHING" in merge_sql
+
+
+POSTGRES_URL = os.getenv("APS_TEST_POSTGRES_URL")
+
+SEEN_AT = datetime(2026, 10, 1, 12, 0, tzinfo=UTC)
+
+# Two pages of one run: casing variants of one accession within a page, a rediscovery on
+# the next page with changed metadata, and one with unchanged metadata.
+PAGES: list[tuple[int, list[dict[str, Any]]]] = [
+    (
+        0,
+        [
+            {"document": {"AccessionNumber": "ML24001A001", "DocumentTitle": "First"}},
+            {"document": {"AccessionNumber": "ml24001a001", "Url": "https://example.com/1"}},
+            {"document": {"AccessionNumber": "ML24001A002", "DocketNumber": "05200050"}},
+        ],
+    ),
+    (
+        3,
+        [
+            {"document": {"AccessionNumber": "ml24001a001", "DocumentTitle": "Revised"}},
+            {"document": {"AccessionNumber": "ML24001A002", "DocketNumber": "05200050"}},
+        ],
+    ),
+]
+
+
+@pytest.fixture
+def pg_session() -> Iterator[Session]:
+    if not POSTGRES_URL:
+        pytest.skip("APS_TEST_POSTGRES_URL is not set.")
+    engine = create_engine(POSTGRES_URL, future=True)
+    # Everything happens in one transaction that is rolled back, leaving the database as found.
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            with Session(bind=connection) as session:
+                yield session
+        finally:
+            transaction.rollback()
+    engine.dispose()
+
+
+def _load_pages(session: Session, schema: str, *, copy_loader: bool, metadata_store: bool) -> Any:
+    session.execute(text(f"CREATE SCHEMA {schema}"))
+    session.execute(text(f"SET LOCAL search_path TO {schema}"))
+    Base.metadata.create_all(session.connection())
+    upsert_query(session, "copy-parity", {"name": "copy-parity", "definition_json": {}})
+    query_run = APSQueryRun(
+        query_id="copy-parity",
+        status=QueryRunStatus.SUCCESS,
+        wire_format="A",
+        request_fingerprint="fingerprint",
+        schema_version="1",
+    )
+    session.add(query_run)
+    session.flush()
+    options = RunOptions(copy_loader=copy_loader, metadata_store=metadata_store)
+    for page_number, (skip, results) in enumerate(PAGES, start=1):
+        rows = transform_page(results, query_run.run_id, skip, page_number, seen_at=SEEN_AT)
+        load_page(session, rows, options=options)
+    session.expire_all()
+    documents = [
+        (
+            document.accession_number,
+            document.accession_number_lower,
+            document.url,
+            document.title,
+            document.docket_number,
+            document.is_stub,
+            document.is_package,
+            document.metadata_hash,
+            document.metadata_json,
+            document.last_seen_at,
+            document.last_modified_at,
+        )
+        for document in session.scalars(select(APSDocument).order_by(APSDocument.accession_number))
+    ]
+    discoveries = session.execute(
+        select(
+            APSDiscovery.accession_number, APSDiscovery.skip_value, APSDiscovery.page_number
+        ).order_by(APSDiscovery.accession_number)
+    ).all()
+    return documents, discoveries
+
+
+@pytest.mark.parametrize("metadata_store", [False, True])
+def test_copy_loader_matches_executemany_on_postgres(
+    pg_session: Session, metadata_store: bool
+) -> None:
+    assert supports_copy(pg_session)
+
+    copied = _load_pages(
+        pg_session, "aps_copy_test_copy", copy_loader=True, metadata_store=metadata_store
+    )
+    upserted = _load_pages(
+        pg_session, "aps_copy_test_upsert", copy_loader=False, metadata_store=metadata_store
+    )
+
+    assert copied == upserted
+    documents, discoveries = copied
+    assert [document[0] for document in documents] == ["ML24001A001", "ML24001A002"]
+    assert documents[0][2:4] == ("https://example.com/1", "Revised")
+    assert [tuple(discovery) for discovery in discoveries] == [
+        ("ML24001A001", 0, 1),
+        ("ML24001A002", 0, 1),
+    ]
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from aps_etl.client import APSClient
+from aps_etl.models import APSDiscovery, APSQueryState, Base
+from aps_etl.pipeline import Pipeline
+from aps_etl.registry import Libraries, QueryDefinition, SortSpec
+from aps_etl.runner import RunOptions, run_query
+
+QUERY = QueryDefinition(
+    query_id="pipeline-query",
+    name="Pipeline Query",
+    q="NuScale",
+    filters_and=(),
+    filters_or=(),
+    libraries=Libraries(legacy=True, main=True),
+    sort=SortSpec(field="DateAddedTimestamp", direction="DESC"),
+    content=False,
+    safety_buffer_days=3,
+    wire_format="A",
+    enabled=True,
+)
+
+
+def test_pipeline_runs_stages_on_their_own_threads() -> None:
+    threads: dict[str, set[str]] = {"fetch": set(), "transform": set(), "load": set()}
+
+    def source() -> Iterator[int]:
+        for item in range(10):
+            threads["fetch"].add(threading.current_thread().name)
+            yield item
+
+    def transform(item: int) -> int:
+        threads["transform"].add(threading.current_thread().name)
+        return item * 2
+
+    loaded: list[int] = []
+
+    def load(item: int) -> None:
+        threads["load"].add(threading.current_thread().name)
+        loaded.append(item)
+
+    stats = Pipeline(source=source(), transform=transform, load=load, depth=1).run()
+
+    assert loaded == [item * 2 for item in range(10)]
+    assert threads["load"] == {threading.current_thread().name}
+    assert threads["fetch"] == {"pipeline-fetch"}
+    assert threads["transform"] == {"pipeline-transform"}
+    assert [stage.items for stage in stats.values()] == [10, 10, 10]
+
+
+def test_pipeline_applies_backpressure_and_stops_on_error() -> None:
+    produced = 0
+
+    def source() -> Iterator[int]:
+        nonlocal produced
+        while True:
+            produced += 1
+            yield produced
+
+    def load(item: int) -> None:
+        if item == 3:
+            raise RuntimeError("load failed")
+
+    with pytest.raises(RuntimeError, match="load failed"):
+        Pipeline(source=source(), transform=lambda item: item, load=load, depth=2).run()
+
+    # Two bounded queues of depth 2 plus one item in hand per stage cap the read-ahead.
+    assert produced <= 3 + 2 * 2 + 2
+
+
+def test_pipeline_surfaces_fetch_errors() -> None:
+    def source() -> Iterator[int]:
+        yield 1
+        raise RuntimeError("fetch failed")
+
+    loaded: list[int] = []
+    with pytest.raises(RuntimeError, match="fetch failed"):
+        Pipeline(source=source(), transform=lambda item: item, load=loaded.append).run()
+
+    assert loaded == [1]
+
+
+def test_runner_pipeline_records_every_page(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+    )
+
+    def _search(payload: dict[str, Any]) -> dict[str, Any]:
+        skip = payload["skip"]
+        results = [{"document": {"AccessionNumber": f"ML{i}"}} for i in range(skip, 9)]
+        return {"results": results[:2]}
+
+    monkeypatch.setattr(client, "search", _search)
+
+    with Session(engine) as session:
+        run_query(
+            session=session,
+            client=client,
+            query=QUERY,
+            schema_version="1",
+            max_pages=10,
+            options=RunOptions(pipeline_depth=2, prefetch_pages=2),
+        )
+        session.commit()
+        discovery_count = session.scalar(select(func.count()).select_from(APSDiscovery))
+        last_page = session.scalar(select(func.max(APSDiscovery.page_number)))
+        state = session.get(APSQueryState, QUERY.query_id)
+
+    assert discovery_count == 9
+    assert last_page == 5
+    assert state is not None
+    assert state.checkpoint_run_id is None
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
+
+import httpx
+
+from aps_etl.client import APSClient
+from aps_etl.rate_limit import RateLimiter, retry_after_seconds
+
+
+def test_retry_after_accepts_seconds_and_dates() -> None:
+    retry_at = datetime.now(UTC) + timedelta(seconds=30)
+
+    assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": "7"})) == 7.0
+    assert retry_after_seconds(httpx.Response(429)) is None
+    from_date = retry_after_seconds(
+        httpx.Response(429, headers={"Retry-After": format_datetime(retry_at, usegmt=True)})
+    )
+    assert from_date is not None
+    assert 25 <= from_date <= 30
+
+
+def test_token_bucket_allows_burst_then_waits() -> None:
+    limiter = RateLimiter(rate_per_s=10, burst=2, max_concurrency=10)
+
+    assert limiter.try_acquire() == 0.0
+    assert limiter.try_acquire() == 0.0
+    assert 0 < limiter.try_acquire() <= 0.1
+
+
+def test_concurrency_limit_decreases_multiplicatively_and_recovers() -> None:
+    limiter = RateLimiter(rate_per_s=0, burst=1, max_concurrency=8)
+    for _ in range(8):
+        assert limiter.try_acquire() == 0.0
+    assert limiter.try_acquire() > 0
+
+    limiter.release(throttled=True)
+    assert limiter.limit == 4
+    limiter.release(throttled=True)
+    assert limiter.limit == 2
+
+    for _ in range(6):
+        limiter.release()
+    for _ in range(40):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.limit == 8
+
+
+def test_client_honors_retry_after_and_throttles() -> None:
+    limiter = RateLimiter(rate_per_s=0, burst=1, max_concurrency=4)
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=2,
+        retry_min_wait_s=5.0,
+        retry_max_wait_s=5.0,
+        rate_limiter=limiter,
+    )
+    statuses = iter([429, 200])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = next(statuses)
+        if status == 429:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"results": []})
+
+    client._http = httpx.Client(transport=httpx.MockTransport(handler))
+    started = datetime.now(UTC)
+
+    with client:
+        assert client.search({"q": "NuScale", "skip": 0}) == {"results": []}
+
+    assert datetime.now(UTC) - started < timedelta(seconds=1)
+    assert limiter.limit == 2
+
+
+def test_client_caps_retry_after_at_max_wait() -> None:
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=2,
+        retry_min_wait_s=0.05,
+        retry_max_wait_s=0.1,
+    )
+    statuses = iter([429, 200])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = next(statuses)
+        if status == 429:
+            return httpx.Response(429, headers={"Retry-After": "3600"})
+        return httpx.Response(200, json={"results": []})
+
+    client._http = httpx.Client(transport=httpx.MockTransport(handler))
+    started = datetime.now(UTC)
+
+    with client:
+        assert client.search({"q": "NuScale", "skip": 0}) == {"results": []}
+
+    assert datetime.now(UTC) - started < timedelta(seconds=1)
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any
+
+import jsonschema
+import pytest
+import yaml
+
+from aps_etl.registry import clear_registry_cache, compile_registry, load_registry
+
+REGISTRY = """
+version: 1
+queries:
+  - name: "first"
+    q: "NuScale"
+  - name: "second"
+    q: "Vogtle"
+    enabled: false
+"""
+
+
+@pytest.fixture()
+def paths(tmp_path: Path) -> tuple[Path, Path]:
+    clear_registry_cache()
+    schema_path = tmp_path / "schema.json"
+    registry_path = tmp_path / "queries.yaml"
+    schema_path.write_text(Path("registry_schema.json").read_text(encoding="utf-8"))
+    registry_path.write_text(REGISTRY, encoding="utf-8")
+    return registry_path, schema_path
+
+
+def test_compiled_registry_is_reused_until_the_file_changes(
+    paths: tuple[Path, Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    registry_path, schema_path = paths
+    loads: list[str] = []
+    safe_load = yaml.safe_load
+
+    def _safe_load(text: str) -> Any:
+        loads.append(text)
+        return safe_load(text)
+
+    monkeypatch.setattr(yaml, "safe_load", _safe_load)
+
+    compiled = compile_registry(registry_path, schema_path)
+    assert compile_registry(registry_path, schema_path) is compiled
+    assert [query.name for query in compiled.enabled_queries()] == ["first"]
+    assert [query.name for query in load_registry(registry_path, schema_path)] == [
+        "first",
+        "second",
+    ]
+    assert len(loads) == 2
+
+    # Touched without changing content: rehashed, not reparsed.
+    stat = registry_path.stat()
+    os.utime(registry_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert compile_registry(registry_path, schema_path) is compiled
+    assert len(loads) == 2
+
+    registry_path.write_text(REGISTRY.replace("Vogtle", "Summer"), encoding="utf-8")
+    recompiled = compile_registry(registry_path, schema_path)
+    assert recompiled is not compiled
+    assert recompiled.queries[1].q == "Summer"
+    # The schema is unchanged, so its cached validator is reused.
+    assert len(loads) == 3
+
+
+def test_compiled_registry_rejects_invalid_payloads(paths: tuple[Path, Path]) -> None:
+    registry_path, schema_path = paths
+    registry_path.write_text("version: 2\nqueries: []\n", encoding="utf-8")
+
+    with pytest.raises(jsonschema.ValidationError):
+        compile_registry(registry_path, schema_path)
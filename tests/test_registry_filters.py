@@ -1,4 +1,14 @@
-from aps_etl.registry import compile_date_range_filter
+from datetime import date
+
+from aps_etl.registry import (
+    Filter,
+    Libraries,
+    QueryDefinition,
+    SortSpec,
+    compile_date_range_filter,
+    date_range_bounds,
+    with_date_range,
+)
 
 
 def test_compile_date_range_filter() -> None:
@@ -13,3 +23,29 @@ def test_compile_date_range_filter() -> None:
     assert compiled.value == (
         "(DateAddedTimestamp ge '2025-01-01' and DateAddedTimestamp le '2025-01-31')"
     )
+
+
+def test_with_date_range_replaces_existing_window_in_place() -> None:
+    query = QueryDefinition(
+        query_id="test",
+        name="test",
+        q="NuScale",
+        filters_and=(
+            compile_date_range_filter("DateAddedTimestamp", "2024-01-01", "2024-01-31"),
+            Filter(field="DocumentType", operator="contains", value="Report"),
+        ),
+        filters_or=(),
+        libraries=Libraries(legacy=True, main=True),
+        sort=SortSpec(field="DateAddedTimestamp", direction="DESC"),
+        content=False,
+        safety_buffer_days=3,
+        wire_format=None,
+        enabled=True,
+    )
+
+    windowed = with_date_range(query, "DateAddedTimestamp", date(2024, 2, 1), date(2024, 2, 5))
+
+    assert date_range_bounds(query, "DateAddedTimestamp") == (date(2024, 1, 1), date(2024, 1, 31))
+    assert date_range_bounds(windowed, "DateAddedTimestamp") == (date(2024, 2, 1), date(2024, 2, 5))
+    assert windowed.filters_and[1] == query.filters_and[1]
+    assert len(windowed.filters_and) == 2
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+
+from aps_etl.client import APSClient
+from aps_etl.response_cache import ResponseCache
+
+
+def test_cached_search_skips_the_network(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = ResponseCache(directory=tmp_path, ttl_s=3600, max_bytes=1024 * 1024)
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+        response_cache=cache,
+    )
+    requests: list[dict[str, Any]] = []
+
+    def _request(method: str, url: str, json: dict[str, Any]) -> httpx.Response:
+        requests.append(json)
+        return httpx.Response(200, json={"results": [{"document": {"AccessionNumber": "ML1"}}]})
+
+    monkeypatch.setattr(client, "_request", _request)
+    payload = {"q": "NuScale", "sortDirection": 1, "skip": 0}
+
+    first = client.search(payload)
+    second = client.search(payload)
+    client.search({**payload, "skip": 10})
+
+    assert first == second
+    assert len(requests) == 2
+    assert cache.hits == 1
+    assert cache.misses == 2
+
+
+def test_expired_entries_are_misses(tmp_path: Path) -> None:
+    cache = ResponseCache(directory=tmp_path, ttl_s=60, max_bytes=1024 * 1024)
+    cache.put("ab" * 32, {"results": []})
+    entry = next(tmp_path.glob("*/*.json.gz"))
+    stale = time.time() - 120
+    os.utime(entry, (stale, stale))
+
+    assert cache.get("ab" * 32) is None
+    assert not entry.exists()
+
+
+def test_oldest_entries_are_evicted_over_size(tmp_path: Path) -> None:
+    cache = ResponseCache(directory=tmp_path, ttl_s=3600, max_bytes=1024 * 1024)
+    now = time.time()
+    for offset, key in enumerate(("aa", "bb", "cc")):
+        cache.put(key * 32, {"results": []})
+        path = tmp_path / key / f"{key * 32}.json.gz"
+        os.utime(path, (now - 10 + offset, now - 10 + offset))
+    cache.max_bytes = cache.stats()["bytes"]
+
+    cache.put("dd" * 32, {"results": []})
+    remaining = sorted(path.parent.name for path in tmp_path.glob("*/*.json.gz"))
+
+    assert remaining == ["cc", "dd"]
+    assert cache.stats()["bytes"] <= cache.max_bytes
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from aps_etl.models import (
+    APSDiscovery,
+    APSDocument,
+    APSQuery,
+    APSQueryRun,
+    APSQueryState,
+    Base,
+    QueryRunStatus,
+)
+from aps_etl.retention import apply_retention, main
+
+NOW = datetime(2026, 10, 17)
+HIGHLIGHTS = {"Title": ["<em>NuScale</em>"]}
+SEMANTIC = {"rank": 1}
+
+
+def _run(run_id: int, query_id: str, age_days: int, status: QueryRunStatus) -> APSQueryRun:
+    return APSQueryRun(
+        run_id=run_id,
+        query_id=query_id,
+        started_at=NOW - timedelta(days=age_days, hours=1),
+        ended_at=NOW - timedelta(days=age_days),
+        status=status,
+        wire_format="A",
+        request_fingerprint="fingerprint",
+        schema_version="1",
+    )
+
+
+def test_retention_compacts_then_deletes_in_batches() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        for query_id in ("q1", "q2"):
+            session.add(APSQuery(query_id=query_id, name=query_id, definition_json={}))
+        session.add(APSDocument(accession_number="ML1", accession_number_lower="ml1"))
+        session.add_all(
+            [
+                _run(1, "q1", 200, QueryRunStatus.SUCCESS),
+                _run(2, "q1", 150, QueryRunStatus.FAILED),
+                _run(3, "q1", 60, QueryRunStatus.SUCCESS),
+                _run(4, "q1", 10, QueryRunStatus.SUCCESS),
+                _run(5, "q2", 200, QueryRunStatus.PARTIAL),
+                _run(6, "q2", 120, QueryRunStatus.SUCCESS),
+            ]
+        )
+        session.add(
+            APSQueryState(
+                query_id="q2",
+                last_seen_date=NOW.date(),
+                safety_buffer_days=3,
+                checkpoint_run_id=5,
+            )
+        )
+        session.add_all(
+            APSDiscovery(
+                run_id=run_id,
+                accession_number="ML1",
+                skip_value=0,
+                page_number=1,
+                highlights_json=HIGHLIGHTS,
+                semantic_search_json=SEMANTIC,
+            )
+            for run_id in range(1, 7)
+        )
+        session.commit()
+
+        report = apply_retention(
+            session, run_retention_days=90, payload_retention_days=30, batch_runs=1, now=NOW
+        )
+
+        remaining = {
+            run_id: highlights
+            for run_id, highlights in session.execute(
+                select(APSDiscovery.run_id, APSDiscovery.highlights_json)
+            )
+        }
+        runs = set(session.scalars(select(APSQueryRun.run_id)))
+        rerun = apply_retention(
+            session, run_retention_days=90, payload_retention_days=30, batch_runs=1, now=NOW
+        )
+
+    # Run 4 is recent, 5 is checkpointed and 6 is q2's latest successful run.
+    assert runs == {3, 4, 5, 6}
+    assert remaining == {3: None, 4: HIGHLIGHTS, 5: HIGHLIGHTS, 6: HIGHLIGHTS}
+    assert report.discoveries_compacted == 3
+    assert (report.runs_deleted, report.discoveries_deleted) == (2, 2)
+    assert report.payload_bytes_reclaimed == 3 * len(json.dumps(HIGHLIGHTS) + json.dumps(SEMANTIC))
+    assert rerun.describe().startswith("0 runs and 0 discoveries deleted, 0 discoveries")
+
+
+def test_main_reports_once_through_logging(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    capsys: pytest.CaptureFixture[str],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    url = f"sqlite+pysqlite:///{tmp_path / 'aps.db'}"
+    Base.metadata.create_all(create_engine(url, future=True))
+    monkeypatch.setenv("DATABASE_URL", url)
+    monkeypatch.setenv("APS_PRIMARY_KEY", "test-key")
+    monkeypatch.setenv("RETENTION_RUN_DAYS", "90")
+    caplog.set_level("INFO", logger="aps_etl.retention")
+
+    main()
+
+    assert capsys.readouterr().out == ""
+    assert [record.getMessage() for record in caplog.records] == [
+        "Retention: 0 runs and 0 discoveries deleted, 0 discoveries compacted, "
+        "0 payload bytes reclaimed, 0 documents' metadata moved to the store, "
+        "0 unreferenced stored payloads pruned"
+    ]
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from datetime import date, timedelta
+from typing import Any
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from aps_etl.client import APSClient
+from aps_etl.models import APSDiscovery, APSQueryRun, APSQueryState, Base, QueryRunStatus
+from aps_etl.registry import (
+    Filter,
+    Libraries,
+    QueryDefinition,
+    SortSpec,
+    compile_date_range_filter,
+    parse_date_range_filter,
+)
+from aps_etl.runner import RunOptions, run_query
+
+QUERY = QueryDefinition(
+    query_id="bisect-query",
+    name="Bisect Query",
+    q="NuScale",
+    filters_and=(compile_date_range_filter("DateAddedTimestamp", "2024-01-01", "2024-01-08"),),
+    filters_or=(),
+    libraries=Libraries(legacy=True, main=True),
+    sort=SortSpec(field="DateAddedTimestamp", direction="DESC"),
+    content=False,
+    safety_buffer_days=3,
+    wire_format="A",
+    enabled=True,
+)
+
+
+def _search(payload: dict[str, Any], *, with_count: bool = False) -> dict[str, Any]:
+    value = next(
+        item["value"] for item in payload["filters"] if item["field"] == "DateAddedTimestamp"
+    )
+    bounds = parse_date_range_filter(Filter(field="DateAddedTimestamp", operator=None, value=value))
+    assert bounds is not None
+    start, end = date.fromisoformat(bounds[0]), date.fromisoformat(bounds[1])
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    results = [{"document": {"AccessionNumber": f"ML{day:%Y%m%d}"}} for day in days]
+    page = {"results": results[payload["skip"] : payload["skip"] + 2]}
+    return {**page, "count": len(results)} if with_count else page
+
+
+def test_capped_window_is_bisected_until_pages_fit(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+    )
+    monkeypatch.setattr(client, "search", _search)
+
+    with Session(engine) as session:
+        run_query(
+            session=session,
+            client=client,
+            query=QUERY,
+            schema_version="1",
+            max_pages=2,
+            options=RunOptions(bisect_windows=True),
+        )
+        session.commit()
+
+        query_run = session.scalar(select(APSQueryRun))
+        discovery_count = session.scalar(select(func.count()).select_from(APSDiscovery)) or 0
+
+    assert query_run is not None
+    assert query_run.status == QueryRunStatus.SUCCESS
+    assert discovery_count == 8
+    assert isinstance(query_run.windows_json, list)
+    completed = [
+        (entry["start"], entry["end"])
+        for entry in query_run.windows_json
+        if entry["status"] == "complete"
+    ]
+    # Each half holds exactly two pages, so it finishes without being split again.
+    assert completed == [("2024-01-01", "2024-01-04"), ("2024-01-05", "2024-01-08")]
+
+
+def test_oversized_window_is_split_from_its_first_page_count(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+    )
+    requests: list[tuple[str, int]] = []
+
+    def _counted(payload: dict[str, Any]) -> dict[str, Any]:
+        value = next(
+            item["value"] for item in payload["filters"] if item["field"] == "DateAddedTimestamp"
+        )
+        requests.append((value, payload["skip"]))
+        return _search(payload, with_count=True)
+
+    monkeypatch.setattr(client, "search", _counted)
+
+    with Session(engine) as session:
+        run_query(
+            session=session,
+            client=client,
+            query=QUERY,
+            schema_version="1",
+            max_pages=2,
+            options=RunOptions(bisect_windows=True),
+        )
+        session.commit()
+        discovery_count = session.scalar(select(func.count()).select_from(APSDiscovery)) or 0
+
+    # One request shows the 8 results cannot fit in 2 pages of 2. Each half then takes
+    # its 2 pages plus one request showing nothing lies beyond the cap.
+    assert [skip for _, skip in requests] == [0, 0, 2, 4, 0, 2, 4]
+    assert len(requests) == 7
+    assert discovery_count == 8
+
+
+def test_resume_keeps_run_with_partial_window_partial(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+    )
+    payloads: list[dict[str, Any]] = []
+
+    def _endless(payload: dict[str, Any]) -> dict[str, Any]:
+        payloads.append(payload)
+        return {"results": [{"document": {"AccessionNumber": f"ML{payload['skip']}"}}]}
+
+    monkeypatch.setattr(client, "search", _endless)
+    # A single-day window cannot be bisected, so hitting the cap leaves it partial.
+    query = replace(
+        QUERY,
+        filters_and=(compile_date_range_filter("DateAddedTimestamp", "2024-01-01", "2024-01-01"),),
+    )
+    options = RunOptions(bisect_windows=True, resume=True)
+    watermark = date(2023, 12, 1)
+
+    with Session(engine) as session:
+        run_query(
+            session=session,
+            client=client,
+            query=query,
+            schema_version="1",
+            max_pages=1,
+            options=options,
+        )
+        session.commit()
+        state = session.get(APSQueryState, query.query_id)
+        assert state is not None
+        state.last_seen_date = watermark
+        session.commit()
+        fetched = len(payloads)
+
+        run_query(
+            session=session,
+            client=client,
+            query=query,
+            schema_version="1",
+            max_pages=1,
+            options=options,
+        )
+        session.commit()
+
+        runs = session.scalars(select(APSQueryRun)).all()
+        checkpoint_run_id = state.checkpoint_run_id
+        last_seen_date = state.last_seen_date
+
+    # The page itself and one request showing the window continues past the cap.
+    assert fetched == 2
+    assert len(payloads) == fetched
+    assert len(runs) == 1
+    assert runs[0].status == QueryRunStatus.PARTIAL
+    assert checkpoint_run_id == runs[0].run_id
+    assert last_seen_date == watermark
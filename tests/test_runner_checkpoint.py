@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from aps_etl.client import APSClient
+from aps_etl.models import APSDiscovery, APSQueryRun, APSQueryState, Base, QueryRunStatus
+from aps_etl.registry import Libraries, QueryDefinition, SortSpec
+from aps_etl.runner import RunOptions, run_query
+
+QUERY = QueryDefinition(
+    query_id="checkpoint-query",
+    name="Checkpoint Query",
+    q="NuScale",
+    filters_and=(),
+    filters_or=(),
+    libraries=Libraries(legacy=True, main=True),
+    sort=SortSpec(field="DateAddedTimestamp", direction="DESC"),
+    content=False,
+    safety_buffer_days=3,
+    wire_format="A",
+    enabled=True,
+)
+
+
+def test_failed_run_resumes_from_checkpoint(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+    )
+    requested: list[int] = []
+    fail_at: int | None = 4
+
+    def _search(payload: dict[str, Any]) -> dict[str, Any]:
+        skip = payload["skip"]
+        requested.append(skip)
+        if skip == fail_at:
+            raise RuntimeError("transient")
+        results = [{"document": {"AccessionNumber": f"ML{i}"}} for i in range(skip, 6)]
+        return {"results": results[:2]}
+
+    monkeypatch.setattr(client, "search", _search)
+    options = RunOptions(checkpoint_every_pages=1, resume=True)
+
+    with Session(engine) as session:
+        with pytest.raises(RuntimeError, match="transient"):
+            run_query(
+                session=session,
+                client=client,
+                query=QUERY,
+                schema_version="1",
+                max_pages=10,
+                options=options,
+            )
+
+    with Session(engine) as session:
+        state = session.get(APSQueryState, QUERY.query_id)
+        assert state is not None
+        assert (state.checkpoint_skip, state.checkpoint_page) == (4, 2)
+        # Resume as if in a later month than the run started.
+        failed_run = session.get(APSQueryRun, state.checkpoint_run_id)
+        assert failed_run is not None
+        failed_run.started_at = datetime(2024, 1, 31, 23, 0)
+        session.commit()
+
+    fail_at = None
+    requested.clear()
+    with Session(engine) as session:
+        run_query(
+            session=session,
+            client=client,
+            query=QUERY,
+            schema_version="1",
+            max_pages=10,
+            options=options,
+        )
+        session.commit()
+
+    with Session(engine) as session:
+        runs = session.scalars(select(APSQueryRun)).all()
+        discovery_count = session.scalar(select(func.count()).select_from(APSDiscovery)) or 0
+        state = session.get(APSQueryState, QUERY.query_id)
+        resumed_at = set(
+            session.scalars(select(APSDiscovery.discovered_at).where(APSDiscovery.page_number == 3))
+        )
+
+    assert requested == [4, 6]
+    assert len(runs) == 1
+    assert runs[0].status == QueryRunStatus.SUCCESS
+    assert discovery_count == 6
+    assert state is not None
+    assert state.checkpoint_run_id is None
+    # Pages fetched after the resume keep the run's stamp, and so its partition.
+    assert resumed_at == {datetime(2024, 1, 31, 23, 0)}
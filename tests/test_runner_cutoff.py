@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Any
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from aps_etl.client import APSClient
+from aps_etl.models import APSQueryRun, APSQueryState, Base, QueryRunStatus
+from aps_etl.registry import Libraries, QueryDefinition, SortSpec
+from aps_etl.runner import RunOptions, run_query, watermark_cutoff
+
+QUERY = QueryDefinition(
+    query_id="cutoff-query",
+    name="Cutoff Query",
+    q="NuScale",
+    filters_and=(),
+    filters_or=(),
+    libraries=Libraries(legacy=True, main=True),
+    sort=SortSpec(field="DateAddedTimestamp", direction="DESC"),
+    content=False,
+    safety_buffer_days=3,
+    wire_format="A",
+    enabled=True,
+)
+
+
+def _document(accession: str, added: str) -> dict[str, Any]:
+    return {"document": {"AccessionNumber": accession, "DateAddedTimestamp": added}}
+
+
+@pytest.mark.parametrize("pipeline_depth", [0, 2])
+def test_early_cutoff_stops_at_first_known_page_behind_watermark(
+    monkeypatch: pytest.MonkeyPatch, pipeline_depth: int
+) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+    )
+    today = f"{date.today().isoformat()} 00:00"
+    older = [_document(f"ML20{index}", f"2020-01-{10 - index:02d} 00:00") for index in range(6)]
+    pages: list[list[dict[str, Any]]] = []
+    skips: list[int] = []
+
+    def _search(payload: dict[str, Any]) -> dict[str, Any]:
+        skips.append(payload["skip"])
+        results = [entry for page in pages for entry in page]
+        return {"results": results[payload["skip"] : payload["skip"] + 2]}
+
+    monkeypatch.setattr(client, "search", _search)
+    options = RunOptions(early_cutoff=True, pipeline_depth=pipeline_depth)
+
+    with Session(engine) as session:
+
+        def _run() -> APSQueryRun:
+            skips.clear()
+            run_query(
+                session=session,
+                client=client,
+                query=QUERY,
+                schema_version="1",
+                max_pages=10,
+                options=options,
+            )
+            session.commit()
+            query_run = session.scalars(
+                select(APSQueryRun).order_by(APSQueryRun.run_id.desc())
+            ).first()
+            assert query_run is not None
+            return query_run
+
+        def _assert_fetched(expected: list[int]) -> None:
+            # The pipeline may read ahead of the page that ends the run.
+            assert skips[: len(expected)] == expected
+            if not pipeline_depth:
+                assert len(skips) == len(expected)
+
+        # The first run has no watermark to trust and walks every page.
+        pages[:] = [older[0:2], older[2:4], older[4:6]]
+        first = _run()
+        _assert_fetched([0, 2, 4, 6])
+        assert first.stop_reason is None
+
+        # New documents lead the listing; the first fully known old page ends the run.
+        pages[:] = [[_document("ML24A", today), _document("ML24B", today)], *pages]
+        second = _run()
+        _assert_fetched([0, 2])
+        assert second.status == QueryRunStatus.SUCCESS
+        assert second.stop_reason is not None
+        assert second.stop_reason.startswith("Page 2 ")
+
+        # A page mixing known and unseen old documents keeps paging.
+        pages[:] = [pages[0], [older[0], _document("ML19X", "2019-12-31 00:00")], older[2:4]]
+        third = _run()
+        _assert_fetched([0, 2, 4])
+        assert third.stop_reason is not None
+        assert third.stop_reason.startswith("Page 3 ")
+
+
+def test_cutoff_advances_with_each_successful_run(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+    )
+    known = [_document(f"ML20{index}", "2020-01-01 00:00") for index in range(4)]
+
+    def _search(payload: dict[str, Any]) -> dict[str, Any]:
+        return {"results": known[payload["skip"] : payload["skip"] + 2]}
+
+    monkeypatch.setattr(client, "search", _search)
+    options = RunOptions(early_cutoff=True)
+    cutoffs: list[date | None] = []
+    stop_reasons: list[str | None] = []
+
+    with Session(engine) as session:
+        # Unwindowed runs on three days; none of them moves last_seen_date.
+        for day in (datetime(2024, 3, 1), datetime(2024, 3, 10), datetime(2024, 3, 20)):
+            state = session.get(APSQueryState, QUERY.query_id)
+            cutoffs.append(
+                None if state is None else watermark_cutoff(session, QUERY, state, options)
+            )
+            run_query(
+                session=session,
+                client=client,
+                query=QUERY,
+                schema_version="1",
+                max_pages=10,
+                options=options,
+            )
+            query_run = session.scalars(
+                select(APSQueryRun).order_by(APSQueryRun.run_id.desc())
+            ).first()
+            assert query_run is not None
+            query_run.started_at = day
+            stop_reasons.append(query_run.stop_reason)
+            session.commit()
+
+    assert cutoffs == [None, date(2024, 2, 27), date(2024, 3, 7)]
+    assert stop_reasons == [
+        None,
+        "Page 1 was added before 2024-02-27 and already loaded.",
+        "Page 1 was added before 2024-03-07 and already loaded.",
+    ]
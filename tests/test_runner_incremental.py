@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from datetime import date, timedelta
+from typing import Any
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from aps_etl.client import APSClient
+from aps_etl.models import APSQueryRun, APSQueryState, Base
+from aps_etl.registry import Libraries, QueryDefinition, SortSpec, compile_date_range_filter
+from aps_etl.runner import RunOptions, run_query
+
+QUERY = QueryDefinition(
+    query_id="incremental-query",
+    name="Incremental Query",
+    q="NuScale",
+    filters_and=(),
+    filters_or=(),
+    libraries=Libraries(legacy=True, main=True),
+    sort=SortSpec(field="DateAddedTimestamp", direction="DESC"),
+    content=False,
+    safety_buffer_days=3,
+    wire_format="A",
+    enabled=True,
+)
+
+
+def test_incremental_run_uses_watermark_window(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+    )
+    payloads: list[dict[str, Any]] = []
+
+    def _search(payload: dict[str, Any]) -> dict[str, Any]:
+        payloads.append(payload)
+        return {"results": []}
+
+    monkeypatch.setattr(client, "search", _search)
+    options = RunOptions(incremental=True)
+    watermark = date.today() - timedelta(days=10)
+
+    with Session(engine) as session:
+        run_query(
+            session=session,
+            client=client,
+            query=QUERY,
+            schema_version="1",
+            max_pages=5,
+            options=options,
+        )
+        session.commit()
+        state = session.get(APSQueryState, QUERY.query_id)
+        assert state is not None
+        state.last_seen_date = watermark
+        session.commit()
+
+        run_query(
+            session=session,
+            client=client,
+            query=QUERY,
+            schema_version="1",
+            max_pages=5,
+            options=options,
+        )
+        session.commit()
+
+        runs = session.scalars(select(APSQueryRun).order_by(APSQueryRun.run_id)).all()
+        last_seen_date = state.last_seen_date
+
+    window_start = (watermark - timedelta(days=3)).isoformat()
+    assert payloads[0]["filters"] == []
+    assert payloads[1]["filters"] == [
+        {
+            "field": "DateAddedTimestamp",
+            "value": (
+                f"(DateAddedTimestamp ge '{window_start}' "
+                f"and DateAddedTimestamp le '{date.today().isoformat()}')"
+            ),
+        }
+    ]
+    assert (runs[0].window_start, runs[0].window_end) == (None, None)
+    assert runs[1].window_start == watermark - timedelta(days=3)
+    assert runs[1].window_end == date.today()
+    assert last_seen_date == date.today()
+
+
+def test_incremental_run_skips_closed_range_behind_watermark(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+    )
+    payloads: list[dict[str, Any]] = []
+
+    def _search(payload: dict[str, Any]) -> dict[str, Any]:
+        payloads.append(payload)
+        return {"results": []}
+
+    monkeypatch.setattr(client, "search", _search)
+    query = replace(
+        QUERY,
+        filters_and=(compile_date_range_filter("DateAddedTimestamp", "2020-01-01", "2020-12-31"),),
+    )
+
+    with Session(engine) as session:
+        for _ in range(2):
+            run_query(
+                session=session,
+                client=client,
+                query=query,
+                schema_version="1",
+                max_pages=5,
+                options=RunOptions(incremental=True),
+            )
+            session.commit()
+
+        runs = session.scalars(select(APSQueryRun)).all()
+
+    assert len(payloads) == 1
+    assert [(run.window_start, run.window_end) for run in runs] == [
+        (date(2020, 1, 1), date(2020, 12, 31))
+    ]
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+import pytest
+
+from aps_etl.client import APSClient
+from aps_etl.registry import Libraries, QueryDefinition, SortSpec
+from aps_etl.runner import iter_pages
+
+QUERY = QueryDefinition(
+    query_id="prefetch-query",
+    name="Prefetch Query",
+    q="NuScale",
+    filters_and=(),
+    filters_or=(),
+    libraries=Libraries(legacy=True, main=True),
+    sort=SortSpec(field="DateAddedTimestamp", direction="DESC"),
+    content=False,
+    safety_buffer_days=3,
+    wire_format="A",
+    enabled=True,
+)
+
+
+def _client(
+    monkeypatch: pytest.MonkeyPatch, total: int, page_size: int
+) -> tuple[APSClient, list[int]]:
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+    )
+    requested: list[int] = []
+    lock = threading.Lock()
+
+    def _search(payload: dict[str, Any]) -> dict[str, Any]:
+        skip = payload["skip"]
+        with lock:
+            requested.append(skip)
+        results = [{"document": {"AccessionNumber": f"ML{i}"}} for i in range(skip, total)]
+        return {"results": results[:page_size]}
+
+    monkeypatch.setattr(client, "search", _search)
+    return client, requested
+
+
+@pytest.mark.parametrize("prefetch", [0, 1, 3])
+def test_iter_pages_yields_each_page_once(monkeypatch: pytest.MonkeyPatch, prefetch: int) -> None:
+    client, requested = _client(monkeypatch, total=10, page_size=3)
+
+    pages = list(iter_pages(client, QUERY, wire_format="A", max_pages=50, prefetch=prefetch))
+
+    assert [skip for skip, _ in pages] == [0, 3, 6, 9]
+    assert sum(len(results) for _, results in pages) == 10
+    assert {0, 3, 6, 9, 10} <= set(requested)
+
+
+def test_iter_pages_prefetch_honors_page_cap(monkeypatch: pytest.MonkeyPatch) -> None:
+    client, requested = _client(monkeypatch, total=100, page_size=5)
+
+    pages = list(iter_pages(client, QUERY, wire_format="A", max_pages=4, prefetch=8))
+
+    assert [skip for skip, _ in pages] == [0, 5, 10, 15]
+    assert sorted(requested) == [0, 5, 10, 15]
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from aps_etl.client import APSClient
+from aps_etl.models import APSDiscovery, APSQueryRun, Base, QueryRunStatus
+from aps_etl.registry import (
+    Filter,
+    Libraries,
+    QueryDefinition,
+    SortSpec,
+    compile_date_range_filter,
+    parse_date_range_filter,
+)
+from aps_etl.runner import RunOptions, record_page, run_query, split_window
+
+QUERY = QueryDefinition(
+    query_id="shard-query",
+    name="Shard Query",
+    q="NuScale",
+    filters_and=(compile_date_range_filter("DateAddedTimestamp", "2024-01-01", "2024-01-08"),),
+    filters_or=(),
+    libraries=Libraries(legacy=True, main=True),
+    sort=SortSpec(field="DateAddedTimestamp", direction="DESC"),
+    content=False,
+    safety_buffer_days=3,
+    wire_format="A",
+    enabled=True,
+)
+
+
+def _search(payload: dict[str, Any]) -> dict[str, Any]:
+    value = next(
+        item["value"] for item in payload["filters"] if item["field"] == "DateAddedTimestamp"
+    )
+    bounds = parse_date_range_filter(Filter(field="DateAddedTimestamp", operator=None, value=value))
+    assert bounds is not None
+    start, end = date.fromisoformat(bounds[0]), date.fromisoformat(bounds[1])
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    results = [{"document": {"AccessionNumber": f"ML{day:%Y%m%d}"}} for day in days]
+    return {"results": results[payload["skip"] : payload["skip"] + 2]}
+
+
+def test_split_window_covers_range_without_overlap() -> None:
+    windows = split_window(date(2024, 1, 1), date(2024, 1, 10), 3)
+
+    assert windows == [
+        (date(2024, 1, 1), date(2024, 1, 3)),
+        (date(2024, 1, 4), date(2024, 1, 6)),
+        (date(2024, 1, 7), date(2024, 1, 10)),
+    ]
+    assert split_window(date(2024, 1, 1), date(2024, 1, 2), 4) == [
+        (date(2024, 1, 1), date(2024, 1, 1)),
+        (date(2024, 1, 2), date(2024, 1, 2)),
+    ]
+
+
+def test_shards_are_fetched_concurrently_and_recorded(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+    )
+    threads: set[str] = set()
+
+    def search(payload: dict[str, Any]) -> dict[str, Any]:
+        threads.add(threading.current_thread().name)
+        return _search(payload)
+
+    monkeypatch.setattr(client, "search", search)
+
+    with Session(engine) as session:
+        run_query(
+            session=session,
+            client=client,
+            query=QUERY,
+            schema_version="1",
+            max_pages=5,
+            options=RunOptions(shards=4),
+        )
+        session.commit()
+
+        query_run = session.scalar(select(APSQueryRun))
+        discovery_count = session.scalar(select(func.count()).select_from(APSDiscovery)) or 0
+        discovered_at = set(session.scalars(select(APSDiscovery.discovered_at)))
+
+    assert query_run is not None
+    assert query_run.status == QueryRunStatus.SUCCESS
+    assert discovery_count == 8
+    # Every discovery of a run is stamped alike, so the run lands in one partition.
+    assert discovered_at == {query_run.started_at}
+    assert threading.current_thread().name not in threads
+    assert isinstance(query_run.windows_json, list)
+    assert [
+        (entry["start"], entry["end"], entry["status"]) for entry in query_run.windows_json
+    ] == [
+        ("2024-01-01", "2024-01-02", "complete"),
+        ("2024-01-03", "2024-01-04", "complete"),
+        ("2024-01-05", "2024-01-06", "complete"),
+        ("2024-01-07", "2024-01-08", "complete"),
+    ]
+
+
+def _endless_client(monkeypatch: pytest.MonkeyPatch, fetched: list[int]) -> APSClient:
+    client = APSClient(
+        base_url="https://adams-api.nrc.gov",
+        api_key="test-key",
+        timeout_s=1.0,
+        retry_max_attempts=1,
+        retry_min_wait_s=0.1,
+        retry_max_wait_s=0.2,
+    )
+
+    def search(payload: dict[str, Any]) -> dict[str, Any]:
+        fetched.append(payload["skip"])
+        return {"results": [{"document": {"AccessionNumber": f"ML{len(fetched)}"}}]}
+
+    monkeypatch.setattr(client, "search", search)
+    return client
+
+
+def test_slow_writer_holds_back_shard_workers(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    fetched: list[int] = []
+    client = _endless_client(monkeypatch, fetched)
+    recorded = 0
+    lead = 0
+
+    def slow_record_page(*args: Any, **kwargs: Any) -> None:
+        nonlocal recorded, lead
+        lead = max(lead, len(fetched) - recorded)
+        time.sleep(0.01)
+        record_page(*args, **kwargs)
+        recorded += 1
+
+    monkeypatch.setattr("aps_etl.runner.record_page", slow_record_page)
+
+    with Session(engine) as session:
+        run_query(
+            session=session,
+            client=client,
+            query=QUERY,
+            schema_version="1",
+            max_pages=20,
+            options=RunOptions(shards=2),
+        )
+
+    assert recorded == 40
+    # Two queued pages, one page per worker blocked on the queue, and the page being written.
+    assert lead <= 5
+
+
+def test_writer_failure_releases_blocked_shard_workers(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    fetched: list[int] = []
+    client = _endless_client(monkeypatch, fetched)
+
+    def failing_record_page(*args: Any, **kwargs: Any) -> None:
+        time.sleep(0.05)
+        raise RuntimeError("write failed")
+
+    monkeypatch.setattr("aps_etl.runner.record_page", failing_record_page)
+
+    with Session(engine) as session:
+        with pytest.raises(RuntimeError, match="write failed"):
+            run_query(
+                session=session,
+                client=client,
+                query=QUERY,
+                schema_version="1",
+                max_pages=20,
+                options=RunOptions(shards=2),
+            )
+
+    assert len(fetched) <= 5
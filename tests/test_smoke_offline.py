@@ -9,7 +9,7 @@ from sqlalchemy.orm import Session
 from aps_etl.models import APSDocument, Base
 from aps_etl.runner import run_all_queries
 from aps_etl.settings import Settings
-from tests.helpers import build_vcr
+from tests.helpers import build_vcr, seed_recorded_wire_format
 
 
 @pytest.mark.smoke_offline
@@ -18,6 +18,7 @@ def test_smoke_offline_run(tmp_path: Path) -> None:
     database_url = f"sqlite+pysqlite:///{db_path}"
     engine = create_engine(database_url, future=True)
     Base.metadata.create_all(engine)
+    seed_recorded_wire_format(database_url)
 
     settings = Settings.model_validate(
         {"database_url": database_url, "aps_primary_key": "test-key"}
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Any
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from aps_etl.client import (
+    WIRE_FORMAT_PROBE_QUERY,
+    APSClient,
+    APSClientError,
+    AsyncAPSClient,
+)
+from aps_etl.db import record_endpoint_wire_format
+from aps_etl.models import APSEndpointState, APSQueryState, Base
+from aps_etl.registry import Libraries, QueryDefinition, SortSpec
+from aps_etl.runner import RunOptions, cached_wire_format, prepare_query, run_query
+from aps_etl.serialization import serialize_query
+
+BASE_URL = "https://adams-api.nrc.gov"
+
+
+def _query(query_id: str, wire_format: str | None = None) -> QueryDefinition:
+    return QueryDefinition(
+        query_id=query_id,
+        name=query_id,
+        q=query_id,
+        filters_and=(),
+        filters_or=(),
+        libraries=Libraries(legacy=True, main=True),
+        sort=SortSpec(field="DateAddedTimestamp", direction="DESC"),
+        content=True,
+        safety_buffer_days=3,
+        wire_format=wire_format,
+        enabled=True,
+    )
+
+
+def _client_kwargs() -> dict[str, Any]:
+    return {
+        "base_url": BASE_URL,
+        "api_key": "test-key",
+        "timeout_s": 1.0,
+        "retry_max_attempts": 1,
+        "retry_min_wait_s": 0.1,
+        "retry_max_wait_s": 0.2,
+    }
+
+
+def test_endpoint_is_probed_once_with_minimal_payload(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    client = APSClient(**_client_kwargs())
+    payloads: list[dict[str, Any]] = []
+
+    def _search(payload: dict[str, Any]) -> dict[str, Any]:
+        payloads.append(payload)
+        return {"results": []}
+
+    monkeypatch.setattr(client, "search", _search)
+
+    with Session(engine) as session:
+        for query_id in ("first", "second", "third"):
+            run_query(
+                session=session,
+                client=client,
+                query=_query(query_id),
+                schema_version="1",
+                max_pages=1,
+            )
+        session.commit()
+
+        endpoint = session.get(APSEndpointState, BASE_URL)
+        states = session.scalars(select(APSQueryState)).all()
+
+        assert endpoint is not None
+        assert endpoint.wire_format == "A"
+        assert {state.wire_format for state in states} == {"A"}
+        assert all(state.wire_format_verified_at is not None for state in states)
+
+    probe_payload = serialize_query(WIRE_FORMAT_PROBE_QUERY, wire_format="A", skip=0)
+    assert payloads.count(probe_payload) == 1
+    assert len(payloads) == 4
+
+
+def test_stale_endpoint_detection_is_reprobed() -> None:
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    options = RunOptions(wire_format_ttl_hours=24)
+    verified_at = datetime(2024, 1, 1, 12, 0)
+
+    with Session(engine) as session:
+        query = _query("cached")
+        state = prepare_query(session, query)
+        record_endpoint_wire_format(session, BASE_URL, "B", verified_at)
+
+        fresh = cached_wire_format(
+            session, query, state, BASE_URL, options, now=verified_at + timedelta(hours=23)
+        )
+        stale = cached_wire_format(
+            session, query, state, BASE_URL, options, now=verified_at + timedelta(hours=25)
+        )
+        pinned = cached_wire_format(
+            session,
+            _query("pinned", wire_format="A"),
+            state,
+            BASE_URL,
+            options,
+            now=verified_at + timedelta(hours=25),
+        )
+
+    assert fresh == "B"
+    assert stale is None
+    assert pinned == "A"
+
+
+def test_async_probes_share_one_request(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = AsyncAPSClient(**_client_kwargs())
+    calls = 0
+
+    async def _search(payload: dict[str, Any]) -> dict[str, Any]:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"results": []}
+
+    monkeypatch.setattr(client, "search", _search)
+
+    async def _probe_all() -> list[str]:
+        return await asyncio.gather(*(client.probe_wire_format() for _ in range(5)))
+
+    assert asyncio.run(_probe_all()) == ["A"] * 5
+    assert calls == 1
+
+
+def _probe_client(handler: httpx.MockTransport) -> APSClient:
+    client = APSClient(**_client_kwargs())
+    client._http = httpx.Client(transport=handler)
+    return client
+
+
+def test_probe_falls_back_to_b_only_when_a_is_rejected() -> None:
+    bodies: list[dict[str, Any]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        bodies.append(body)
+        if body == serialize_query(WIRE_FORMAT_PROBE_QUERY, wire_format="A", skip=0):
+            return httpx.Response(400, json={"message": "Invalid filter."})
+        return httpx.Response(200, json={"count": 0, "results": []})
+
+    with _probe_client(httpx.MockTransport(handler)) as client:
+        assert client.probe_wire_format() == "B"
+        assert client.probe_wire_format() == "B"
+
+    assert bodies == [
+        serialize_query(WIRE_FORMAT_PROBE_QUERY, wire_format="A", skip=0),
+        serialize_query(WIRE_FORMAT_PROBE_QUERY, wire_format="B", skip=0),
+    ]
+
+
+def test_failed_probe_is_not_remembered() -> None:
+    statuses = iter([404, 200])
+    bodies: list[dict[str, Any]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        return httpx.Response(next(statuses), json={"count": 0, "results": []})
+
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+
+    with _probe_client(httpx.MockTransport(handler)) as client, Session(engine) as session:
+        with pytest.raises(APSClientError):
+            run_query(
+                session=session,
+                client=client,
+                query=_query("first"),
+                schema_version="1",
+                max_pages=1,
+            )
+        assert session.get(APSEndpointState, BASE_URL) is None
+        assert client.probe_wire_format() == "A"
+
+    probe_a = serialize_query(WIRE_FORMAT_PROBE_QUERY, wire_format="A", skip=0)
+    assert bodies == [probe_a, probe_a]